@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import multiprocessing
+import grpc
+from utils.grpc_bench import free_port, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.grpc_transfer import start_grpc_server
+from services.transfer_runtime.aio_transfer import start_aio_grpc_server
+
+# Abre STREAMS Downloads simultáneos contra el servidor de hilos (8 workers) y contra
+# el servidor grpc.aio. Cada cliente consume despacio (pausa por chunk, como un peer
+# con poco ancho de banda), que es cuando un stream retiene su hilo en el servidor.
+# Los servidores corren en otro proceso para no competir por el GIL con el cliente.
+# Se mide el tiempo hasta el primer chunk (p50/p99) y el tiempo total.
+
+STREAMS = 500
+FILE_KB = 1024
+PAUSE_S = 0.02
+CHANNELS = 10
+# Ventana HTTP/2 fija (sin BDP probing), como en un enlace lento real: el servidor se
+# bloquea en cuanto el cliente deja de consumir
+CLIENT_OPTIONS = [("grpc.http2.bdp_probe", 0)]
+
+
+def serve(base_dir: str, thread_port: int, aio_port: int) -> None:
+    start_grpc_server(base_dir, thread_port)
+    start_aio_grpc_server(base_dir, aio_port)
+    while True:
+        time.sleep(3600)
+
+
+async def one(stub, results):
+    t0 = time.perf_counter()
+    first = None
+    async for chunk in stub.Download(pb2.FileRequest(filename="archivo.bin")):
+        if first is None:
+            first = time.perf_counter() - t0
+        await asyncio.sleep(PAUSE_S)
+    results.append((first, time.perf_counter() - t0))
+
+
+async def run(addr: str, streams: int):
+    channels = [grpc.aio.insecure_channel(addr, options=CLIENT_OPTIONS) for _ in range(CHANNELS)]
+    stubs = [pb2_grpc.TransferStub(ch) for ch in channels]
+    results = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(stubs[i % CHANNELS], results) for i in range(streams)))
+    total = time.perf_counter() - t0
+    for ch in channels:
+        await ch.close()
+    firsts = sorted(r[0] for r in results)
+    return total, firsts[len(firsts) // 2], firsts[int(len(firsts) * 0.99) - 1]
+
+
+def main():
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else STREAMS
+    tmp = tempfile.mkdtemp(prefix="aio_")
+    make_file(os.path.join(tmp, "archivo.bin"), FILE_KB * 1024)
+    thread_port, aio_port = free_port(), free_port()
+    proc = multiprocessing.Process(target=serve, args=(tmp, thread_port, aio_port), daemon=True)
+    proc.start()
+    time.sleep(2)
+    print(f"{streams} Downloads simultáneos de {FILE_KB} KiB, pausa de {PAUSE_S * 1000:.0f} ms por chunk en el cliente")
+    for label, port in (("hilos (8)", thread_port), ("grpc.aio", aio_port)):
+        total, p50, p99 = asyncio.run(run(f"127.0.0.1:{port}", streams))
+        print(f"[{label:9}] total={total:6.2f}s  primer chunk p50={p50 * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms")
+    proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+from utils.grpc_bench import start_server
+
+from services.file_simple.service import set_base_directory
+from services.transfer_client.client import download_file, download_files_bulk
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# Sincroniza una carpeta de FILES archivos chicos (FILE_KB cada uno) desde un solo
+# propietario: primero con un Download gRPC por archivo y luego con un único stream
+# BulkDownload. Se reportan tiempo, archivos/s y MB/s, y se verifica cada archivo.
+
+FILES = 10000
+FILE_KB = 4
+
+
+def digest_dir(path: str, names) -> str:
+    h = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(path, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    tmp = tempfile.mkdtemp(prefix="bulk_")
+    srv_dir = os.path.join(tmp, "srv")
+    names = [f"carpeta/archivo_{i:05d}.bin" for i in range(files)]
+    os.makedirs(os.path.join(srv_dir, "carpeta"))
+    for name in names:
+        with open(os.path.join(srv_dir, name), "wb") as f:
+            f.write(os.urandom(FILE_KB * 1024))
+    server, addr = start_server(TransferService(srv_dir))
+    expected = digest_dir(srv_dir, names)
+    total_mb = files * FILE_KB / 1024
+    print(f"Carpeta: {files} archivos de {FILE_KB} KiB ({total_mb:.1f} MB)")
+
+    passed = True
+    for label, run in (("un Download por archivo", lambda: {n: download_file(addr, n, conditional=False) for n in names}),
+                       ("BulkDownload", lambda: download_files_bulk(addr, names))):
+        dest = os.path.join(tmp, label.split()[0])
+        set_base_directory(dest)
+        t0 = time.perf_counter()
+        results = run()
+        dt = time.perf_counter() - t0
+        ok = all(r[0] for r in results.values()) and digest_dir(dest, names) == expected
+        passed = passed and ok
+        print(f"[{label:24}] {dt:7.2f}s  {files / dt:8.0f} archivos/s  {total_mb / dt:6.1f} MB/s  íntegro={ok}")
+    server.stop(0)
+    print("OK" if passed else "FALLA")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
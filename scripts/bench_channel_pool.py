@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import tempfile
+import grpc
+from utils.grpc_bench import start_server, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.file_simple.service import set_base_directory
+from services.transfer_client.channel_pool import get_pool
+from services.transfer_client.client import download_file
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.integrity import ChunkVerifier
+
+# Muchas descargas de archivos pequeños: canal nuevo por llamada (comportamiento
+# anterior de download_file) contra canales reutilizados del pool del proceso.
+
+FILES = 500
+FILE_KB = 4
+
+
+def fetch(channel: grpc.Channel, name: str) -> None:
+    verifier = ChunkVerifier()
+    for chunk in pb2_grpc.TransferStub(channel).Download(pb2.FileRequest(filename=name)):
+        verifier.feed(chunk)
+    verifier.finish()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    tmp = tempfile.mkdtemp(prefix="pool_")
+    names = [f"f{i:05d}.txt" for i in range(n)]
+    for name in names:
+        make_file(os.path.join(tmp, "srv", name), FILE_KB * 1024, compressible=True)
+    server, addr = start_server(TransferService(os.path.join(tmp, "srv")))
+
+    t0 = time.perf_counter()
+    for name in names:
+        with grpc.insecure_channel(addr) as ch:
+            fetch(ch, name)
+    per_call = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for name in names:
+        with get_pool().lease(addr) as ch:
+            fetch(ch, name)
+    pooled = time.perf_counter() - t0
+
+    # Camino completo (escritura a disco + .part + rename) usando download_file con el pool
+    set_base_directory(os.path.join(tmp, "cli"))
+    t0 = time.perf_counter()
+    for name in names:
+        ok, msg = download_file(addr, name)
+        if not ok:
+            raise SystemExit(msg)
+    full = time.perf_counter() - t0
+    server.stop(0)
+
+    print(f"{n} descargas de {FILE_KB} KiB")
+    print(f"canal por llamada : {per_call:6.2f}s  ({1000 * per_call / n:6.2f} ms/archivo)")
+    print(f"canal del pool    : {pooled:6.2f}s  ({1000 * pooled / n:6.2f} ms/archivo)  x{per_call / pooled:.1f}")
+    print(f"download_file     : {full:6.2f}s  ({1000 * full / n:6.2f} ms/archivo, incluye disco)")
+    print(f"canales abiertos en el pool: {get_pool().stats()}")
+
+
+if __name__ == "__main__":
+    main()
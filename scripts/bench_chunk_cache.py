@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import grpc
+from utils.grpc_bench import start_server, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime import grpc_transfer
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.chunk_cache import configure_chunk_cache, get_chunk_cache
+
+# PEERS clientes descargan el mismo archivo a la vez, ROUNDS veces. Antes de cada
+# ronda se expulsa el archivo del page cache (posix_fadvise DONTNEED), como ocurre
+# con presión de memoria. Se compara servir con mmap, con read() y con la caché LRU
+# de chunks; se reportan MB/s agregados, lectura real de disco del proceso
+# (/proc/self/io read_bytes) y la tasa de aciertos de la caché.
+
+PEERS = 8
+ROUNDS = 3
+FILE_MB = 32
+CACHE_MB = 64
+
+
+def disk_read_bytes() -> int:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("read_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def evict(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def fetch(addr: str, out: list) -> None:
+    with grpc.insecure_channel(addr) as ch:
+        stub = pb2_grpc.TransferStub(ch)
+        out.append(sum(len(c.content) for c in stub.Download(pb2.FileRequest(filename="popular.bin"))))
+
+
+def run(addr: str, path: str, peers: int):
+    total = 0
+    disk0 = disk_read_bytes()
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        evict(path)
+        got: list = []
+        threads = [threading.Thread(target=fetch, args=(addr, got)) for _ in range(peers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        total += sum(got)
+    return total / 2**20 / (time.perf_counter() - t0), (disk_read_bytes() - disk0) / 2**20
+
+
+def main():
+    peers = int(sys.argv[1]) if len(sys.argv) > 1 else PEERS
+    tmp = tempfile.mkdtemp(prefix="chunkcache_")
+    path = make_file(os.path.join(tmp, "popular.bin"), FILE_MB * 2**20)
+    server, addr = start_server(TransferService(tmp), max_workers=peers + 4)
+    print(f"{peers} peers x {ROUNDS} rondas sobre un archivo de {FILE_MB} MB (page cache expulsado en cada ronda)")
+    for label, use_mmap, budget in (("mmap", True, 0), ("read()", False, 0), (f"caché {CACHE_MB} MB", True, CACHE_MB)):
+        grpc_transfer.USE_MMAP = use_mmap
+        configure_chunk_cache(budget * 2**20, admit_after=2)
+        mbps, disk_mb = run(addr, path, peers)
+        stats = get_chunk_cache().stats()
+        extra = f"  aciertos={stats['hit_rate'] * 100:5.1f}%  desalojos={stats['evictions']}" if budget else ""
+        print(f"[{label:12}] {mbps:8.1f} MB/s agregados  disco leído={disk_mb:7.1f} MB{extra}")
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import io
+import gzip
+import shutil
+import zipfile
+import tempfile
+import grpc
+from utils.grpc_bench import ROOT, start_server, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.compression import HEADER
+
+# Corpus mixto (texto, CSV, binario aleatorio, pdf, zip). Para cada archivo se descarga
+# sin negociar compresión y negociándola, y se reporta el códec elegido, el costo de CPU
+# por MB del proceso (cliente + servidor) y los bytes en el cable (en una pasada aparte,
+# no cronometrada, se estiman comprimiendo cada mensaje como lo hace gRPC).
+
+
+def build_corpus(d: str):
+    os.makedirs(d, exist_ok=True)
+    doc = open(os.path.join(ROOT, "files", "peer1", "document1.txt"), "rb").read() or b"texto\n"
+    with open(os.path.join(d, "documento.txt"), "wb") as f:
+        f.write(doc * (8 * 1024 * 1024 // len(doc) + 1))
+    make_file(os.path.join(d, "log.txt"), 16 * 1024 * 1024, compressible=True)
+    with open(os.path.join(d, "datos.csv"), "w") as f:
+        for i in range(250000):
+            f.write(f"{i},{i * 7 % 1000},sensor_{i % 50},{(i * 31) % 997 / 10:.1f}\n")
+    make_file(os.path.join(d, "aleatorio.bin"), 16 * 1024 * 1024)
+    shutil.copy(os.path.join(ROOT, "files", "peer1", "duplicado.pdf"), os.path.join(d, "duplicado.pdf"))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.write(os.path.join(d, "log.txt"), "log.txt")
+    with open(os.path.join(d, "paquete.zip"), "wb") as f:
+        f.write(buf.getvalue())
+
+
+def cpu() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def download(stub, name: str, accept: str, estimate: bool = False):
+    c0 = cpu()
+    call = stub.Download(pb2.FileRequest(filename=name, accept_compression=accept))
+    codec = dict(call.initial_metadata()).get(HEADER, "identity")
+    raw = wire = 0
+    for chunk in call:
+        n = len(chunk.content)
+        raw += n
+        if estimate and codec == "gzip":
+            wire += len(gzip.compress(chunk.SerializeToString(), 6)) if n else 0
+        else:
+            wire += n
+    return codec, raw, wire, cpu() - c0
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="compr_")
+    build_corpus(tmp)
+    server, addr = start_server(TransferService(tmp))
+    total_raw = total_wire = 0
+    with grpc.insecure_channel(addr) as ch:
+        stub = pb2_grpc.TransferStub(ch)
+        print(f"{'archivo':16} {'códec':8} {'MB':>7} {'MB cable':>9} {'ahorro':>7} {'CPU s/MB plano':>15} {'CPU s/MB neg.':>14}")
+        for name in sorted(os.listdir(tmp)):
+            _, _, _, cpu_plain = download(stub, name, "")
+            _, _, _, cpu_neg = download(stub, name, "gzip")
+            codec, raw, wire, _ = download(stub, name, "gzip", estimate=True)
+            mb = raw / 2**20
+            total_raw += raw
+            total_wire += wire
+            print(f"{name:16} {codec:8} {mb:7.2f} {wire / 2**20:9.2f} {100 * (1 - wire / max(raw, 1)):6.1f}% "
+                  f"{cpu_plain / max(mb, 1e-9):15.4f} {cpu_neg / max(mb, 1e-9):14.4f}")
+    server.stop(0)
+    print(f"Total: {total_raw / 2**20:.1f} MB -> {total_wire / 2**20:.1f} MB en el cable "
+          f"({100 * (1 - total_wire / total_raw):.1f}% ahorrado)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import tempfile
+from utils.grpc_bench import start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.transfer_client.client import download_file
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# Descarga un corpus completo y luego lo vuelve a pedir sin cambios, con y sin
+# transferencia condicional. Después se agrega contenido al final de la mitad de los
+# archivos (caso log que crece) y se mide otra pasada. Se reportan tiempo y bytes
+# servidos por el propietario en cada pasada.
+
+FILES = 24
+FILE_MB = 8
+ROUNDS = 3
+
+
+class CountingTransferService(TransferService):
+    def __init__(self, base_dir: str):
+        super().__init__(base_dir)
+        self.bytes_sent = 0
+
+    def Download(self, request, context):
+        for chunk in super().Download(request, context):
+            self.bytes_sent += len(chunk.content)
+            yield chunk
+
+
+def run_pass(service, addr: str, names, conditional: bool):
+    service.bytes_sent = 0
+    t0 = time.perf_counter()
+    for name in names:
+        ok, msg = download_file(addr, name, conditional=conditional)
+        if not ok:
+            raise SystemExit(f"falló {name}: {msg}")
+    return time.perf_counter() - t0, service.bytes_sent
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    tmp = tempfile.mkdtemp(prefix="cond_")
+    srv_dir = os.path.join(tmp, "srv")
+    names = [f"archivo_{i:03d}.bin" for i in range(files)]
+    for name in names:
+        make_file(os.path.join(srv_dir, name), FILE_MB * 2**20)
+    service = CountingTransferService(srv_dir)
+    server, addr = start_server(service)
+    set_base_directory(os.path.join(tmp, "cli"))
+
+    total_mb = files * FILE_MB
+    print(f"Corpus: {files} archivos de {FILE_MB} MB ({total_mb} MB)")
+    dt, sent = run_pass(service, addr, names, conditional=True)
+    print(f"{'descarga inicial':32} {dt:7.2f}s  {sent / 2**20:8.1f} MB servidos")
+    for label, conditional in (("repetida, incondicional", False), ("repetida, condicional", True)):
+        for r in range(ROUNDS):
+            dt, sent = run_pass(service, addr, names, conditional)
+            print(f"{label + f' #{r + 1}':32} {dt:7.2f}s  {sent / 2**20:8.1f} MB servidos")
+
+    # El propietario agrega 256 KiB al final de la mitad de los archivos
+    for name in names[::2]:
+        with open(os.path.join(srv_dir, name), "ab") as f:
+            f.write(os.urandom(256 * 1024))
+    dt, sent = run_pass(service, addr, names, conditional=True)
+    print(f"{'condicional tras agregar colas':32} {dt:7.2f}s  {sent / 2**20:8.1f} MB servidos")
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import random
+import shutil
+import hashlib
+import tempfile
+from utils.grpc_bench import start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.transfer_client.client import delta_sync_file, download_file
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# El propietario modifica un archivo grande (FILE_MB) del que el cliente ya tiene la
+# versión vieja: ediciones en el lugar repartidas por todo el archivo más algunas
+# inserciones y un borrado (que desalinean los bloques). Se compara actualizar por
+# DeltaSync contra volver a descargar todo, para el 1% y el 10% de bytes cambiados.
+# Bytes en el cable = firmas enviadas + mensajes de delta recibidos.
+
+FILE_MB = 500
+EDIT_SIZE = 4 * 1024
+INSERTS = 4
+SCENARIOS = (0.01, 0.10)
+
+
+class CountingTransferService(TransferService):
+    def __init__(self, base_dir: str):
+        super().__init__(base_dir)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _count(self, requests):
+        for request in requests:
+            self.bytes_in += request.ByteSize()
+            yield request
+
+    def DeltaSync(self, request_iterator, context):
+        for chunk in super().DeltaSync(self._count(request_iterator), context):
+            self.bytes_out += chunk.ByteSize()
+            yield chunk
+
+    def Download(self, request, context):
+        for chunk in super().Download(request, context):
+            self.bytes_out += len(chunk.content)
+            yield chunk
+
+
+def sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def modify(src: str, dst: str, fraction: float, rng: random.Random) -> None:
+    """Copia src en dst cambiando ~'fraction' de sus bytes."""
+    size = os.path.getsize(src)
+    edits = max(1, int(size * fraction) // EDIT_SIZE)
+    offsets = sorted(rng.randrange(0, size - EDIT_SIZE) for _ in range(edits))
+    inserts = set(rng.sample(range(edits), min(INSERTS, edits)))
+    deleted = rng.randrange(edits)
+    with open(src, "rb") as f, open(dst, "wb") as out:
+        pos = 0
+        for i, off in enumerate(offsets):
+            if off < pos:
+                continue
+            out.write(f.read(off - pos))
+            if i in inserts:
+                out.write(rng.randbytes(EDIT_SIZE))  # inserción: desplaza el resto
+                pos = off
+            elif i == deleted:
+                f.seek(EDIT_SIZE, os.SEEK_CUR)  # borrado
+                pos = off + EDIT_SIZE
+            else:
+                out.write(rng.randbytes(EDIT_SIZE))
+                f.seek(EDIT_SIZE, os.SEEK_CUR)
+                pos = off + EDIT_SIZE
+        shutil.copyfileobj(f, out)
+
+
+def main():
+    file_mb = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_MB
+    rng = random.Random(7)
+    tmp = tempfile.mkdtemp(prefix="delta_")
+    srv_dir, cli_dir = os.path.join(tmp, "srv"), os.path.join(tmp, "cli")
+    old = make_file(os.path.join(tmp, "viejo.bin"), file_mb * 2**20)
+    service = CountingTransferService(srv_dir)
+    server, addr = start_server(service)
+    set_base_directory(cli_dir)
+    os.makedirs(cli_dir, exist_ok=True)
+    local = os.path.join(cli_dir, "datos.bin")
+    print(f"Archivo de {file_mb} MB; ediciones de {EDIT_SIZE // 1024} KiB, {INSERTS} inserciones y un borrado")
+
+    passed = True
+    for fraction in SCENARIOS:
+        modify(old, os.path.join(srv_dir, "datos.bin"), fraction, rng)
+        for label, sync in (("descarga completa", lambda: download_file(addr, "datos.bin", conditional=False)),
+                            ("DeltaSync", lambda: delta_sync_file(addr, "datos.bin"))):
+            shutil.copyfile(old, local)
+            service.bytes_in = service.bytes_out = 0
+            t0 = time.perf_counter()
+            ok, msg = sync()
+            dt = time.perf_counter() - t0
+            intact = ok and sha256(local) == sha256(os.path.join(srv_dir, "datos.bin"))
+            passed = passed and intact
+            wire = service.bytes_in + service.bytes_out
+            print(f"[{fraction * 100:4.0f}% {label:17}] {dt:6.2f}s  cable={wire / 2**20:8.2f} MB "
+                  f"(subida {service.bytes_in / 2**20:.2f} / bajada {service.bytes_out / 2**20:.2f})  "
+                  f"íntegro={intact}")
+    server.stop(0)
+    shutil.rmtree(tmp, ignore_errors=True)
+    print("OK" if passed else "FALLA")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import tempfile
+from utils.grpc_bench import start_server, make_file
+
+from services.file_simple.service import indexar, listar_archivos, set_base_directory
+from services.transfer_client.client import download_file
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# Ingesta de INGEST archivos descargados en un directorio que ya tiene EXISTING
+# archivos indexados. Se compara reindexar todo el directorio tras cada descarga
+# (comportamiento anterior de /transfer/download) con actualizar solo la entrada
+# del archivo descargado, y se verifica que ambos índices terminen iguales.
+
+EXISTING = 20000
+INGEST = 300
+FILE_KB = 16
+
+
+def ingest(addr: str, dest: str, names, full_reindex: bool):
+    set_base_directory(dest)
+    indexar()
+    t0 = time.perf_counter()
+    for name in names:
+        ok, msg = download_file(addr, name, conditional=False)
+        if not ok:
+            raise SystemExit(f"falló {name}: {msg}")
+        if full_reindex:
+            indexar()
+    dt = time.perf_counter() - t0
+    return dt, sorted((e["path"], e["size"]) for e in listar_archivos())
+
+
+def main():
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else EXISTING
+    tmp = tempfile.mkdtemp(prefix="incidx_")
+    names = [f"nuevo_{i:04d}.bin" for i in range(INGEST)]
+    for name in names:
+        make_file(os.path.join(tmp, "srv", name), FILE_KB * 1024)
+    server, addr = start_server(TransferService(os.path.join(tmp, "srv")))
+    print(f"{INGEST} descargas de {FILE_KB} KiB en un directorio con {existing} archivos")
+
+    results = {}
+    for label, full in (("reindexado completo", True), ("entrada incremental", False)):
+        dest = os.path.join(tmp, label.split()[0])
+        for i in range(existing):
+            sub = os.path.join(dest, f"d{i % 100:02d}")
+            os.makedirs(sub, exist_ok=True)
+            open(os.path.join(sub, f"viejo_{i:06d}.txt"), "wb").close()
+        dt, index = ingest(addr, dest, names, full)
+        results[label] = [(os.path.relpath(p, dest), size) for p, size in index]
+        print(f"[{label:20}] {dt:7.2f}s  {dt / INGEST * 1000:7.2f} ms por descarga  índice={len(index)} entradas")
+    server.stop(0)
+    same = results["reindexado completo"] == results["entrada incremental"]
+    print(f"índices equivalentes: {same}")
+    print("OK" if same else "FALLA")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import random
+from utils.overlay_sim import SimNetwork
+
+# Compara los mensajes redundantes por búsqueda (entregas a nodos que ya habían recibido
+# la misma query) con y sin el filtro 'visited' en topologías cíclicas simuladas.
+# Sin filtro se emula el comportamiento anterior eliminando el campo 'visited' del payload.
+
+TOPOLOGIAS = [
+    ("anillo n=30", lambda kw: SimNetwork.ring(30, **kw)),
+    ("aleatoria n=60 grado=4", lambda kw: SimNetwork.random_regular(60, 4, **kw)),
+    ("aleatoria n=120 grado=6", lambda kw: SimNetwork.random_regular(120, 6, **kw)),
+]
+TTL = 5
+SEARCHES = 40
+
+
+def run(build, strip_visited: bool):
+    net = build({"strip_visited": strip_visited})
+    net.install()
+    nodes = list(net.nodes.values())
+    rnd = random.Random(11)
+    # Un único archivo en un nodo; la mitad de las búsquedas pide algo inexistente (flood completo)
+    holder = rnd.choice(nodes)
+    holder.files.add("objetivo.bin")
+    totals = {"messages": 0, "redundant": 0, "found": 0}
+    for i in range(SEARCHES):
+        src = rnd.choice(nodes)
+        name = "objetivo.bin" if i % 2 == 0 else "no_existe.bin"
+        m = net.search(src, name, TTL)
+        totals["messages"] += m["messages"]
+        totals["redundant"] += m["redundant"]
+        totals["found"] += 1 if m["result"].get("found") else 0
+    return {k: v / SEARCHES if k != "found" else v for k, v in totals.items()}
+
+
+def main():
+    print(f"TTL={TTL}, búsquedas por escenario={SEARCHES}")
+    for name, build in TOPOLOGIAS:
+        before = run(build, strip_visited=True)
+        after = run(build, strip_visited=False)
+        print(f"[{name}]")
+        print(f"  sin visited: mensajes/búsqueda={before['messages']:.1f} redundantes/búsqueda={before['redundant']:.1f} encontradas={before['found']}")
+        print(f"  con visited: mensajes/búsqueda={after['messages']:.1f} redundantes/búsqueda={after['redundant']:.1f} encontradas={after['found']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+import utils.overlay_sim  # noqa: F401  (agrega la raíz del repo a sys.path)
+from services.file_simple.service import (
+    MAX_MATCHES,
+    actualizar_entrada,
+    buscar_archivos,
+    coincide_filtro,
+    indexar,
+    listar_archivos,
+    normalizar_filtro,
+    set_base_directory,
+)
+
+# Búsquedas por metadata sobre un directorio con FILES archivos (dispersos: el tamaño
+# se fija con truncate y el mtime con utime). Se compara buscar_archivos, que recorre
+# solo los candidatos del índice secundario más selectivo, con un recorrido completo
+# de listar_archivos evaluando el mismo filtro, y se verifica que ambos coincidan.
+
+FILES = 100000
+ROUNDS = 20
+EXTS = ["pdf", "txt", "jpg", "mp4", "zip", "csv", "docx", "bin"]
+QUERIES = [
+    "ext:pdf size>100MB age<7d",
+    "ext:mp4,zip size>=1GB",
+    "size>3GB",
+    "age<1d",
+    "before:2022-01-01 ext:csv",
+    "name:informe ext:pdf",
+]
+
+
+def populate(base: str, count: int, rnd: random.Random) -> None:
+    now = time.time()
+    for i in range(count):
+        sub = os.path.join(base, f"d{i % 200:03d}")
+        os.makedirs(sub, exist_ok=True)
+        prefix = "informe" if rnd.random() < 0.01 else "archivo"
+        path = os.path.join(sub, f"{prefix}_{i:06d}.{rnd.choice(EXTS)}")
+        with open(path, "wb") as f:
+            f.truncate(int(rnd.paretovariate(0.6) * 2**20) % (4 * 2**30))
+        mtime = now - rnd.uniform(0, 6 * 365 * 86400)
+        os.utime(path, (mtime, mtime))
+
+
+def scan(filtro, limit):
+    now = time.time()
+    return [e for e in listar_archivos() if coincide_filtro(e, filtro, now)][:limit]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(*args)
+    return (time.perf_counter() - t0) / ROUNDS * 1000, result
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    rnd = random.Random(11)
+    base = tempfile.mkdtemp(prefix="metaq_")
+    populate(base, files, rnd)
+    set_base_directory(base)
+    t0 = time.perf_counter()
+    indexar()
+    print(f"{files} archivos indexados en {time.perf_counter() - t0:.2f}s (con índices secundarios)")
+
+    ok = True
+    for query in QUERIES:
+        filtro = normalizar_filtro(query)
+        t_idx, found = timed(buscar_archivos, filtro, MAX_MATCHES)
+        t_scan, expected = timed(scan, filtro, files)
+        # Mismo resultado: todas las coincidencias si son pocas, o un subconjunto válido
+        same = (sorted(e["path"] for e in found) == sorted(e["path"] for e in expected)
+                if len(expected) <= MAX_MATCHES else
+                len(found) == MAX_MATCHES and {e["path"] for e in found} <= {e["path"] for e in expected})
+        ok &= same
+        print(f"{query:28}  coincidencias={len(expected):6}  índice={t_idx:7.2f} ms  "
+              f"recorrido={t_scan:7.2f} ms  x{t_scan / max(t_idx, 1e-6):6.1f}  {'ok' if same else 'DISTINTO'}")
+
+    # Mantenimiento incremental de los índices secundarios tras una descarga
+    path = os.path.join(base, "d000", "nuevo.pdf")
+    with open(path, "wb") as f:
+        f.truncate(200 * 2**20)
+    t_upd, _ = timed(actualizar_entrada, path)
+    hit = any(e["path"] == os.path.normpath(path) for e in buscar_archivos(normalizar_filtro("ext:pdf size>150MB age<1h")))
+    ok &= hit
+    print(f"actualizar_entrada con índices secundarios: {t_upd:.3f} ms; visible en la búsqueda: {hit}")
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import grpc
+from utils.grpc_bench import start_server, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime import grpc_transfer
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.transport import get_transport
+
+# Compara el camino clásico (f.read por chunk + pb2.FileChunk) con el camino mmap
+# (vistas sobre un mapeo compartido, serializadas a mano) para un archivo de 1 GB:
+#  1) solo el camino de servicio (generar + serializar, sin red)
+#  2) extremo a extremo por loopback con READERS lectores concurrentes del mismo archivo
+# Se reporta MB/s y segundos de CPU del proceso por GB servido.
+
+FILE_MB = 1024
+READERS = 4
+
+
+class _Ctx:
+    def abort(self, code, details):
+        raise RuntimeError(details)
+
+
+def cpu() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def serve_only(service: TransferService, filename: str, size: int):
+    t0, c0 = time.perf_counter(), cpu()
+    total = 0
+    for chunk in service.Download(pb2.FileRequest(filename=filename), _Ctx()):
+        total += len(chunk.SerializeToString())
+    dt, dc = time.perf_counter() - t0, cpu() - c0
+    return size / dt / 2**20, dc / (size / 2**30)
+
+
+def end_to_end(addr: str, filename: str, size: int):
+    def reader():
+        with grpc.insecure_channel(addr) as ch:
+            for chunk in pb2_grpc.TransferStub(ch).Download(pb2.FileRequest(filename=filename)):
+                pass
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    t0, c0 = time.perf_counter(), cpu()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dt, dc = time.perf_counter() - t0, cpu() - c0
+    served = size * READERS
+    return served / dt / 2**20, dc / (served / 2**30)
+
+
+def main():
+    file_mb = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_MB
+    size = file_mb * 1024 * 1024
+    tmp = tempfile.mkdtemp(prefix="mmap_")
+    make_file(os.path.join(tmp, "grande.bin"), size)
+    service = TransferService(tmp)
+    server, addr = start_server(service)
+
+    # Calentar page cache para que ambos caminos midan CPU y no disco
+    serve_only(service, "grande.bin", size)
+    print(f"Archivo: {file_mb} MB, chunk={get_transport().chunk_size // 1024} KiB, lectores concurrentes={READERS}")
+    for label, use_mmap in (("read()", False), ("mmap", True)):
+        grpc_transfer.USE_MMAP = use_mmap
+        mbps, cpu_gb = serve_only(service, "grande.bin", size)
+        print(f"[{label:6}] solo servicio: {mbps:8.1f} MB/s  CPU {cpu_gb:.3f} s/GB")
+        mbps, cpu_gb = end_to_end(addr, "grande.bin", size)
+        print(f"[{label:6}] extremo a extremo: {mbps:8.1f} MB/s  CPU {cpu_gb:.3f} s/GB (cliente+servidor)")
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import tempfile
+from utils.grpc_bench import start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.transfer_client.client import download_file_multi
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# Descarga por rangos desde 1..N servidores en proceso. Cada servidor limita su
+# "uplink" a UPLINK_MBPS para emular discos/enlaces de peers distintos; el MB/s
+# agregado debería escalar con el número de fuentes. Uno de los servidores es
+# lento a propósito para verificar que las piezas se reparten hacia los rápidos.
+
+FILE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+UPLINK_MBPS = 40.0
+SLOW_MBPS = 5.0
+N_SERVERS = 4
+
+
+class ThrottledTransferService(TransferService):
+    def __init__(self, base_dir: str, mbps: float):
+        super().__init__(base_dir)
+        self.bytes_per_s = mbps * 1024 * 1024
+
+    def Download(self, request, context):
+        t0 = time.monotonic()
+        sent = 0
+        for chunk in super().Download(request, context):
+            sent += len(chunk.content)
+            delay = sent / self.bytes_per_s - (time.monotonic() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            yield chunk
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="swarm_")
+    size = FILE_MB * 1024 * 1024
+    src = make_file(os.path.join(tmp, "seed", "grande.bin"), size)
+    servers = []
+    addrs = []
+    for i in range(N_SERVERS + 1):
+        d = os.path.join(tmp, f"srv{i}")
+        os.makedirs(d, exist_ok=True)
+        os.link(src, os.path.join(d, "grande.bin"))
+        mbps = SLOW_MBPS if i == N_SERVERS else UPLINK_MBPS
+        server, addr = start_server(ThrottledTransferService(d, mbps))
+        servers.append(server)
+        addrs.append(addr)
+
+    print(f"Archivo: {FILE_MB} MB; uplink por fuente: {UPLINK_MBPS} MB/s")
+    scenarios = [(n, addrs[:n]) for n in range(1, N_SERVERS + 1)]
+    scenarios.append((N_SERVERS + 1, addrs))  # incluye la fuente lenta
+    for n, sources in scenarios:
+        dest = os.path.join(tmp, f"dest{n}")
+        os.makedirs(dest, exist_ok=True)
+        set_base_directory(dest)
+        t0 = time.perf_counter()
+        ok, msg = download_file_multi(sources, "grande.bin", size)
+        dt = time.perf_counter() - t0
+        label = f"{n} fuentes" + (" (1 lenta)" if n > N_SERVERS else "")
+        print(f"{label}: ok={ok} {FILE_MB / dt:.1f} MB/s en {dt:.2f}s | {msg.split(' desde ')[-1]}")
+        os.remove(os.path.join(dest, "grande.bin")) if ok else None
+
+    for s in servers:
+        s.stop(0)
+
+
+if __name__ == "__main__":
+    main()
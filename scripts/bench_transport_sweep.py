@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tempfile
+import grpc
+from utils.grpc_bench import start_server, make_file
+from utils.rtt_proxy import RttProxy
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.transport import configure_transport, get_transport
+
+# Barrido de tamaño de chunk (y ventana HTTP/2) contra MB/s de un Download a través
+# de un proxy que emula RTT_MS de latencia ida y vuelta. Cada combinación usa un
+# canal nuevo con las opciones de transporte de esa configuración; el servidor lee
+# el tamaño de chunk por stream.
+
+RTT_MS = 40
+FILE_MB = 256
+CHUNKS_KB = [16, 64, 256, 1024]
+WINDOWS = [("BDP por defecto", {"window_kb": 0, "bdp_probe": True}),
+           ("ventana 16 MiB", {"window_kb": 16 * 1024, "bdp_probe": False})]
+
+
+def download(addr: str) -> float:
+    with grpc.insecure_channel(addr, options=get_transport().channel_options()) as ch:
+        stub = pb2_grpc.TransferStub(ch)
+        t0 = time.perf_counter()
+        n = sum(len(c.content) for c in stub.Download(pb2.FileRequest(filename="grande.bin")))
+        return n / 2**20 / (time.perf_counter() - t0)
+
+
+def main():
+    rtt = float(sys.argv[1]) if len(sys.argv) > 1 else RTT_MS
+    tmp = tempfile.mkdtemp(prefix="transport_")
+    make_file(os.path.join(tmp, "grande.bin"), FILE_MB * 2**20)
+    # El servidor acepta mensajes grandes y ventanas amplias para todas las combinaciones
+    configure_transport({"max_chunk_kb": 4096, "window_kb": 16 * 1024})
+    server, addr = start_server(TransferService(tmp), options=get_transport().server_options())
+    proxy = RttProxy(addr, rtt)
+    print(f"Download de {FILE_MB} MB con RTT emulado de {rtt:.0f} ms")
+    print(f"{'chunk':>12} " + " ".join(f"{label:>16}" for label, _ in WINDOWS))
+    rows = [(f"{kb} KiB", {"chunk_kb": kb, "max_chunk_kb": 4096}) for kb in CHUNKS_KB]
+    rows.append(("adaptativo", {"chunk_kb": 16, "adaptive_chunk": True, "max_chunk_kb": 4096}))
+    for label, chunk_cfg in rows:
+        cells = []
+        for _, window_cfg in WINDOWS:
+            configure_transport({**chunk_cfg, **window_cfg})
+            cells.append(download(proxy.address))
+        print(f"{label:>12} " + " ".join(f"{mbps:11.1f} MB/s" for mbps in cells))
+    proxy.close()
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import sys
+import random
+from typing import Dict
+from utils.overlay_sim import SimNetwork, SimNode
+
+from services.directory_simple import routing
+from services.directory_simple.routing import RoutingTable
+
+# Simulación de la tabla de ruteo aprendida con una carga repetitiva (pedidos Zipf)
+# sobre start_search/handle_query reales en overlay_sim. Cada nodo tiene su propia
+# RoutingTable; cada enlace tiene un RTT fijo y como la propagación es secuencial
+# la latencia de una búsqueda es la suma de los RTT de sus mensajes.
+# Fase 1: carga estable. Fase 2: los archivos más pedidos cambian de dueño, para
+# ver que las rutas viejas se descartan tras fallar y se aprenden las nuevas.
+
+NODES = 100
+DEGREE = 4
+FILES = 200
+ZIPF_S = 1.0
+TTL = 5
+WARMUP = 2000
+REQUESTS = 4000
+MOVED = 20  # archivos más populares que cambian de dueño en la fase 2
+
+
+class NoRouting(RoutingTable):
+    """Sin aprendizaje: el flood de siempre."""
+
+    def record_hit(self, filename: str, neighbor: str, hops: int = 0) -> None:
+        pass
+
+
+class RoutingNetwork(SimNetwork):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.rtt: Dict[frozenset, float] = {}
+        self.latency = 0.0
+        self._rnd = random.Random(5)
+
+    def _activate(self, node: SimNode):
+        prev = super()._activate(node)
+        saved = routing._TABLE
+        routing._TABLE = node.routes
+        return prev, saved
+
+    def _restore(self, prev) -> None:
+        super()._restore(prev[0])
+        routing._TABLE = prev[1]
+
+    def _post_json(self, url: str, payload: Dict, timeout: int = 6):
+        target = url.split("://", 1)[1].split("/", 1)[0]
+        link = frozenset((self._current.addr, target))
+        if link not in self.rtt:
+            self.rtt[link] = self._rnd.uniform(5, 60)
+        self.latency += self.rtt[link]
+        return super()._post_json(url, payload, timeout)
+
+
+def simulate(learn: bool, seed: int = 3):
+    net = RoutingNetwork.random_regular(NODES, DEGREE, seed=seed)
+    net.install()
+    nodes = list(net.nodes.values())
+    for node in nodes:
+        node.routes = RoutingTable() if learn else NoRouting()
+    rnd = random.Random(seed)
+    names = [f"f{i:03d}.bin" for i in range(FILES)]
+    owners = {name: rnd.choice(nodes) for name in names}
+    for name, owner in owners.items():
+        owner.files.add(name)
+    weights = [1 / (rank + 1) ** ZIPF_S for rank in range(FILES)]
+
+    phases = []
+    for phase in (1, 2):
+        if phase == 2:
+            for name in names[:MOVED]:
+                owners[name].files.discard(name)
+                owners[name] = rnd.choice(nodes)
+                owners[name].files.add(name)
+        totals = {"found": 0, "messages": 0, "latency": 0.0}
+        for i in range(WARMUP + REQUESTS):
+            src = rnd.choice(nodes)
+            name = rnd.choices(names, weights)[0]
+            net.latency = 0.0
+            m = net.search(src, name, TTL)
+            if i < WARMUP:
+                continue
+            totals["found"] += 1 if m["result"].get("found") else 0
+            totals["messages"] += m["messages"]
+            totals["latency"] += net.latency
+        phases.append({k: v / REQUESTS for k, v in totals.items()})
+    routes = sum(n.routes.stats()["routes"] for n in nodes)
+    misses = sum(n.routes.stats()["misses"] for n in nodes)
+    return phases, routes, misses
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{NODES} nodos (grado {DEGREE}), {FILES} archivos, Zipf s={ZIPF_S}, TTL={TTL}, "
+          f"{REQUESTS} búsquedas medidas por fase tras {WARMUP} de calentamiento")
+    for label, learn in (("flood", False), ("ruteo aprendido", True)):
+        phases, routes, misses = simulate(learn, seed)
+        for i, p in enumerate(phases, 1):
+            print(f"[{label:15} fase {i}] encontradas={p['found'] * 100:5.1f}%  mensajes/búsqueda={p['messages']:6.1f}  "
+                  f"latencia={p['latency']:7.1f} ms")
+        if learn:
+            print(f"  rutas vigentes al final={routes}  fallos de rutas aprendidas={misses}")
+
+
+if __name__ == "__main__":
+    main()
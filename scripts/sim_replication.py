@@ -0,0 +1,170 @@
+import sys
+import random
+from collections import Counter, deque
+from typing import Dict, List
+from utils.overlay_sim import SimNetwork, SimNode
+
+from services.directory_simple import popularity
+from services.directory_simple.popularity import PopularityTracker
+from services.transfer_runtime import replicas
+from services.transfer_runtime.replicas import ReplicaStore
+from services.transfer_runtime.replication import Replicator
+
+# Simulación de la replicación proactiva con pedidos Zipf. Cada nodo tiene su
+# propio PopularityTracker, ReplicaStore y Replicator (el código real); las
+# búsquedas son start_search/handle_query reales sobre overlay_sim y el Upload
+# de una réplica se simula agregando el archivo al nodo destino. El reloj es
+# simulado: avanza una unidad por pedido.
+# Se compara sin y con replicación: búsquedas encontradas con TTL bajo, saltos
+# hasta el nodo que responde, mensajes por búsqueda y reparto de la carga.
+
+NODES = 100
+DEGREE = 4
+FILES = 200
+ZIPF_S = 1.0
+TTL = 3
+WARMUP = 3000
+REQUESTS = 6000
+ROUND_EVERY = 100  # pedidos entre rondas de replicación
+QUOTA_FILES = 5  # réplicas que acepta cada nodo (cada archivo "pesa" 1)
+HALF_LIFE = 1500
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SimReplicaStore(ReplicaStore):
+    def __init__(self, node: SimNode, clock: Clock):
+        super().__init__(QUOTA_FILES, clock)
+        self.node = node
+
+    def _delete(self, filename: str, path: str) -> None:
+        self.node.files.discard(filename)
+
+
+class SimReplicator(Replicator):
+    def __init__(self, net: "ReplicationNetwork", node: SimNode):
+        super().__init__(enabled=True, hot_score=8, cold_score=1, fanout=1, max_hot_files=3,
+                         repush_s=HALF_LIFE, replica_min_age_s=HALF_LIFE / 2)
+        self.net = net
+        self.node = node
+
+    def _local_files(self) -> Dict[str, str]:
+        return {name: name for name in self.node.files}
+
+    def _neighbors(self) -> List[str]:
+        return [a for a in self.node.dl if a != self.node.addr]
+
+    def _push(self, neighbor: str, relpath: str, score: float):
+        target = self.net.nodes[neighbor]
+        if relpath in target.files and not target.store.is_replica(relpath):
+            return False, "el archivo ya existe en este nodo"
+        if not target.store.reserve(relpath, relpath, 1, score, target.tracker.score):
+            return False, "sin cuota para réplicas"
+        target.files.add(relpath)
+        return True, "ok"
+
+
+class ReplicationNetwork(SimNetwork):
+    """SimNetwork que además activa el tracker y el almacén de réplicas de cada nodo."""
+
+    def _activate(self, node: SimNode):
+        prev = super()._activate(node)
+        saved = (popularity._TRACKER, replicas._STORE)
+        popularity._TRACKER, replicas._STORE = node.tracker, node.store
+        return prev, saved
+
+    def _restore(self, prev) -> None:
+        super()._restore(prev[0])
+        popularity._TRACKER, replicas._STORE = prev[1]
+
+
+def distances(net: SimNetwork, src: SimNode) -> Dict[str, int]:
+    dist = {src.addr: 0}
+    queue = deque([src.addr])
+    while queue:
+        addr = queue.popleft()
+        for nxt in net.nodes[addr].dl:
+            if nxt not in dist:
+                dist[nxt] = dist[addr] + 1
+                queue.append(nxt)
+    return dist
+
+
+def simulate(replicate: bool, seed: int = 3):
+    net = ReplicationNetwork.random_regular(NODES, DEGREE, seed=seed)
+    net.install()
+    clock = Clock()
+    nodes = list(net.nodes.values())
+    for node in nodes:
+        node.tracker = PopularityTracker(HALF_LIFE, clock)
+        node.store = SimReplicaStore(node, clock)
+        node.replicator = SimReplicator(net, node)
+    rnd = random.Random(seed)
+    names = [f"f{i:03d}.bin" for i in range(FILES)]
+    owners = {name: rnd.choice(nodes) for name in names}
+    for name, owner in owners.items():
+        owner.files.add(name)
+    weights = [1 / (rank + 1) ** ZIPF_S for rank in range(FILES)]
+
+    stats = {"found": 0, "hops": 0, "messages": 0}
+    served: Counter = Counter()
+    top_by_owner = top_total = 0
+    for i in range(WARMUP + REQUESTS):
+        clock.now = float(i)
+        if replicate and i % ROUND_EVERY == 0:
+            for node in nodes:
+                prev = net._activate(node)
+                try:
+                    node.replicator.run_once(now=clock.now)
+                finally:
+                    net._restore(prev)
+        src = rnd.choice(nodes)
+        name = rnd.choices(names, weights)[0]
+        m = net.search(src, name, TTL)
+        result = m["result"]
+        if result.get("found"):
+            holder = net.nodes[result["address"]]
+            holder.tracker.record(name)  # la descarga servida también cuenta
+        if i < WARMUP:
+            continue
+        stats["messages"] += m["messages"]
+        if result.get("found"):
+            stats["found"] += 1
+            stats["hops"] += distances(net, src)[holder.addr]
+            served[holder.addr] += 1
+            if name == names[0]:
+                top_total += 1
+                top_by_owner += holder is owners[name]
+    found = max(1, stats["found"])
+    replicas_total = sum(len(n.store.replicas()) for n in nodes)
+    return {
+        "found": stats["found"] / REQUESTS,
+        "hops": stats["hops"] / found,
+        "messages": stats["messages"] / REQUESTS,
+        "max_share": max(served.values()) / found,
+        "top_owner_share": top_by_owner / max(1, top_total),
+        "replicas": replicas_total,
+        "evictions": sum(n.store.evictions for n in nodes),
+    }
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{NODES} nodos (grado {DEGREE}), {FILES} archivos, Zipf s={ZIPF_S}, TTL={TTL}, "
+          f"{REQUESTS} pedidos medidos tras {WARMUP} de calentamiento")
+    for label, replicate in (("sin replicación", False), ("con replicación", True)):
+        r = simulate(replicate, seed)
+        print(f"[{label:16}] encontradas={r['found'] * 100:5.1f}%  saltos={r['hops']:.2f}  "
+              f"mensajes/búsqueda={r['messages']:.1f}  nodo más cargado={r['max_share'] * 100:4.1f}%  "
+              f"archivo #1 servido por su dueño={r['top_owner_share'] * 100:5.1f}%  "
+              f"réplicas={r['replicas']} desalojos={r['evictions']}")
+
+
+if __name__ == "__main__":
+    main()
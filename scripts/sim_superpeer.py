@@ -0,0 +1,137 @@
+import sys
+import json
+import random
+from typing import Dict, List
+from utils.overlay_sim import SimNetwork, SimNode
+
+from services.directory_simple import service as dsvc
+from services.directory_simple import superpeer
+from services.directory_simple.superpeer import ROLE_FLAT, ROLE_LEAF, ROLE_SUPER, LeafIndex, LeafUplink
+
+# Simulación del modo jerárquico (super-peers) contra el flood plano, con el código
+# real de start_search/handle_query/push_leaf_index sobre overlay_sim.
+# Plano: todos los nodos en un grafo aleatorio de grado 4. Jerárquico: SUPERS
+# super-peers en un grafo de grado 4 entre ellos y el resto hojas con headline y
+# substitute al azar. Se mide mensajes por búsqueda, búsquedas encontradas, costo
+# de mantener los índices (completo vs delta) y el failover al caer super-peers.
+
+NODES = 1000
+SUPERS = 40
+DEGREE = 4
+FILES_PER_NODE = 20
+SEARCHES = 1000
+CHURN = 0.02  # fracción de hojas que cambian un archivo entre rondas de subida
+KILLED = 4
+HIER_TTL = 5  # hoja -> super-peer más 4 saltos entre super-peers
+
+
+class HierNetwork(SimNetwork):
+    def _activate(self, node: SimNode):
+        prev = super()._activate(node)
+        saved = (superpeer._ROLE, superpeer._LEAF_INDEX, superpeer._UPLINK)
+        superpeer._ROLE = node.role
+        superpeer._LEAF_INDEX = node.leaf_index
+        superpeer._UPLINK = node.uplink
+        return prev, saved
+
+    def _restore(self, prev) -> None:
+        super()._restore(prev[0])
+        superpeer._ROLE, superpeer._LEAF_INDEX, superpeer._UPLINK = prev[1]
+
+    def _post_json(self, url: str, payload: Dict, timeout: int = 6):
+        self.bytes += len(json.dumps(payload))
+        return super()._post_json(url, payload, timeout)
+
+    def _local_index(self) -> Dict[str, int]:
+        return {name: 0 for name in self._current.files}
+
+    def install(self) -> None:
+        super().install()
+        self.bytes = 0
+        dsvc._local_index = self._local_index
+
+
+def build(hierarchical: bool, seed: int):
+    rnd = random.Random(seed)
+    if hierarchical:
+        net = HierNetwork.random_regular(SUPERS, DEGREE, seed=seed)
+        supers = list(net.nodes.values())
+        leaves = [net.add_node(i) for i in range(SUPERS, NODES)]
+    else:
+        net = HierNetwork.random_regular(NODES, DEGREE, seed=seed)
+        supers, leaves = [], list(net.nodes.values())
+    net.install()
+    for node in supers:
+        node.role, node.leaf_index, node.uplink = ROLE_SUPER, LeafIndex(leaf_ttl_s=1e9), LeafUplink()
+    for node in leaves:
+        node.role, node.leaf_index = (ROLE_LEAF if hierarchical else ROLE_FLAT), LeafIndex()
+        head, sub = rnd.sample(supers, 2) if hierarchical else (None, None)
+        node.uplink = LeafUplink(head and head.addr, sub and sub.addr)
+    names = []
+    for node in net.nodes.values():
+        for _ in range(FILES_PER_NODE):
+            name = f"f{len(names):05d}.bin"
+            names.append(name)
+            node.files.add(name)
+    return net, supers, leaves, names, rnd
+
+
+def push_round(net: HierNetwork, leaves: List[SimNode]) -> Dict[str, float]:
+    before, bytes_before, ok = net.messages, net.bytes, 0
+    for node in leaves:
+        prev = net._activate(node)
+        try:
+            ok += 1 if dsvc.push_leaf_index().get("success") else 0
+        finally:
+            net._restore(prev)
+    return {"messages": net.messages - before, "kb": (net.bytes - bytes_before) / 1024, "ok": ok}
+
+
+def searches(net: HierNetwork, names: List[str], rnd: random.Random, ttl: int, count: int = SEARCHES):
+    nodes = [n for n in net.nodes.values() if n.role != ROLE_SUPER]
+    found = messages = 0
+    for _ in range(count):
+        src = rnd.choice(nodes)
+        name = rnd.choice(names)
+        m = net.search(src, name, ttl)
+        found += 1 if m["result"].get("found") else 0
+        messages += m["messages"]
+    return found / count, messages / count
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{NODES} nodos, {FILES_PER_NODE} archivos por nodo, {SEARCHES} búsquedas de un archivo al azar")
+
+    for ttl in (4, 6):
+        net, _, _, names, rnd = build(False, seed)
+        found, msgs = searches(net, names, rnd, ttl)
+        print(f"[plano       TTL={ttl}] encontradas={found * 100:5.1f}%  mensajes/búsqueda={msgs:6.1f}")
+
+    net, supers, leaves, names, rnd = build(True, seed)
+    full = push_round(net, leaves)
+    print(f"[jerárquico] {SUPERS} super-peers, {len(leaves)} hojas; subida inicial: {full['messages']} mensajes "
+          f"(con réplica al substitute), {full['kb']:.0f} KB")
+    for leaf in rnd.sample(leaves, int(len(leaves) * CHURN)):
+        leaf.files.add(f"nuevo-{leaf.peer_id}.bin")
+        names.append(f"nuevo-{leaf.peer_id}.bin")
+    delta = push_round(net, leaves)
+    print(f"[jerárquico] ronda con {CHURN * 100:.0f}% de hojas cambiadas (deltas + heartbeats): "
+          f"{delta['messages']} mensajes, {delta['kb']:.0f} KB")
+    found, msgs = searches(net, names, rnd, HIER_TTL)
+    print(f"[jerárquico  TTL={HIER_TTL}] encontradas={found * 100:5.1f}%  mensajes/búsqueda={msgs:6.1f}")
+
+    for dead in rnd.sample(supers, KILLED):
+        del net.nodes[dead.addr]
+    found, msgs = searches(net, names, rnd, HIER_TTL)
+    failovers = sum(n.uplink.failovers for n in leaves)
+    print(f"[caen {KILLED} super-peers] encontradas={found * 100:5.1f}%  mensajes/búsqueda={msgs:6.1f}  "
+          f"failovers en búsquedas={failovers}")
+    after = push_round(net, leaves)
+    found, msgs = searches(net, names, rnd, HIER_TTL)
+    print(f"[tras re-subir a substitutes] subidas ok={after['ok']}/{len(leaves)}  "
+          f"encontradas={found * 100:5.1f}%  mensajes/búsqueda={msgs:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import uuid
+import tempfile
+import threading
+import urllib.request
+from utils.relay_node import post, start_node
+
+from services.directory_simple.admission import configure_admission
+
+# Un nodo real (FastAPI + uvicorn) recibe RELAY_CLIENTS floods concurrentes por
+# /directory/query; su único vecino tarda SLOW_S en responder, así que cada relay
+# bloquea un hilo del pool mientras espera. Mientras tanto un cliente local mide la
+# latencia de /archivos y /directory/search. Sin control de admisión los relays
+# agotan el pool y la latencia local se dispara; con él los relays se limitan a
+# unos pocos slots, el resto se rechaza rápido con 503 + Retry-After y el p99 local
+# queda estable.
+
+RELAY_CLIENTS = 120
+SLOW_S = 1.0
+DURATION_S = 6.0
+LOCAL_EVERY_S = 0.05
+P99_LIMIT_S = 0.25
+
+
+def run_phase(node: str, label: str):
+    stop = threading.Event()
+    codes = {}
+    retry_hints = []
+    lock = threading.Lock()
+
+    def relay_client():
+        while not stop.is_set():
+            st, retry = post(f"http://{node}/directory/query",
+                             {"query_id": str(uuid.uuid4()), "filename": "no-existe.bin", "ttl": 2, "origin": "10.9.9.9:1"})
+            with lock:
+                codes[st] = codes.get(st, 0) + 1
+                if retry:
+                    retry_hints.append(int(retry))
+            if st == 503:
+                time.sleep(0.05)
+
+    clients = [threading.Thread(target=relay_client, daemon=True) for _ in range(RELAY_CLIENTS)]
+    for c in clients:
+        c.start()
+    time.sleep(0.5)
+    latencies = []
+    t_end = time.monotonic() + DURATION_S
+    while time.monotonic() < t_end:
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(f"http://{node}/archivos", timeout=30) as r:
+            r.read()
+        post(f"http://{node}/directory/search", {"filename": "local.txt", "ttl": 2})
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(LOCAL_EVERY_S)
+    stop.set()
+    for c in clients:
+        c.join()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    hint = f"  Retry-After típico={sorted(retry_hints)[len(retry_hints) // 2]}s" if retry_hints else ""
+    print(f"[{label:15}] local /archivos+/search: p50={p50 * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms  "
+          f"({len(latencies)} pedidos)  relay: {dict(sorted(codes.items()))}{hint}")
+    return p99, codes
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="admission_")
+    with open(os.path.join(tmp, "local.txt"), "w") as f:
+        f.write("hola")
+    server, slow, node = start_node(tmp, SLOW_S)
+
+    print(f"{RELAY_CLIENTS} clientes de relay contra un vecino que tarda {SLOW_S:.1f}s, {DURATION_S:.0f}s por fase")
+    configure_admission(relay_slots=0, origin_rate=0)
+    p99_off, _ = run_phase(node, "sin admisión")
+    time.sleep(SLOW_S * 2)
+    configure_admission(relay_slots=8, queue_size=16, queue_timeout_s=2.0, origin_rate=0)
+    p99_on, codes = run_phase(node, "con admisión")
+    server.should_exit = True
+    slow.shutdown()
+
+    ok = p99_on <= P99_LIMIT_S and codes.get(503, 0) > 0 and codes.get(200, 0) > 0
+    print(f"p99 local con admisión {p99_on * 1000:.1f} ms (límite {P99_LIMIT_S * 1000:.0f} ms), "
+          f"sin admisión {p99_off * 1000:.1f} ms")
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+import grpc
+from utils.grpc_bench import free_port, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.integrity import chunk_crc, trailer_chunk
+from services.transfer_runtime.aio_transfer import start_aio_grpc_server
+from services.transfer_runtime.scheduler import configure_scheduler
+
+# Servidor grpc.aio con el nodo limitado a NODE_MBPS y STREAMS Downloads frenados por
+# ese tope, más streams que hilos tiene el executor por defecto del event loop. Mientras
+# tanto se hacen subidas chicas, cuya E/S de disco (temporal, índice) va a ese executor.
+# Los streams frenados esperan su turno en el event loop, sin ocupar hilos: la latencia
+# de las subidas debe seguir cerca de la del nodo ocioso y la tasa agregada en el tope.
+
+NODE_MBPS = 16
+STREAMS = 100
+FILE_MB = 4
+SMALL_KB = 64
+UPLOADS = 10
+LATENCY_LIMIT_S = 0.5
+
+
+def chunks(data: bytes):
+    # Sin pasar por el scheduler del proceso (compartido aquí con el servidor)
+    yield pb2.FileChunk(content=data, seq=0, crc32=chunk_crc(data))
+    yield trailer_chunk(1, hashlib.sha256(data), len(data))
+
+
+def upload(stub, data: bytes) -> float:
+    t0 = time.perf_counter()
+    response = stub.Upload(chunks(data), metadata=(("filename", f"subida_{time.monotonic_ns()}.bin"),))
+    if not response.ok:
+        raise RuntimeError(response.message)
+    return time.perf_counter() - t0
+
+
+def main():
+    rate = NODE_MBPS * 2**20
+    configure_scheduler(node_rate=rate)
+    tmp = tempfile.mkdtemp(prefix="aio_throttle_")
+    base_dir = os.path.join(tmp, "srv")
+    make_file(os.path.join(base_dir, "grande.bin"), FILE_MB * 2**20)
+    small = os.urandom(SMALL_KB * 1024)
+    port = free_port()
+    start_aio_grpc_server(base_dir, port)
+    address = f"127.0.0.1:{port}"
+
+    with grpc.insecure_channel(address) as ch:
+        stub = pb2_grpc.TransferStub(ch)
+        idle = max(upload(stub, small) for _ in range(UPLOADS))
+
+    received = [0] * STREAMS
+    stop = threading.Event()
+
+    def reader(i: int):
+        with grpc.insecure_channel(address) as ch:
+            call = pb2_grpc.TransferStub(ch).Download(pb2.FileRequest(filename="grande.bin"))
+            for chunk in call:
+                received[i] += len(chunk.content)
+                if stop.is_set():
+                    call.cancel()
+                    break
+
+    readers = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(STREAMS)]
+    for r in readers:
+        r.start()
+    time.sleep(1.0)  # pasa la ráfaga inicial del bucket
+    t0, before = time.perf_counter(), sum(received)
+    with grpc.insecure_channel(address) as ch:
+        stub = pb2_grpc.TransferStub(ch)
+        loaded = sorted(upload(stub, small) for _ in range(UPLOADS))
+    time.sleep(max(0.0, 1.0 - (time.perf_counter() - t0)))
+    aggregate = (sum(received) - before) / (time.perf_counter() - t0) / 2**20
+    stop.set()
+    for r in readers:
+        r.join(timeout=10)
+
+    print(f"{STREAMS} Downloads frenados a {NODE_MBPS} MB/s en total; subidas de {SMALL_KB} KiB")
+    print(f"subida con el nodo ocioso: max={idle * 1000:.1f} ms")
+    print(f"subida con streams frenados: p50={loaded[len(loaded) // 2] * 1000:.1f} ms  max={loaded[-1] * 1000:.1f} ms")
+    print(f"tasa agregada de los Downloads: {aggregate:.1f} MB/s (tope {NODE_MBPS})")
+    ok = loaded[-1] <= LATENCY_LIMIT_S and aggregate <= NODE_MBPS * 1.25
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
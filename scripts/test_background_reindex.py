@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import utils.overlay_sim  # noqa: F401  (agrega la raíz del repo a sys.path)
+from services.file_simple.reindex import configure_reindexer
+from services.file_simple.service import (
+    buscar_archivos,
+    buscar_por_nombre,
+    indexar,
+    listar_archivos,
+    normalizar_filtro,
+    set_base_directory,
+)
+
+# Reindexación en segundo plano sobre un directorio con DIRS x FILES_PER_DIR archivos.
+# Se agregan, borran y renombran archivos y subárboles por fuera de la API (sin
+# /indexar) y se mide cuánto tardan en verse en las búsquedas; al final el índice
+# debe coincidir con un recorrido completo del disco. También se compara el costo de
+# un tick sin cambios (stat de los directorios) con un indexar() completo y se
+# muestra cómo el intervalo crece en reposo y baja ante una ráfaga de cambios.
+
+DIRS = 200
+FILES_PER_DIR = 100
+MIN_INTERVAL_S = 0.1
+MAX_INTERVAL_S = 2.0
+VISIBLE_TIMEOUT_S = 10.0
+
+
+def write(path: str, size: int = 16) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def disk_state(base: str):
+    return sorted((os.path.normpath(os.path.join(root, name)), os.path.getsize(os.path.join(root, name)))
+                  for root, _, files in os.walk(base) for name in files)
+
+
+def index_state():
+    return sorted((e["path"], e["size"]) for e in listar_archivos())
+
+
+def wait_until(cond) -> float:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < VISIBLE_TIMEOUT_S:
+        if cond():
+            return (time.perf_counter() - t0) * 1000
+        time.sleep(0.005)
+    return -1.0
+
+
+def main():
+    base = tempfile.mkdtemp(prefix="reindex_")
+    for d in range(DIRS):
+        for i in range(FILES_PER_DIR):
+            write(os.path.join(base, f"d{d:03d}", "sub", f"f_{d:03d}_{i:03d}.bin"))
+    set_base_directory(base)
+    t0 = time.perf_counter()
+    indexar()
+    full_ms = (time.perf_counter() - t0) * 1000
+
+    reindexer = configure_reindexer(min_interval_s=MIN_INTERVAL_S, max_interval_s=MAX_INTERVAL_S)
+    reindexer.tick()  # listado de referencia
+    time.sleep(2.1)  # fuera de la ventana de mtimes recientes
+    reindexer.tick()
+    t0 = time.perf_counter()
+    reindexer.tick()
+    idle_ms = (time.perf_counter() - t0) * 1000
+    print(f"{DIRS * FILES_PER_DIR} archivos en {2 * DIRS + 1} directorios: indexar() completo={full_ms:.1f} ms  "
+          f"tick sin cambios={idle_ms:.2f} ms")
+
+    reindexer.start()
+    time.sleep(3 * MAX_INTERVAL_S)
+    idle_interval = reindexer.interval_s
+    ok = True
+
+    checks = []
+    new_file = os.path.join(base, "d050", "sub", "agregado.pdf")
+    write(new_file, 4096)
+    checks.append(("archivo nuevo", wait_until(lambda: buscar_por_nombre("agregado.pdf") is not None)))
+    os.remove(os.path.join(base, "d010", "sub", "f_010_000.bin"))
+    checks.append(("archivo borrado", wait_until(lambda: buscar_por_nombre("f_010_000.bin") is None)))
+    os.rename(os.path.join(base, "d020", "sub", "f_020_000.bin"), os.path.join(base, "d020", "sub", "renombrado.bin"))
+    checks.append(("archivo renombrado", wait_until(lambda: buscar_por_nombre("renombrado.bin") is not None
+                                                    and buscar_por_nombre("f_020_000.bin") is None)))
+    for i in range(50):
+        write(os.path.join(base, "nuevo", "a", "b", f"n_{i:02d}.txt"))
+    checks.append(("subárbol nuevo (50)", wait_until(lambda: buscar_por_nombre("n_49.txt") is not None)))
+    burst_interval = reindexer.interval_s
+    shutil.rmtree(os.path.join(base, "d030"))
+    checks.append(("subárbol borrado (100)", wait_until(lambda: buscar_por_nombre("f_030_099.bin") is None)))
+    for label, ms in checks:
+        ok &= ms >= 0
+        print(f"{label:24} visible en {ms:7.1f} ms" if ms >= 0 else f"{label:24} NO visible")
+
+    hit = any(e["path"] == os.path.normpath(new_file) for e in buscar_archivos(normalizar_filtro("ext:pdf size>1KB")))
+    time.sleep(2 * MAX_INTERVAL_S)
+    same = index_state() == disk_state(base)
+    reindexer.stop()
+    stats = reindexer.stats()
+    print(f"intervalo en reposo={idle_interval:.2f}s  tras la ráfaga={burst_interval:.2f}s  "
+          f"(entre {MIN_INTERVAL_S}s y {MAX_INTERVAL_S}s)")
+    print(f"ticks={stats['ticks']} directorios relistados={stats['rescanned']} actualizadas={stats['updated']} "
+          f"quitadas={stats['removed']}")
+    print(f"índice secundario por extensión al día: {hit}  índice igual al disco: {same}")
+    ok &= hit and same and idle_ms < full_ms and burst_interval < idle_interval
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
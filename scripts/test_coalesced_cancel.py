@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+from utils.grpc_bench import fake_directory, start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.directory_simple.service import set_self_address
+from services.transfer_runtime.api import cancel_job, create_job, transfer_download
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.jobs import FINISHED, configure_job_queue, get_job_queue
+from services.transfer_runtime.scheduler import configure_scheduler
+
+# Descargas coalescidas (una sola descarga por archivo en vuelo) con trabajos que se
+# cancelan. Se verifica que:
+# - todos los trabajos que esperan la descarga compartida reciben progreso
+# - cancelar uno no corta la descarga de los demás (otro trabajo y un /transfer/download
+#   síncrono terminan bien); un trabajo que solo esperaba la descarga ajena termina al
+#   instante y el que la ejecuta, cuando la descarga compartida termina
+# - cuando todos los trabajos cancelan, la descarga se corta
+
+RATE_MBPS = 32
+FILE_MB = 48
+
+
+def wait_finished(job_id: str, timeout: float = 60.0):
+    job = get_job_queue().get(job_id)
+    t_end = time.monotonic() + timeout
+    while job.status not in FINISHED and time.monotonic() < t_end:
+        time.sleep(0.05)
+    return job
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="coalesced_")
+    size = FILE_MB * 2**20
+    for name in ("x.bin", "y.bin"):
+        make_file(os.path.join(tmp, "owner", name), size)
+    configure_scheduler(node_rate=RATE_MBPS * 2**20)
+    httpd, owner_rest = fake_directory({"found": True, "owner_id": "owner", "size": size})
+    server, _ = start_server(TransferService(os.path.join(tmp, "owner")), port=owner_rest + 1000)
+    set_base_directory(os.path.join(tmp, "cliente"))
+    set_self_address(f"127.0.0.1:{owner_rest}")
+    configure_job_queue(workers=4)
+
+    # 1) Tres trabajos y un pedido síncrono comparten x.bin; se cancelan el primero (el
+    #    que ejecuta la descarga) y el tercero
+    first = create_job({"filename": "x.bin"})["job_id"]
+    time.sleep(0.3)
+    second = create_job({"filename": "x.bin"})["job_id"]
+    third = create_job({"filename": "x.bin"})["job_id"]
+    sync_result = {}
+    sync = threading.Thread(target=lambda: sync_result.update(transfer_download({"filename": "x.bin"})))
+    sync.start()
+    time.sleep(0.5)
+    queue = get_job_queue()
+    progress_second = queue.get(second).bytes
+    cancel_job(first)
+    t0 = time.monotonic()
+    cancel_job(third)
+    job_third = wait_finished(third)
+    left_ms = (time.monotonic() - t0) * 1000
+    job_first = wait_finished(first)
+    job_second = wait_finished(second)
+    sync.join()
+    print(f"x.bin: cancelados={job_first.status}/{job_third.status} (el que esperaba salió en {left_ms:.0f} ms)  "
+          f"otro trabajo={job_second.status} {job_second.bytes / 2**20:.0f} MB "
+          f"(progreso antes de cancelar: {progress_second / 2**20:.1f} MB)  "
+          f"síncrono ok={sync_result.get('download_ok')} coalescido={sync_result.get('coalesced')}")
+    shared_ok = (job_first.status == job_third.status == "cancelled" and left_ms < 500
+                 and job_second.status == "done" and progress_second > 0
+                 and sync_result.get("download_ok") is True)
+
+    # 2) Dos trabajos comparten y.bin y ambos cancelan: la descarga se corta
+    ids = [create_job({"filename": "y.bin"})["job_id"]]
+    time.sleep(0.3)
+    ids.append(create_job({"filename": "y.bin"})["job_id"])
+    time.sleep(0.3)
+    t0 = time.monotonic()
+    for job_id in ids:
+        cancel_job(job_id)
+    jobs = [wait_finished(job_id) for job_id in ids]
+    stopped_ms = (time.monotonic() - t0) * 1000
+    full_ms = FILE_MB / RATE_MBPS * 1000
+    done = os.path.exists(os.path.join(tmp, "cliente", "y.bin"))
+    print(f"y.bin: estados={[j.status for j in jobs]} cortada en {stopped_ms:.0f} ms "
+          f"(descarga completa ~{full_ms:.0f} ms)  archivo completo: {done}")
+    all_ok = all(j.status == "cancelled" for j in jobs) and not done and stopped_ms < full_ms / 2
+
+    server.stop(0)
+    httpd.shutdown()
+    passed = shared_ok and all_ok
+    print("OK" if passed else "FALLA")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
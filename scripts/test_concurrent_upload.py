@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+import grpc
+from utils.grpc_bench import free_port, start_server
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.file_simple.service import es_temporal
+from services.transfer_runtime.integrity import chunk_crc, trailer_chunk
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.aio_transfer import start_aio_grpc_server
+
+# Dos Upload simultáneos del mismo archivo con contenidos distintos (dos propietarios
+# que replican el mismo archivo caliente), contra el servidor de hilos y el grpc.aio.
+# El archivo instalado debe ser entero el de la subida aceptada (nunca una mezcla), la
+# que llega mientras la otra sigue en curso se rechaza y no quedan temporales. Luego una
+# subida normal del mismo nombre vuelve a funcionar.
+
+CHUNKS = 40
+CHUNK_SIZE = 64 * 1024
+PAUSE_S = 0.01
+
+
+def slow_chunks(fill: bytes):
+    digest = hashlib.sha256()
+    for seq in range(CHUNKS):
+        data = fill * CHUNK_SIZE
+        digest.update(data)
+        yield pb2.FileChunk(content=data, seq=seq, crc32=chunk_crc(data))
+        time.sleep(PAUSE_S)
+    yield trailer_chunk(CHUNKS, digest, CHUNKS * CHUNK_SIZE)
+
+
+def upload(address: str, fill: bytes, results: dict) -> None:
+    with grpc.insecure_channel(address) as channel:
+        response = pb2_grpc.TransferStub(channel).Upload(slow_chunks(fill), metadata=(("filename", "hot.bin"),))
+    results[fill] = (response.ok, response.message)
+
+
+def check(label: str, address: str, base_dir: str) -> bool:
+    results = {}
+    threads = [threading.Thread(target=upload, args=(address, fill, results)) for fill in (b"a", b"b")]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    for t in threads:
+        t.join()
+    with open(os.path.join(base_dir, "hot.bin"), "rb") as f:
+        content = f.read()
+    accepted = [fill for fill, (ok, _) in results.items() if ok]
+    # El archivo instalado es entero el de la subida aceptada
+    whole = len(accepted) == 1 and content == accepted[0] * CHUNKS * CHUNK_SIZE
+    leftovers = [name for name in os.listdir(base_dir) if es_temporal(name)]
+    again = {}
+    upload(address, b"c", again)
+    print(f"{label}: resultados={ {k.decode(): v for k, v in results.items()} }  archivo entero={whole}  "
+          f"temporales={leftovers}  subida posterior={again[b'c'][0]}")
+    return whole and not leftovers and again[b"c"][0]
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="upload_")
+    threaded_dir, aio_dir = os.path.join(tmp, "hilos"), os.path.join(tmp, "aio")
+    server, address = start_server(TransferService(threaded_dir))
+    aio_port = free_port()
+    start_aio_grpc_server(aio_dir, aio_port)
+    ok = check("hilos", address, threaded_dir)
+    ok &= check("aio", f"127.0.0.1:{aio_port}", aio_dir)
+    server.stop(0)
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
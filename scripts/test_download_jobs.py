@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import urllib.request
+import uvicorn
+from utils.grpc_bench import fake_directory, free_port, start_server, make_file
+from utils.http_client import post_json, get
+
+from services.file_simple.api import app
+from services.file_simple.service import ruta_temporal, set_base_directory
+from services.directory_simple.service import set_self_address
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.jobs import configure_job_queue
+from services.transfer_runtime.scheduler import configure_scheduler
+
+# Levanta la API REST del nodo y un propietario gRPC limitado a RATE_MBPS. Con un solo
+# worker encola tres descargas con distinta prioridad y verifica que:
+# - POST /transfer/jobs responde al instante (sin esperar la transferencia)
+# - los trabajos corren por prioridad
+# - /transfer/jobs/{id}/events transmite progreso (bytes, tasa, ETA) hasta terminar
+# - un trabajo en curso se cancela y deja su .part para reanudar
+
+RATE_MBPS = 32
+FILE_MB = 48
+
+
+def events(url: str):
+    with urllib.request.urlopen(url, timeout=60) as r:
+        for line in r:
+            yield json.loads(line)
+
+
+def main():
+    file_mb = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_MB
+    tmp = tempfile.mkdtemp(prefix="jobs_")
+    for name in ("a.bin", "b.bin", "c.bin"):
+        make_file(os.path.join(tmp, "owner", name), file_mb * 2**20)
+    configure_scheduler(node_rate=RATE_MBPS * 2**20)
+    httpd, owner_rest = fake_directory({"found": True, "owner_id": "owner", "size": file_mb * 2**20})
+    server, _ = start_server(TransferService(os.path.join(tmp, "owner")), port=owner_rest + 1000)
+
+    set_base_directory(os.path.join(tmp, "cliente"))
+    set_self_address(f"127.0.0.1:{owner_rest}")
+    configure_job_queue(workers=1)
+    port = free_port()
+    api = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=api.run, daemon=True).start()
+    while not api.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}/transfer/jobs"
+
+    ids = {}
+    for name, prio in (("a.bin", 0), ("b.bin", 0), ("c.bin", 5)):
+        t0 = time.perf_counter()
+        _, txt = post_json(base, {"filename": name, "priority": prio})
+        ids[name] = json.loads(txt)["job_id"]
+        print(f"POST {name} prioridad={prio}: {(time.perf_counter() - t0) * 1000:.1f} ms -> {ids[name]}")
+
+    # a.bin ya tomó el único worker; c.bin (prioridad 5) debe correr antes que b.bin
+    updates = 0
+    for snap in events(f"{base}/{ids['a.bin']}/events"):
+        updates += 1
+        if snap["status"] == "running" and snap["rate_bps"] and updates % 4 == 0:
+            print(f"  a.bin {snap['bytes'] / 2**20:6.1f}/{snap['total'] / 2**20:.0f} MB  "
+                  f"{snap['rate_bps'] / 2**20:5.1f} MB/s  ETA {snap['eta_s']} s")
+    print(f"a.bin terminó tras {updates} eventos")
+
+    # Cancelar c.bin a mitad de camino
+    while json.loads(get(f"{base}/{ids['c.bin']}")[1])["bytes"] < file_mb * 2**20 // 2:
+        time.sleep(0.1)
+    post_json(f"{base}/{ids['c.bin']}/cancel", {})
+    final = {}
+    for name, jid in ids.items():
+        for snap in events(f"{base}/{jid}/events"):
+            final[name] = snap
+    for name in ids:
+        print(f"{name}: {final[name]['status']:9} iniciado={final[name]['started']:.2f}  {final[name]['error']}")
+
+    part_left = os.path.exists(ruta_temporal(os.path.join(tmp, "cliente", "c.bin"), "part"))
+    ordered = final["c.bin"]["started"] < final["b.bin"]["started"]
+    passed = (final["a.bin"]["status"] == "done" and final["b.bin"]["status"] == "done"
+              and final["c.bin"]["status"] == "cancelled" and ordered and part_left)
+    api.should_exit = True
+    server.stop(0)
+    httpd.shutdown()
+    print(f"prioridad respetada: {ordered}  .part de c.bin conservado: {part_left}")
+    print("OK" if passed else "FALLA")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import grpc
+from utils.grpc_bench import start_server, make_file
+
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.scheduler import configure_scheduler
+
+# Con el nodo limitado a NODE_MBPS, BULK Downloads grandes corren en paralelo mientras
+# se descargan archivos chicos uno tras otro. Con WFQ un archivo chico recibe su parte
+# del enlace (1 / (BULK + 1)), así su latencia queda acotada por
+# tamaño * (BULK + 1) / tasa en lugar de esperar a que terminen las descargas grandes.
+# Se compara contra la latencia con el nodo ocioso y contra esa cota.
+
+NODE_MBPS = 32
+BULK = 4
+BULK_MB = 48
+SMALL_KB = 256
+SMALL_COUNT = 20
+
+
+def fetch(stub, name: str) -> int:
+    return sum(len(c.content) for c in stub.Download(pb2.FileRequest(filename=name)))
+
+
+def small_latencies(stub, count: int):
+    out = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        fetch(stub, "chico.bin")
+        out.append(time.perf_counter() - t0)
+    return sorted(out)
+
+
+def main():
+    bulk = int(sys.argv[1]) if len(sys.argv) > 1 else BULK
+    rate = NODE_MBPS * 2**20
+    configure_scheduler(node_rate=rate)
+    tmp = tempfile.mkdtemp(prefix="sched_")
+    make_file(os.path.join(tmp, "grande.bin"), BULK_MB * 2**20)
+    make_file(os.path.join(tmp, "chico.bin"), SMALL_KB * 1024)
+    server, addr = start_server(TransferService(tmp))
+
+    with grpc.insecure_channel(addr) as ch:
+        idle = small_latencies(pb2_grpc.TransferStub(ch), SMALL_COUNT)
+
+    done = []
+    def bulk_worker():
+        with grpc.insecure_channel(addr) as ch:
+            t0 = time.perf_counter()
+            n = fetch(pb2_grpc.TransferStub(ch), "grande.bin")
+            done.append((n, time.perf_counter() - t0))
+
+    workers = [threading.Thread(target=bulk_worker) for _ in range(bulk)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(1.0)
+    with grpc.insecure_channel(addr) as ch:
+        loaded = small_latencies(pb2_grpc.TransferStub(ch), SMALL_COUNT)
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    server.stop(0)
+
+    bound = SMALL_KB * 1024 * (bulk + 1) / rate
+    bulk_mb = sum(n for n, _ in done) / 2**20
+    p50, p99 = loaded[len(loaded) // 2], loaded[-1]
+    print(f"Nodo a {NODE_MBPS} MB/s, {bulk} descargas de {BULK_MB} MB, archivo chico de {SMALL_KB} KiB")
+    print(f"ocioso:      p50={idle[len(idle) // 2] * 1000:7.1f} ms  max={idle[-1] * 1000:7.1f} ms")
+    print(f"con carga:   p50={p50 * 1000:7.1f} ms  max={p99 * 1000:7.1f} ms  (cota WFQ {bound * 1000:.1f} ms)")
+    print(f"descargas grandes: {bulk_mb / elapsed:.1f} MB/s agregados")
+    # Sin reparto justo, el archivo chico esperaría detrás de ~BULK * BULK_MB / tasa
+    ok = p99 <= 2 * bound + 0.1
+    print("OK: latencia acotada" if ok else "FALLA: latencia fuera de la cota")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+import time
+import uuid
+import tempfile
+import threading
+from utils.relay_node import post, start_node
+
+from services.directory_simple.admission import configure_admission
+
+# Un origen charlatán floodea un nodo real a ~100x la tasa de los demás mientras
+# POLITE orígenes envían una query cada POLITE_EVERY_S. El vecino del nodo tarda
+# SLOW_S por query, así que el relay atiende a lo sumo RELAY_SLOTS / SLOW_S
+# queries/s. Se compara la cola sin distinguir origen (todas las queries llegan
+# como un mismo origen, como antes) con token buckets por origen y cola round-robin:
+# la latencia y la tasa de éxito de los orígenes educados deben quedar acotadas.
+
+RELAY_SLOTS = 4
+SLOW_S = 0.2
+POLITE = 4
+POLITE_EVERY_S = 0.5
+FLOOD_THREADS = 40
+FLOOD_PAUSE_S = 0.2  # pausa tras un rechazo: cada hilo sigue en ~5 queries/s
+DURATION_S = 8.0
+ORIGIN_RATE = 5.0
+
+
+def run_phase(node: str, label: str, per_origin: bool):
+    stop = threading.Event()
+    lock = threading.Lock()
+    polite_lat, polite_codes, flood_codes = [], {}, {}
+    flood_sent = [0]
+
+    def query(origin: str):
+        payload = {"query_id": str(uuid.uuid4()), "filename": "no-existe.bin", "ttl": 1}
+        if per_origin:
+            payload["origin"] = origin
+        return post(f"http://{node}/directory/query", payload)
+
+    def polite(i: int):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            st, _ = query(f"10.1.0.{i}:5000")
+            with lock:
+                polite_codes[st] = polite_codes.get(st, 0) + 1
+                if st == 200:
+                    polite_lat.append(time.perf_counter() - t0)
+            stop.wait(POLITE_EVERY_S)
+
+    def flooder():
+        while not stop.is_set():
+            st, _ = query("10.6.6.6:5000")
+            with lock:
+                flood_codes[st] = flood_codes.get(st, 0) + 1
+                flood_sent[0] += 1
+            if st != 200:
+                time.sleep(FLOOD_PAUSE_S)
+
+    threads = [threading.Thread(target=polite, args=(i,), daemon=True) for i in range(POLITE)]
+    threads += [threading.Thread(target=flooder, daemon=True) for _ in range(FLOOD_THREADS)]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    time.sleep(DURATION_S)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+    polite_lat.sort()
+    sent = sum(polite_codes.values())
+    ok_ratio = polite_codes.get(200, 0) / max(1, sent)
+    p99 = polite_lat[min(len(polite_lat) - 1, int(len(polite_lat) * 0.99))] if polite_lat else float("inf")
+    p50 = polite_lat[len(polite_lat) // 2] if polite_lat else float("inf")
+    print(f"[{label:22}] educados: éxito={ok_ratio * 100:5.1f}%  p50={p50 * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms  "
+          f"({sent / elapsed / POLITE:.1f} q/s c/u) | charlatán: {flood_sent[0] / elapsed:.0f} q/s "
+          f"{dict(sorted(flood_codes.items()))}")
+    return ok_ratio, p99
+
+
+def main():
+    server, slow, node = start_node(tempfile.mkdtemp(prefix="fairness_"), SLOW_S)
+    print(f"relay de {RELAY_SLOTS} slots, vecino de {SLOW_S * 1000:.0f} ms, {POLITE} orígenes educados "
+          f"a {1 / POLITE_EVERY_S:.0f} q/s y un charlatán con {FLOOD_THREADS} hilos")
+    configure_admission(relay_slots=RELAY_SLOTS, queue_size=16, queue_timeout_s=2.0, origin_rate=0)
+    run_phase(node, "sin distinguir origen", per_origin=False)
+    time.sleep(2 * SLOW_S)
+    configure_admission(relay_slots=RELAY_SLOTS, queue_size=16, queue_timeout_s=2.0,
+                        origin_rate=ORIGIN_RATE, origin_burst=2 * ORIGIN_RATE)
+    ok_ratio, p99 = run_phase(node, "por origen", per_origin=True)
+    server.should_exit = True
+    slow.shutdown()
+
+    bound = 2 * SLOW_S + 0.2
+    ok = ok_ratio >= 0.99 and p99 <= bound
+    print(f"por origen: éxito de los educados {ok_ratio * 100:.1f}% (mín 99%), p99 {p99 * 1000:.1f} ms "
+          f"(cota {bound * 1000:.0f} ms)")
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import hashlib
+import grpc
+from utils.grpc_bench import start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.transfer_client.client import download_file
+from services.transfer_runtime.grpc_transfer import TransferService
+
+# Corta la primera transferencia a la mitad (el servidor aborta con UNAVAILABLE) y
+# verifica que el reintento pida solo el resto: mide los bytes re-enviados y que el
+# archivo final no quede truncado con su nombre definitivo en ningún momento.
+# Luego deja un .part a medias (sin reintentos), cambia el archivo del propietario y
+# vuelve a descargar: el .part viejo no sirve y el archivo se baja entero, sin mezclar
+# el comienzo de la versión vieja con el final de la nueva.
+
+FILE_MB = 64
+
+
+class FlakyTransferService(TransferService):
+    def __init__(self, base_dir: str, cut_at: int):
+        super().__init__(base_dir)
+        self.cut_at = cut_at
+        self.calls = 0
+        self.bytes_sent = 0
+        self.offsets = []
+
+    def Download(self, request, context):
+        self.calls += 1
+        self.offsets.append(request.offset or request.have_size)
+        sent = 0
+        for chunk in super().Download(request, context):
+            if self.calls == 1 and sent >= self.cut_at:
+                context.abort(grpc.StatusCode.UNAVAILABLE, "conexión cortada (simulada)")
+            sent += len(chunk.content)
+            self.bytes_sent += len(chunk.content)
+            yield chunk
+
+
+def sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def main():
+    file_mb = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_MB
+    tmp = tempfile.mkdtemp(prefix="resume_")
+    size = file_mb * 1024 * 1024
+    src = make_file(os.path.join(tmp, "srv", "grande.bin"), size)
+    service = FlakyTransferService(os.path.dirname(src), cut_at=size // 2)
+    server, addr = start_server(service)
+
+    dest_dir = os.path.join(tmp, "cli")
+    set_base_directory(dest_dir)
+    ok, msg = download_file(addr, "grande.bin")
+    server.stop(0)
+
+    dest = os.path.join(dest_dir, "grande.bin")
+    resent = service.bytes_sent - size
+    print(f"ok={ok} msg={msg}")
+    print(f"llamadas={service.calls} offsets pedidos={service.offsets}")
+    print(f"bytes enviados={service.bytes_sent} tamaño={size} re-enviados={resent} "
+          f"(sin reanudación serían {size // 2})")
+    same = ok and sha256(dest) == sha256(src)
+    leftovers = [f for f in os.listdir(dest_dir) if f.endswith(".part") or f.endswith(".json")]
+    print(f"contenido idéntico={same} restos .part={leftovers}")
+    if not (same and not leftovers and service.calls == 2 and resent < 1024 * 1024):
+        raise SystemExit("FALLO: la descarga no se reanudó correctamente")
+
+    src = make_file(os.path.join(tmp, "srv", "cambia.bin"), size)
+    service = FlakyTransferService(os.path.dirname(src), cut_at=size // 2)
+    server, addr = start_server(service)
+    cut_ok, _ = download_file(addr, "cambia.bin", retries=0)
+    make_file(src, size)  # nueva versión, mismo tamaño
+    ok, msg = download_file(addr, "cambia.bin")
+    server.stop(0)
+    changed = ok and sha256(os.path.join(dest_dir, "cambia.bin")) == sha256(src)
+    print(f"archivo cambiado entre intentos: primer intento ok={cut_ok}  msg={msg}  "
+          f"bytes del segundo={service.bytes_sent - size // 2}  contenido = versión nueva: {changed}")
+    if cut_ok or not changed:
+        raise SystemExit("FALLO: se reanudó sobre una versión distinta del archivo")
+    print("OK: la descarga se reanudó desde el último offset verificado")
+
+
+if __name__ == "__main__":
+    main()
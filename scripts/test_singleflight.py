@@ -0,0 +1,83 @@
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+from utils.grpc_bench import fake_directory, start_server, make_file
+
+from services.file_simple.service import set_base_directory
+from services.directory_simple.service import set_self_address
+from services.transfer_runtime.api import transfer_download
+from services.transfer_runtime.grpc_transfer import TransferService
+from services.transfer_runtime.scheduler import configure_scheduler
+
+# Lanza CONCURRENT llamadas a /transfer/download por el mismo archivo (como
+# test_concurrency.py) y verifica que se haga una sola búsqueda y un solo Download
+# gRPC, que todas reciban el mismo resultado y que el archivo destino quede íntegro.
+# El propietario es un TransferService real; su /directory/search es un endpoint
+# mínimo que responde "encontrado" y cuenta los pedidos.
+
+CONCURRENT = 8
+FILE_MB = 32
+
+
+class CountingTransferService(TransferService):
+    def __init__(self, base_dir: str):
+        super().__init__(base_dir)
+        self.downloads = 0
+
+    def Download(self, request, context):
+        self.downloads += 1
+        yield from super().Download(request, context)
+
+
+def sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def main():
+    concurrent = int(sys.argv[1]) if len(sys.argv) > 1 else CONCURRENT
+    tmp = tempfile.mkdtemp(prefix="sflight_")
+    src = make_file(os.path.join(tmp, "owner", "grande.bin"), FILE_MB * 2**20)
+    # Descarga de ~0.5 s para que los pedidos se superpongan
+    configure_scheduler(node_rate=64 * 2**20)
+    service = CountingTransferService(os.path.dirname(src))
+    searches: list = []
+    httpd, rest_port = fake_directory({"found": True, "owner_id": "owner"}, searches)
+    server, _ = start_server(service, port=rest_port + 1000)
+
+    dest_dir = os.path.join(tmp, "cliente")
+    set_base_directory(dest_dir)
+    set_self_address(f"127.0.0.1:{rest_port}")
+
+    barrier = threading.Barrier(concurrent)
+    results = []
+    def call():
+        barrier.wait()
+        results.append(transfer_download({"filename": "grande.bin", "ttl": 3}))
+    threads = [threading.Thread(target=call) for _ in range(concurrent)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.stop(0)
+    httpd.shutdown()
+
+    ok = all(r.get("download_ok") for r in results)
+    coalesced = sum(1 for r in results if r.get("coalesced"))
+    intact = sha256(os.path.join(dest_dir, "grande.bin")) == sha256(src)
+    print(f"{concurrent} pedidos concurrentes de grande.bin ({FILE_MB} MB)")
+    print(f"búsquedas enviadas: {len(searches)}  Downloads gRPC servidos: {service.downloads}  "
+          f"respuestas compartidas: {coalesced}/{concurrent}")
+    print(f"todos download_ok: {ok}  archivo íntegro: {intact}")
+    passed = ok and intact and len(searches) == 1 and service.downloads == 1
+    print("OK" if passed else "FALLA")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import subprocess
+import yaml
+from utils.test_utils import wait_ready
+from utils.http_client import post_json as http_post, get as http_get
+
+# Reinicio en caliente con la DL persistida (dl_store). Dos nodos reales (simple_main.py
+# en subprocesos): B se une a A y guarda su DL. Se mata B (SIGKILL, sin apagado
+# ordenado) y se lo reinicia dos veces: sin persistencia B arranca solo y no encuentra
+# el archivo de A; con persistencia recarga la DL, prueba a A en paralelo y vuelve a
+# buscar en ambos sentidos sin ningún /directory/join.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMPLE_MAIN = os.path.join(ROOT, "simple_main.py")
+SAVE_INTERVAL_S = 0.5
+REJOIN_LIMIT_MS = 100
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_node(base: str, name: str, dl_path: str) -> dict:
+    files_dir = os.path.join(base, name)
+    os.makedirs(files_dir, exist_ok=True)
+    with open(os.path.join(files_dir, f"{name}.txt"), "w") as f:
+        f.write(f"archivo de {name}")
+    port = free_port()
+    cfg = {"peer_id": name, "ip": "127.0.0.1", "rest_port": port, "grpc_port": free_port(),
+           "files_directory": files_dir, "dl_store": {"path": dl_path, "interval_s": SAVE_INTERVAL_S}}
+    path = os.path.join(base, f"{name}.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f)
+    return {"name": name, "port": port, "config": path, "addr": f"127.0.0.1:{port}"}
+
+
+def start(node: dict) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, SIMPLE_MAIN, "--config", node["config"]], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_ready(node["port"]):
+        proc.kill()
+        raise RuntimeError(f"{node['name']} no arrancó")
+    http_post(f"http://127.0.0.1:{node['port']}/indexar")
+    return proc
+
+
+def dl_info(node: dict) -> dict:
+    _, txt = http_get(f"http://127.0.0.1:{node['port']}/directory/dl")
+    return json.loads(txt)
+
+
+def found(node: dict, filename: str) -> bool:
+    _, txt = http_post(f"http://127.0.0.1:{node['port']}/directory/search", {"filename": filename, "ttl": 3})
+    return bool(json.loads(txt).get("found"))
+
+
+def wait_neighbor(node: dict, addr: str, timeout: float = 5.0) -> float:
+    """Espera a que 'addr' aparezca en la DL de 'node'; retorna los ms desde que respondió, o -1."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if addr in dl_info(node).get("dl", []):
+            return (time.perf_counter() - t0) * 1000
+        time.sleep(0.005)
+    return -1.0
+
+
+def main():
+    base = tempfile.mkdtemp(prefix="warm_restart_")
+    dl_path = os.path.join(base, "state", "dl_b.json")
+    a = write_node(base, "a", os.path.join(base, "state", "dl_a.json"))
+    b = write_node(base, "b", dl_path)
+    b_cold = dict(b, config=os.path.join(base, "b_cold.yaml"))
+    with open(b["config"], "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg["dl_store"] = {"path": ""}
+    with open(b_cold["config"], "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f)
+
+    procs = [start(a)]
+    ok = True
+    try:
+        pb = start(b)
+        procs.append(pb)
+        st, txt = http_post(f"http://127.0.0.1:{b['port']}/directory/join", {"target": a["addr"]})
+        print("join inicial b→a:", st, json.loads(txt).get("dl"))
+        time.sleep(3 * SAVE_INTERVAL_S)
+        with open(dl_path, "r", encoding="utf-8") as f:
+            print("DL persistida de b:", [n["address"] for n in json.load(f)["neighbors"]])
+
+        # Reinicio sin persistencia: b arranca solo
+        pb.kill()
+        pb.wait()
+        pb = start(b_cold)
+        procs.append(pb)
+        cold = found(b, "a.txt")
+        print(f"[sin persistencia] DL de b={dl_info(b)['dl']}  b encuentra a.txt: {cold}")
+        pb.kill()
+        pb.wait()
+
+        # Reinicio con la DL persistida
+        pb = start(b)
+        procs.append(pb)
+        wait_ms = wait_neighbor(b, a["addr"])
+        info = dl_info(b)
+        rejoin = info.get("rejoin") or {}
+        b_to_a, a_to_b = found(b, "a.txt"), found(a, "b.txt")
+        print(f"[con persistencia] DL de b={info['dl']}  rejoin: probados={rejoin.get('probed')} "
+              f"vivos={rejoin.get('alive')} en {rejoin.get('ms')} ms (visible {max(wait_ms, 0):.0f} ms tras arrancar)")
+        print(f"búsquedas: b→a.txt {b_to_a}  a→b.txt {a_to_b}")
+        ok = (not cold and wait_ms >= 0 and b_to_a and a_to_b
+              and float(rejoin.get("ms") or 1e9) <= REJOIN_LIMIT_MS)
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+                p.wait()
+    print(f"reincorporación en menos de {REJOIN_LIMIT_MS} ms y búsquedas en ambos sentidos")
+    print("OK" if ok else "FALLA")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
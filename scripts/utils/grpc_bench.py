@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent import futures
+from typing import Dict, List, Optional, Tuple
+
+# Utilidades para benchmarks con servidores gRPC de transferencia dentro del mismo proceso.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import grpc  # noqa: E402
+from services.transfer_runtime.grpc_transfer import add_transfer_servicer  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(servicer, port: Optional[int] = None, max_workers: int = 16, options=None):
+    """Levanta un servidor gRPC con 'servicer' y devuelve (server, 'ip:port')."""
+    port = port or free_port()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=options or [])
+    add_transfer_servicer(servicer, server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def make_file(path: str, size: int, compressible: bool = False) -> str:
+    """Crea un archivo de 'size' bytes (aleatorio o texto repetitivo)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    block = 1024 * 1024
+    line = b"Lorem ipsum dolor sit amet, consectetur adipiscing elit. 0123456789\n"
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            n = min(block, size - written)
+            f.write((line * (n // len(line) + 1))[:n] if compressible else os.urandom(n))
+            written += n
+    return path
+
+
+def fake_directory(response: Dict, counter: Optional[List] = None) -> Tuple[ThreadingHTTPServer, int]:
+    """Endpoint mínimo de /directory/search que siempre responde 'response'.
+
+    Se levanta en un puerto REST cuyo puerto+1000 está libre, para servir ahí el
+    gRPC del propietario; si 'response' no trae "address" se completa con la propia.
+    Retorna (servidor http, puerto REST).
+    """
+    response = dict(response)
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if counter is not None:
+                counter.append(1)
+            body = json.dumps({"success": True, **response}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    while True:
+        grpc_port = free_port()
+        try:
+            httpd = ThreadingHTTPServer(("127.0.0.1", grpc_port - 1000), Handler)
+            break
+        except OSError:
+            continue
+    response.setdefault("address", f"127.0.0.1:{grpc_port - 1000}")
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, grpc_port - 1000
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import random
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+# Simulación en un solo proceso de una red de nodos directory_simple.
+# Cada nodo conserva su propio estado (DL, id, historial de queries, archivos) y se
+# "activa" intercambiando las variables de módulo de services.directory_simple.service
+# antes de ejecutar el código real (start_search / handle_query). Las llamadas HTTP
+# salientes (_post_json) se despachan al nodo destino dentro del mismo proceso.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services.directory_simple import service as dsvc  # noqa: E402
+
+
+class SimNode:
+    def __init__(self, addr: str, peer_id: str):
+        self.addr = addr
+        self.peer_id = peer_id
+        self.dl: List[str] = [addr]
+        self.files: Set[str] = set()
+        self.history = deque(maxlen=5)
+        self.received = 0
+
+
+class SimNetwork:
+    def __init__(self, strip_visited: bool = False):
+        self.nodes: Dict[str, SimNode] = {}
+        self.strip_visited = strip_visited
+        self.messages = 0
+        self._current: Optional[SimNode] = None
+
+    # ---- construcción de topologías ----
+    def add_node(self, idx: int) -> SimNode:
+        addr = f"10.0.{idx // 250}.{idx % 250 + 1}:5000"
+        node = SimNode(addr, f"peer_{idx:03d}")
+        self.nodes[addr] = node
+        return node
+
+    def link(self, a: SimNode, b: SimNode) -> None:
+        if b.addr not in a.dl:
+            a.dl.append(b.addr)
+        if a.addr not in b.dl:
+            b.dl.append(a.addr)
+
+    @classmethod
+    def ring(cls, n: int, **kw) -> "SimNetwork":
+        net = cls(**kw)
+        nodes = [net.add_node(i) for i in range(n)]
+        for i in range(n):
+            net.link(nodes[i], nodes[(i + 1) % n])
+        return net
+
+    @classmethod
+    def random_regular(cls, n: int, degree: int, seed: int = 7, **kw) -> "SimNetwork":
+        """Anillo + cuerdas aleatorias hasta ~degree vecinos por nodo (muchos ciclos)."""
+        net = cls.ring(n, **kw)
+        rnd = random.Random(seed)
+        nodes = list(net.nodes.values())
+        for node in nodes:
+            tries = 0
+            while len(node.dl) - 1 < degree and tries < 50:
+                other = rnd.choice(nodes)
+                tries += 1
+                if other is node or other.addr in node.dl or len(other.dl) - 1 >= degree:
+                    continue
+                net.link(node, other)
+        return net
+
+    # ---- ejecución ----
+    def _activate(self, node: SimNode):
+        prev = (dsvc._DL, dsvc._SELF_ADDR, dsvc._SELF_ID, dsvc._QUERY_HISTORY, self._current)
+        dsvc._DL = node.dl
+        dsvc._SELF_ADDR = node.addr
+        dsvc._SELF_ID = node.peer_id
+        dsvc._QUERY_HISTORY = node.history
+        self._current = node
+        return prev
+
+    def _restore(self, prev) -> None:
+        dsvc._DL, dsvc._SELF_ADDR, dsvc._SELF_ID, dsvc._QUERY_HISTORY, self._current = prev
+
+    def _local_entry(self, filename: str) -> Optional[Dict]:
+        if self._current is None or filename not in self._current.files:
+            return None
+        return {"filename": filename, "path": filename, "size": 0}
+
+    def _post_json(self, url: str, payload: Dict, timeout: int = 6):
+        rest = url.split("://", 1)[1]
+        addr, path = rest.split("/", 1)
+        node = self.nodes.get(addr)
+        if node is None:
+            raise ConnectionError(f"nodo inexistente: {addr}")
+        self.messages += 1
+        node.received += 1
+        payload = dict(payload)
+        if self.strip_visited:
+            payload.pop("visited", None)
+        prev = self._activate(node)
+        try:
+            result = self.dispatch("/" + path, payload)
+        finally:
+            self._restore(prev)
+        if self.strip_visited:
+            result.pop("visited", None)
+        return 200, json.dumps({"success": True, **result})
+
+    def dispatch(self, path: str, payload: Dict) -> Dict:
+        if path == "/directory/query" and payload.get("filter") is not None:
+            return dsvc.handle_metadata_query(payload.get("query_id"), payload.get("filter"), int(payload.get("ttl", 0)),
+                                              payload.get("origin"), payload.get("visited"),
+                                              int(payload.get("max_results", 1)), int(payload.get("per_peer", 1)))
+        if path == "/directory/query":
+            return dsvc.handle_query(payload.get("query_id"), payload.get("filename"), int(payload.get("ttl", 0)),
+                                     payload.get("origin"), payload.get("visited"),
+                                     int(payload.get("max_results", 1)))
+        if path == "/directory/leaf/index":
+            return dsvc.receive_leaf_index(payload)
+        raise ValueError(f"ruta no simulada: {path}")
+
+    def install(self) -> None:
+        dsvc._post_json = self._post_json
+        dsvc._local_entry = self._local_entry
+
+    def search(self, from_node: SimNode, filename: str, ttl: int = 3) -> Dict:
+        """Ejecuta start_search como 'from_node'. Devuelve el resultado más métricas de mensajes."""
+        for node in self.nodes.values():
+            node.received = 0
+        before = self.messages
+        prev = self._activate(from_node)
+        try:
+            result = dsvc.start_search(filename, ttl)
+        finally:
+            self._restore(prev)
+        sent = self.messages - before
+        reached = sum(1 for n in self.nodes.values() if n.received > 0)
+        return {"result": result, "messages": sent, "reached": reached, "redundant": sent - reached}
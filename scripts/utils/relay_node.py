@@ -0,0 +1,73 @@
+import json
+import time
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+import utils.overlay_sim  # noqa: F401  (agrega la raíz del repo a sys.path)
+from services.file_simple.api import app
+from services.file_simple.service import indexar, set_base_directory
+from services.directory_simple.service import login_from, set_self_address
+
+# Nodo real (FastAPI + uvicorn en un hilo) cuyo único vecino es un peer HTTP lento:
+# cada /directory/query reenviada bloquea un hilo del pool durante 'delay_s'. Lo usan
+# las pruebas de control de admisión del relay.
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_slow_peer(delay_s: float) -> ThreadingHTTPServer:
+    class SlowPeer(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(delay_s)
+            body = json.dumps({"success": True, "found": False, "visited": ""}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), SlowPeer)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_node(files_dir: str, neighbor_delay_s: float) -> Tuple[uvicorn.Server, ThreadingHTTPServer, str]:
+    """Levanta el nodo con 'files_dir' indexado y un vecino lento. Retorna (servidor, vecino, ip:port)."""
+    set_base_directory(files_dir)
+    indexar()
+    slow = start_slow_peer(neighbor_delay_s)
+    port = free_port()
+    node = f"127.0.0.1:{port}"
+    set_self_address(node)
+    login_from(f"127.0.0.1:{slow.server_address[1]}")
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, slow, node
+
+
+def post(url: str, payload: Dict, timeout: float = 30) -> Tuple[int, Optional[str]]:
+    """POST JSON; retorna (status, Retry-After) sin lanzar en respuestas de error."""
+    req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            r.read()
+            return r.status, None
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Retry-After")
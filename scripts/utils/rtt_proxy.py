@@ -0,0 +1,96 @@
+import time
+import heapq
+import socket
+import threading
+from typing import List, Tuple
+
+# Proxy TCP que agrega un retardo fijo en cada sentido (RTT emulado) sin limitar el
+# ancho de banda: cada bloque leído se entrega recién cuando vence su retardo, así
+# que en el "cable" puede haber tantos bytes en vuelo como permita el control de
+# flujo de HTTP/2, igual que en un enlace largo real.
+
+
+class _DelayLine:
+    def __init__(self, dst: socket.socket, delay: float):
+        self.dst = dst
+        self.delay = delay
+        self._queue: List[Tuple[float, int, bytes]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def push(self, data: bytes) -> None:
+        with self._cond:
+            heapq.heappush(self._queue, (time.monotonic() + self.delay, self._seq, data))
+            self._seq += 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _writer(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                due = self._queue[0][0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                _, _, data = heapq.heappop(self._queue)
+            try:
+                self.dst.sendall(data)
+            except OSError:
+                break
+        try:
+            self.dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def _pump(src: socket.socket, line: _DelayLine) -> None:
+    try:
+        while True:
+            data = src.recv(256 * 1024)
+            if not data:
+                break
+            line.push(data)
+    except OSError:
+        pass
+    line.close()
+
+
+class RttProxy:
+    """Escucha en 127.0.0.1:<port> y reenvía a 'target' con rtt/2 de retardo por sentido."""
+
+    def __init__(self, target: str, rtt_ms: float):
+        host, port = target.rsplit(":", 1)
+        self.target = (host, int(port))
+        self.delay = rtt_ms / 2000.0
+        self._srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._srv.bind(("127.0.0.1", 0))
+        self._srv.listen(64)
+        self.address = f"127.0.0.1:{self._srv.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._srv.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for s in (client, upstream):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=_pump, args=(client, _DelayLine(upstream, self.delay)), daemon=True).start()
+            threading.Thread(target=_pump, args=(upstream, _DelayLine(client, self.delay)), daemon=True).start()
+
+    def close(self) -> None:
+        self._srv.close()
@@ -0,0 +1,183 @@
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+from services.transfer_runtime.scheduler import TokenBucket
+
+# Control de admisión del relay de queries (/directory/query). Cada query reenviada
+# ocupa un hilo del pool de FastAPI mientras espera a sus vecinos (_post_json), así que
+# una ráfaga de floods podía dejar sin hilos al resto de la API. Acá se limitan las
+# queries en curso a 'relay_slots' y se deja una cola corta ('queue_size') que espera
+# hasta 'queue_timeout_s' en el event loop, sin ocupar hilos; lo que no entra se
+# rechaza al instante con un Retry-After estimado. Las búsquedas locales
+# (/directory/search) no pasan por la cola y, mientras hay alguna en curso, el relay
+# cede slots (hasta la mitad) para que no compitan con el tráfico ajeno.
+# Reparto por origen de la query (el nodo que inició el flood): cada origen tiene un
+# token bucket de 'origin_rate' queries/s (429 al agotarlo) y la cola es round-robin
+# entre orígenes; con la cola llena se descarta la última query del origen que más
+# encoló, así un origen charlatán no puede desplazar a los demás.
+# El origen lo declara el emisor en la query y no se puede verificar: la API lo combina
+# con el host TCP del vecino que la reenvió ("host/origen"), así nadie agota el bucket
+# de otro origen desde un host distinto, pero un emisor que inventa orígenes sí obtiene
+# buckets y turnos nuevos. Por eso ambos límites están desactivados por defecto (0) y
+# se activan desde la sección 'admission' del YAML.
+# Todos los métodos se llaman desde el event loop de la API.
+
+DEFAULT_RELAY_SLOTS = 0  # 0 = sin límite (recomendado: 8)
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_QUEUE_TIMEOUT_S = 2.0
+DEFAULT_ORIGIN_RATE = 0.0  # queries/s por origen (0 = sin límite; recomendado: 5)
+DEFAULT_ORIGIN_BURST = 10.0
+MAX_TRACKED_ORIGINS = 1024
+MAX_RETRY_AFTER_S = 30
+EWMA_ALPHA = 0.2
+
+class AdmissionController:
+    def __init__(self, relay_slots: int = DEFAULT_RELAY_SLOTS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 queue_timeout_s: float = DEFAULT_QUEUE_TIMEOUT_S, origin_rate: float = DEFAULT_ORIGIN_RATE,
+                 origin_burst: float = DEFAULT_ORIGIN_BURST):
+        self.relay_slots = max(0, int(relay_slots))
+        self.queue_size = max(0, int(queue_size))
+        self.queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self.origin_rate = max(0.0, float(origin_rate))
+        self.origin_burst = max(1.0, float(origin_burst))
+        self._active = 0
+        self._local = 0
+        # origen -> queries en espera; el primero es el próximo en turno (round-robin)
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._waiting = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._service_s = 0.05  # duración media (EWMA) de una query reenviada
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.limited = 0
+
+    def _capacity(self) -> int:
+        return self.relay_slots - min(self._local, self.relay_slots // 2)
+
+    def retry_after(self) -> int:
+        """Segundos sugeridos para reintentar: lo que tardaría en vaciarse la cola actual."""
+        wait = self._service_s * (self._waiting + 1) / max(1, self.relay_slots)
+        return int(min(MAX_RETRY_AFTER_S, max(1, math.ceil(wait))))
+
+    def _bucket(self, origin: str) -> TokenBucket:
+        bucket = self._buckets.get(origin)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_ORIGINS:
+                # Se olvidan los orígenes con el bucket lleno (sin actividad reciente)
+                now = time.monotonic()
+                for name, b in list(self._buckets.items()):
+                    b.refill(now)
+                    if b.tokens >= b.burst:
+                        del self._buckets[name]
+            bucket = self._buckets[origin] = TokenBucket(self.origin_rate, self.origin_burst)
+        return bucket
+
+    def _drop(self, origin: str, fut: asyncio.Future) -> None:
+        queue = self._queues.get(origin)
+        if queue is not None and fut in queue:
+            queue.remove(fut)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[origin]
+
+    def _make_room(self, origin: str) -> bool:
+        """Con la cola llena descarta la última query del origen que más encoló, si encoló
+        más que 'origin'. Retorna False si no hay lugar para 'origin'."""
+        if self._waiting < self.queue_size:
+            return True
+        if not self._queues:
+            return False
+        victim = max(self._queues, key=lambda o: len(self._queues[o]))
+        if len(self._queues[victim]) <= len(self._queues.get(origin, ())) + 1:
+            return False
+        fut = self._queues[victim][-1]
+        self._drop(victim, fut)
+        fut.set_result(False)
+        return True
+
+    async def acquire(self, origin: str = "") -> Optional[Tuple[int, int]]:
+        """Pide un slot de relay para una query de 'origin'. Retorna None si se admitió
+        (llamar a release al terminar) o (status, Retry-After en s): 429 si el origen superó
+        su tasa, 503 si el nodo está saturado."""
+        if self.origin_rate > 0:
+            bucket = self._bucket(origin)
+            bucket.refill(time.monotonic())
+            if not bucket.ready():
+                self.limited += 1
+                return 429, int(min(MAX_RETRY_AFTER_S, max(1, math.ceil(bucket.wait_time()))))
+            bucket.consume(1)
+        if self.relay_slots == 0 or (not self._waiting and self._active < self._capacity()):
+            self._active += 1
+            self.admitted += 1
+            return None
+        if not self._make_room(origin):
+            self.shed += 1
+            return 503, self.retry_after()
+        fut = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(origin, deque()).append(fut)
+        self._waiting += 1
+        self.queued += 1
+        try:
+            admitted = await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            # El slot pudo haberse concedido justo al vencer la espera
+            admitted = fut.result() if fut.done() else False
+            self._drop(origin, fut)
+        except asyncio.CancelledError:
+            if fut.done() and fut.result():
+                self.release(0.0)
+            self._drop(origin, fut)
+            raise
+        if not admitted:
+            self.shed += 1
+            return 503, self.retry_after()
+        self.admitted += 1
+        return None
+
+    def release(self, elapsed_s: float) -> None:
+        self._active -= 1
+        if elapsed_s > 0:
+            self._service_s += EWMA_ALPHA * (elapsed_s - self._service_s)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiting and self._active < self._capacity():
+            origin, queue = next(iter(self._queues.items()))
+            fut = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(origin)
+            else:
+                del self._queues[origin]
+            if not fut.done():
+                self._active += 1
+                fut.set_result(True)
+
+    def local_begin(self) -> None:
+        """Una búsqueda local empieza: el relay cede un slot mientras dure."""
+        self._local += 1
+
+    def local_end(self) -> None:
+        self._local -= 1
+        self._wake()
+
+    def stats(self) -> Dict[str, object]:
+        return {"relay_slots": self.relay_slots, "active": self._active, "queued_now": self._waiting,
+                "queued_origins": len(self._queues), "local_searches": self._local, "origin_rate": self.origin_rate,
+                "admitted": self.admitted, "queued": self.queued, "shed": self.shed, "limited": self.limited,
+                "service_ms": round(self._service_s * 1000, 1)}
+
+_ADMISSION = AdmissionController()
+
+def get_admission() -> AdmissionController:
+    return _ADMISSION
+
+def configure_admission(relay_slots: int = DEFAULT_RELAY_SLOTS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                        queue_timeout_s: float = DEFAULT_QUEUE_TIMEOUT_S, origin_rate: float = DEFAULT_ORIGIN_RATE,
+                        origin_burst: float = DEFAULT_ORIGIN_BURST) -> AdmissionController:
+    global _ADMISSION
+    _ADMISSION = AdmissionController(relay_slots, queue_size, queue_timeout_s, origin_rate, origin_burst)
+    return _ADMISSION
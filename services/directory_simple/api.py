@@ -1,14 +1,28 @@
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from typing import Dict
 
 from services.directory_simple.service import (
     login_from,
     start_search,
     handle_query,
+    start_metadata_search,
+    handle_metadata_query,
+    DEFAULT_METADATA_RESULTS,
     get_all,
     get_self_address,
     join_with,
+    receive_leaf_index,
+    snapshot_dl,
+    get_rejoin_info,
 )
+from services.directory_simple.dl_store import get_dl_store
+from services.directory_simple.admission import get_admission
+from services.directory_simple.routing import get_routing
+from services.file_simple.service import DEFAULT_MATCHES, normalizar_filtro
+from services.directory_simple.superpeer import ROLE_LEAF, ROLE_SUPER, get_role, get_leaf_index, get_uplink
 
 router = APIRouter(prefix="/directory", tags=["directory_simple"])
 
@@ -25,58 +39,165 @@ def login(payload: Dict[str, str]):
     dl = login_from(address)
     return {"success": True, "dl": dl}
 
-@router.post("/search")
-def search(payload: Dict[str, object]):
-    """
-    Inicia una búsqueda floodeada con TTL (default 3).
-    Body: { "filename": "...", "ttl": 3 }
-    Retorna: { found: bool, owner_id?: str, address?: str }
-    """
+def _search(payload: Dict[str, object]):
+    if isinstance(payload, dict) and payload.get("filter") is not None:
+        try:
+            filtro = normalizar_filtro(payload.get("filter"))
+            ttl = int(payload.get("ttl", 3))
+            max_results = int(payload.get("max_results", DEFAULT_METADATA_RESULTS))
+            per_peer = int(payload.get("per_peer", DEFAULT_MATCHES))
+        except (TypeError, ValueError) as e:
+            return {"success": False, "error": str(e)}
+        return {"success": True, **start_metadata_search(filtro, ttl, max_results, per_peer)}
     filename = ""
     ttl = 3
+    max_results = 1
     if isinstance(payload, dict):
         filename = str(payload.get("filename", "") or "")
         try:
             ttl = int(payload.get("ttl", 3))
         except Exception:
             ttl = 3
+        try:
+            max_results = int(payload.get("max_results", 1))
+        except Exception:
+            max_results = 1
     if not filename:
         return {"success": False, "error": "filename requerido"}
-    result = start_search(filename, ttl)
+    result = start_search(filename, ttl, max_results)
     return {"success": True, **result}
 
-@router.post("/query")
-def relay_query(payload: Dict[str, object]):
+@router.post("/search")
+async def search(payload: Dict[str, object]):
     """
-    Maneja una consulta de búsqueda recibida desde otro nodo.
-    Body: { "query_id": str, "filename": str, "ttl": int, "origin": "ip:port" }
-    Retorna: { found: bool, owner_id?: str, address?: str }
+    Inicia una búsqueda floodeada con TTL (default 3).
+    Body: { "filename": "...", "ttl": 3, "max_results"?: int }
+    Retorna: { found: bool, owner_id?: str, address?: str, size?: int, holders?: [...] }
+    Por metadata: { "filter": {...} | "ext:pdf size>100MB age<7d", "ttl": 3, "max_results"?: int (default 50),
+                    "per_peer"?: int (default 10) }
+    Retorna: { found: bool, matches: [{owner_id, address, filename, size, mtime}] }
     """
+    # Las búsquedas locales no esperan en la cola del relay y le quitan slots mientras corren
+    admission = get_admission()
+    admission.local_begin()
+    try:
+        return await run_in_threadpool(_search, payload)
+    finally:
+        admission.local_end()
+
+def _relay_query(payload: Dict[str, object]):
     qid = str(payload.get("query_id", "") or "")
+    origin = payload.get("origin")
+    visited = payload.get("visited")
+    if payload.get("filter") is not None:
+        try:
+            filtro = normalizar_filtro(payload.get("filter"))
+            ttl = int(payload.get("ttl", 0))
+            max_results = int(payload.get("max_results", DEFAULT_METADATA_RESULTS))
+            per_peer = int(payload.get("per_peer", DEFAULT_MATCHES))
+        except (TypeError, ValueError) as e:
+            return {"success": False, "error": str(e)}
+        if not qid:
+            return {"success": False, "error": "query_id requerido"}
+        result = handle_metadata_query(qid, filtro, ttl, origin if isinstance(origin, str) else None,
+                                       visited if isinstance(visited, str) else None, max_results, per_peer)
+        return {"success": True, **result}
     filename = str(payload.get("filename", "") or "")
     try:
         ttl = int(payload.get("ttl", 0))
     except Exception:
         ttl = 0
-    origin = payload.get("origin")
+    try:
+        max_results = int(payload.get("max_results", 1))
+    except Exception:
+        max_results = 1
     if not qid or not filename:
         return {"success": False, "error": "query_id y filename requeridos"}
-    result = handle_query(qid, filename, ttl, origin if isinstance(origin, str) else None)
+    result = handle_query(qid, filename, ttl, origin if isinstance(origin, str) else None, visited if isinstance(visited, str) else None, max_results)
     return {"success": True, **result}
 
+@router.post("/query")
+async def relay_query(payload: Dict[str, object], request: Request):
+    """
+    Maneja una consulta de búsqueda recibida desde otro nodo.
+    Body: { "query_id": str, "filename": str, "ttl": int, "origin": "ip:port", "visited"?: hex, "max_results"?: int }
+    Retorna: { found: bool, owner_id?: str, address?: str, holders?: [...], visited?: hex }
+    Con "filter" (y "per_peer") es una búsqueda por metadata: retorna { found, matches, visited }.
+    Si el origen superó su tasa de queries responde 429, y si el nodo está saturado 503,
+    ambos con Retry-After (y retry_after en el cuerpo).
+    """
+    admission = get_admission()
+    origin = payload.get("origin") if isinstance(payload, dict) else None
+    # El "origin" lo declara quien envía la query: se combina con el host TCP del vecino
+    # que la reenvió para que nadie agote el bucket de un origen desde otro host
+    relay = request.client.host if request.client else ""
+    rejected = await admission.acquire(f"{relay}/{origin if isinstance(origin, str) else ''}")
+    if rejected is not None:
+        status, retry_after = rejected
+        error = "límite de queries de este origen" if status == 429 else "nodo saturado"
+        return JSONResponse(status_code=status, headers={"Retry-After": str(retry_after)},
+                            content={"success": False, "error": error, "retry_after": retry_after})
+    t0 = time.monotonic()
+    try:
+        return await run_in_threadpool(_relay_query, payload)
+    finally:
+        admission.release(time.monotonic() - t0)
+
+@router.get("/admission")
+def admission_stats():
+    """
+    Estado del control de admisión del relay: slots, cola y queries admitidas/rechazadas.
+    """
+    return {"success": True, **get_admission().stats()}
+
 @router.get("/dl")
 def get_dl():
     """
-    Devuelve la DL local actual de este nodo y su propia dirección.
-    Respuesta: { success: true, self: "ip:port"|null, dl: ["ip:port", ...] }
+    Devuelve la DL local actual de este nodo y su propia dirección, con el puntaje y
+    último contacto de cada vecino, la persistencia y la última reincorporación al arrancar.
+    Respuesta: { success: true, self: "ip:port"|null, dl: ["ip:port", ...], neighbors, store, rejoin }
     """
     try:
         dl = get_all()
         self_addr = get_self_address()
-        return {"success": True, "self": self_addr, "dl": dl}
+        return {"success": True, "self": self_addr, "dl": dl, "neighbors": snapshot_dl(),
+                "store": get_dl_store().stats(), "rejoin": get_rejoin_info()}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@router.get("/routes")
+def get_routes():
+    """
+    Estado de la tabla de ruteo aprendida de este nodo.
+    Respuesta: { success: true, files, routes, hits, misses }
+    """
+    return {"success": True, **get_routing().stats()}
+
+@router.post("/leaf/index")
+def leaf_index(payload: Dict[str, object]):
+    """
+    Recibe el índice de una hoja (solo en super-peers).
+    Body completo: { address, owner_id, version, full: true, files: {filename: size}, substitute?, replica? }
+    Body delta: { address, owner_id, version, base_version, added: {filename: size}, removed: [filename], substitute?, replica? }
+    Retorna: { success: bool, version?: int, resync?: bool } (resync = mandar el índice completo)
+    """
+    if not isinstance(payload, dict):
+        return {"success": False, "error": "payload inválido"}
+    return receive_leaf_index(payload)
+
+@router.get("/superpeer")
+def superpeer_stats():
+    """
+    Rol del nodo en el modo jerárquico y su estado: índices guardados (super) o super-peer activo (leaf).
+    """
+    role = get_role()
+    info: Dict[str, object] = {"success": True, "role": role}
+    if role == ROLE_SUPER:
+        info.update(get_leaf_index().stats())
+    elif role == ROLE_LEAF:
+        info.update(get_uplink().stats())
+    return info
+
 @router.post("/join")
 def join(payload: Dict[str, str]):
     """
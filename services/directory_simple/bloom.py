@@ -0,0 +1,42 @@
+import hashlib
+from typing import Iterable, Optional
+
+# Filtro de Bloom compacto para marcar las direcciones ya visitadas por una query.
+# 256 bits (64 caracteres hex) y 3 funciones hash: con el tamaño de DL actual
+# (máx. 3 direcciones por nodo) la tasa de falsos positivos es despreciable
+# incluso con decenas de nodos en el camino.
+BLOOM_BITS = 256
+BLOOM_HASHES = 3
+
+class VisitedFilter:
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    @classmethod
+    def from_hex(cls, value: Optional[str]) -> "VisitedFilter":
+        """Reconstruye el filtro desde el payload; valores inválidos equivalen a un filtro vacío."""
+        if not value or not isinstance(value, str):
+            return cls()
+        try:
+            return cls(int(value, 16) & ((1 << BLOOM_BITS) - 1))
+        except ValueError:
+            return cls()
+
+    def to_hex(self) -> str:
+        return format(self.bits, f"0{BLOOM_BITS // 4}x")
+
+    @staticmethod
+    def _positions(address: str) -> Iterable[int]:
+        digest = hashlib.blake2b(address.encode("utf-8"), digest_size=4 * BLOOM_HASHES).digest()
+        for i in range(BLOOM_HASHES):
+            yield int.from_bytes(digest[4 * i:4 * i + 4], "big") % BLOOM_BITS
+
+    def add(self, address: str) -> None:
+        for pos in self._positions(address):
+            self.bits |= 1 << pos
+
+    def __contains__(self, address: str) -> bool:
+        return all(self.bits >> pos & 1 for pos in self._positions(address))
+
+    def merge(self, other: "VisitedFilter") -> None:
+        self.bits |= other.bits
@@ -0,0 +1,95 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Persistencia de la DL en disco: los vecinos con su puntaje y último contacto se
+# guardan en un JSON (escritura atómica: archivo temporal + fsync + os.replace) cada
+# 'interval_s' si cambiaron y al apagar el nodo. Al arrancar, simple_main.py lo
+# recarga y service.rejoin_on_boot prueba los vecinos en paralelo, así un nodo
+# reiniciado vuelve a entrar a la red sin un /directory/join manual.
+
+DEFAULT_INTERVAL_S = 5.0
+FORMAT_VERSION = 1
+
+class DLStore:
+    def __init__(self, path: str = "", interval_s: float = DEFAULT_INTERVAL_S):
+        self.path = path
+        self.interval_s = max(0.1, float(interval_s))
+        self._last: Optional[str] = None  # último contenido escrito
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.saves = 0
+        self.loaded = 0
+
+    def load(self) -> List[Dict]:
+        """Vecinos persistidos ([{address, score, last_seen}]); lista vacía si no hay archivo o es inválido."""
+        if not self.path or not os.path.isfile(self.path):
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        neighbors = data.get("neighbors") if isinstance(data, dict) else None
+        if not isinstance(neighbors, list):
+            return []
+        out = [n for n in neighbors if isinstance(n, dict) and isinstance(n.get("address"), str)]
+        self.loaded = len(out)
+        return out
+
+    def save(self, self_address: str, neighbors: List[Dict]) -> bool:
+        """Escribe la DL si cambió desde la última escritura. Retorna True si escribió."""
+        if not self.path:
+            return False
+        content = json.dumps({"version": FORMAT_VERSION, "self": self_address, "neighbors": neighbors},
+                             sort_keys=True)
+        if content == self._last:
+            return False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".dl-", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError:
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        self._last = content
+        self.saves += 1
+        return True
+
+    def start(self, snapshot: Callable[[], Tuple[str, List[Dict]]]) -> None:
+        """Guarda periódicamente lo que retorna snapshot() -> (dirección propia, vecinos)."""
+        if not self.path or self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(self.interval_s):
+                self.save(*snapshot())
+
+        self._thread = threading.Thread(target=loop, name="dl-store", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {"path": self.path, "interval_s": self.interval_s, "saves": self.saves, "loaded": self.loaded}
+
+_STORE = DLStore()
+
+def get_dl_store() -> DLStore:
+    return _STORE
+
+def configure_dl_store(path: str = "", interval_s: float = DEFAULT_INTERVAL_S) -> DLStore:
+    global _STORE
+    _STORE.stop()
+    _STORE = DLStore(path, interval_s)
+    return _STORE
@@ -0,0 +1,64 @@
+import math
+import time
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Popularidad por archivo vista desde este nodo: cada query que encuentra el archivo
+# acá y cada descarga servida suman al puntaje, que decae exponencialmente con vida
+# media 'half_life_s'. La replicación proactiva usa el puntaje para decidir qué
+# archivos empujar a los vecinos y qué réplicas frías descartar.
+
+DEFAULT_HALF_LIFE_S = 600.0
+MAX_TRACKED_FILES = 10000
+
+class PopularityTracker:
+    def __init__(self, half_life_s: float = DEFAULT_HALF_LIFE_S, clock: Callable[[], float] = time.monotonic):
+        self.half_life_s = max(1e-3, float(half_life_s))
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._scores: Dict[str, Tuple[float, float]] = {}  # filename -> (puntaje, instante)
+
+    def _decayed(self, score: float, at: float, now: float) -> float:
+        return score * math.pow(0.5, (now - at) / self.half_life_s)
+
+    def record(self, filename: str, weight: float = 1.0) -> float:
+        """Suma 'weight' al puntaje del archivo y retorna el puntaje actualizado."""
+        now = self.clock()
+        with self._lock:
+            score, at = self._scores.get(filename, (0.0, now))
+            score = self._decayed(score, at, now) + weight
+            self._scores[filename] = (score, now)
+            if len(self._scores) > MAX_TRACKED_FILES:
+                self._prune(now)
+            return score
+
+    def score(self, filename: str) -> float:
+        now = self.clock()
+        with self._lock:
+            entry = self._scores.get(filename)
+        return self._decayed(entry[0], entry[1], now) if entry else 0.0
+
+    def top(self, limit: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Hasta 'limit' archivos con puntaje >= min_score, del más al menos popular."""
+        now = self.clock()
+        with self._lock:
+            scored = [(name, self._decayed(s, at, now)) for name, (s, at) in self._scores.items()]
+        scored = [item for item in scored if item[1] >= min_score]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:max(0, int(limit))]
+
+    def _prune(self, now: float) -> None:
+        # Se descarta la mitad menos popular
+        ranked = sorted(self._scores.items(), key=lambda kv: self._decayed(kv[1][0], kv[1][1], now))
+        for name, _ in ranked[:len(ranked) // 2]:
+            del self._scores[name]
+
+_TRACKER = PopularityTracker()
+
+def get_popularity() -> PopularityTracker:
+    return _TRACKER
+
+def configure_popularity(half_life_s: float = DEFAULT_HALF_LIFE_S) -> PopularityTracker:
+    global _TRACKER
+    _TRACKER = PopularityTracker(half_life_s)
+    return _TRACKER
@@ -0,0 +1,97 @@
+import math
+import time
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Tabla de ruteo aprendida: por filename, qué vecinos llevaron a un acierto en
+# búsquedas anteriores y a cuántos saltos detrás de ellos estaba el archivo. Las
+# búsquedas siguientes prueban primero esos vecinos (de mayor a menor puntaje) si
+# el TTL que les llega alcanza para esa distancia, y después el resto como en el
+# flood normal. El puntaje decae con vida media 'half_life_s'; cada fallo de una
+# ruta con TTL suficiente lo reduce y tras 'max_failures' fallos seguidos la ruta
+# se descarta.
+
+DEFAULT_HALF_LIFE_S = 900.0
+DEFAULT_MAX_FAILURES = 2
+MIN_SCORE = 0.05  # por debajo la ruta se considera olvidada
+MAX_ROUTED_FILES = 10000
+
+class RoutingTable:
+    def __init__(self, half_life_s: float = DEFAULT_HALF_LIFE_S, max_failures: int = DEFAULT_MAX_FAILURES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.half_life_s = max(1e-3, float(half_life_s))
+        self.max_failures = max(1, int(max_failures))
+        self.clock = clock
+        self._lock = threading.Lock()
+        # filename -> vecino -> (puntaje, instante, fallos seguidos, saltos detrás del vecino)
+        self._routes: Dict[str, Dict[str, Tuple[float, float, int, int]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _decayed(self, score: float, at: float, now: float) -> float:
+        return score * math.pow(0.5, (now - at) / self.half_life_s)
+
+    def order(self, filename: str, neighbors: List[str], ttl: int) -> List[str]:
+        """Vecinos con ruta aprendida alcanzable con 'ttl' (el que recibe el vecino) primero,
+        de mayor a menor puntaje; el resto en su orden."""
+        now = self.clock()
+        with self._lock:
+            routes = self._routes.get(filename)
+            if not routes:
+                return list(neighbors)
+            scores = {n: self._decayed(s, at, now) for n, (s, at, _, hops) in routes.items() if hops <= ttl}
+        learned = sorted((n for n in neighbors if scores.get(n, 0.0) >= MIN_SCORE), key=lambda n: -scores[n])
+        return learned + [n for n in neighbors if n not in learned]
+
+    def record_hit(self, filename: str, neighbor: str, hops: int = 0) -> None:
+        """El archivo se encontró a 'hops' saltos detrás de 'neighbor'."""
+        now = self.clock()
+        with self._lock:
+            routes = self._routes.setdefault(filename, {})
+            score, at, _, _ = routes.get(neighbor, (0.0, now, 0, 0))
+            routes[neighbor] = (self._decayed(score, at, now) + 1.0, now, 0, max(0, int(hops)))
+            self.hits += 1
+            if len(self._routes) > MAX_ROUTED_FILES:
+                self._prune(now)
+
+    def record_miss(self, filename: str, neighbor: str, ttl: int) -> None:
+        """Una ruta aprendida no encontró el archivo (o el vecino no respondió) aun recibiendo
+        'ttl' suficiente para la distancia aprendida."""
+        now = self.clock()
+        with self._lock:
+            routes = self._routes.get(filename)
+            if not routes or neighbor not in routes or routes[neighbor][3] > ttl:
+                return
+            self.misses += 1
+            score, at, failures, hops = routes[neighbor]
+            score = self._decayed(score, at, now) / 2
+            failures += 1
+            if failures >= self.max_failures or score < MIN_SCORE:
+                del routes[neighbor]
+                if not routes:
+                    del self._routes[filename]
+            else:
+                routes[neighbor] = (score, now, failures, hops)
+
+    def _prune(self, now: float) -> None:
+        # Se olvidan las rutas de la mitad de los archivos con menor puntaje
+        def best(routes: Dict[str, Tuple[float, float, int, int]]) -> float:
+            return max(self._decayed(s, at, now) for s, at, _, _ in routes.values())
+        ranked = sorted(self._routes, key=lambda f: best(self._routes[f]))
+        for filename in ranked[:len(ranked) // 2]:
+            del self._routes[filename]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"files": len(self._routes), "routes": sum(len(r) for r in self._routes.values()),
+                    "hits": self.hits, "misses": self.misses}
+
+_TABLE = RoutingTable()
+
+def get_routing() -> RoutingTable:
+    return _TABLE
+
+def configure_routing(half_life_s: float = DEFAULT_HALF_LIFE_S, max_failures: int = DEFAULT_MAX_FAILURES) -> RoutingTable:
+    global _TABLE
+    _TABLE = RoutingTable(half_life_s, max_failures)
+    return _TABLE
@@ -1,19 +1,47 @@
 from typing import List, Optional, Tuple, Deque, Dict
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
 import random
 import json
+import threading
+import urllib.error
 import urllib.request
-from services.file_simple.service import listar_archivos
+from services.file_simple.service import (
+    DEFAULT_MATCHES,
+    MAX_MATCHES,
+    buscar_archivos,
+    buscar_por_nombre,
+    coincide_filtro,
+    listar_archivos,
+)
+from services.directory_simple.bloom import VisitedFilter
+from services.directory_simple.popularity import get_popularity
+from services.directory_simple.routing import get_routing
+from services.directory_simple.superpeer import ROLE_LEAF, ROLE_SUPER, get_role, get_leaf_index, get_uplink
 import uuid
 
 # Directorio en memoria por proceso (un proceso = un nodo)
 _DL: List[str] = []  # direcciones como "ip:port"
 _SELF_ADDR: Optional[str] = None
 _SELF_ID: Optional[str] = None
+# Protege _DL y _PEERS: los tocan los hilos de la API, los sondeos en paralelo de
+# warm_rejoin y el hilo que persiste la DL (reentrante: login_from -> _ensure_in_dl)
+_DL_LOCK = threading.RLock()
+
+# Puntaje (EWMA de contactos exitosos) y último contacto de los vecinos de la DL;
+# se persisten con la DL (dl_store.py) para la reincorporación tras un reinicio
+_PEERS: Dict[str, Dict[str, float]] = {}
+SCORE_ALPHA = 0.3
+_REJOIN: Dict[str, object] = {}
 
 # Historial simple de queries para deduplicar (guardar últimos 5)
 _QUERY_HISTORY: Deque[str] = deque(maxlen=5)
 
+# Búsquedas por metadata: coincidencias totales a reunir en la red
+DEFAULT_METADATA_RESULTS = 50
+MAX_METADATA_RESULTS = 500
+
 def set_self_address(address: str) -> None:
     """Configura la dirección propia del nodo y la asegura en la DL."""
     global _SELF_ADDR
@@ -27,12 +55,13 @@ def set_self_info(peer_id: str, address: str) -> None:
     set_self_address(address)
 
 def _ensure_in_dl(address: str) -> None:
-    if address not in _DL:
-        _DL.append(address)
-    _enforce_max_size()
+    with _DL_LOCK:
+        if address not in _DL:
+            _DL.append(address)
+        _enforce_max_size()
 
 def _enforce_max_size() -> None:
-    # Máximo 3 direcciones, la propia debe permanecer siempre
+    # Máximo 3 direcciones, la propia debe permanecer siempre (llamar con _DL_LOCK)
     global _DL
     if len(_DL) <= 3:
         return
@@ -43,15 +72,30 @@ def _enforce_max_size() -> None:
         _DL = [_SELF_ADDR] + others
     else:
         _DL = _DL[-3:]
+    for addr in [a for a in _PEERS if a not in _DL]:
+        del _PEERS[addr]
+
+def _note_contact(addr: str, ok: bool) -> None:
+    """Registra un contacto con un vecino de la DL: sube o baja su puntaje y, si respondió,
+    su último contacto."""
+    with _DL_LOCK:
+        if not addr or addr == _SELF_ADDR or addr not in _DL:
+            return
+        info = _PEERS.setdefault(addr, {"score": 1.0, "last_seen": 0.0})
+        info["score"] += SCORE_ALPHA * ((1.0 if ok else 0.0) - info["score"])
+        if ok:
+            info["last_seen"] = time.time()
 
 def login_from(new_address: str) -> List[str]:
     """Agrega la dirección del nuevo nodo a la DL local y retorna la DL local.
     La DL siempre contendrá al menos la dirección propia.
     """
-    _ensure_in_dl(new_address)
-    if _SELF_ADDR is not None:
-        _ensure_in_dl(_SELF_ADDR)
-    return list(_DL)
+    with _DL_LOCK:
+        _ensure_in_dl(new_address)
+        _note_contact(new_address, True)
+        if _SELF_ADDR is not None:
+            _ensure_in_dl(_SELF_ADDR)
+        return list(_DL)
 
 def get_random_addresses(limit: int = 2) -> List[str]:
     """Devuelve hasta 'limit' direcciones random de la DL.
@@ -59,23 +103,50 @@ def get_random_addresses(limit: int = 2) -> List[str]:
     """
     if limit <= 0:
         return []
-    return random.sample(_DL, k=min(limit, len(_DL)))
+    with _DL_LOCK:
+        return random.sample(_DL, k=min(limit, len(_DL)))
 
 def get_all() -> List[str]:
-    return list(_DL)
+    with _DL_LOCK:
+        return list(_DL)
 
 def get_self_address() -> Optional[str]:
     """Devuelve la dirección REST propia (ip:port) si está definida."""
     return _SELF_ADDR
 
-def _has_file(filename: str) -> bool:
+def _local_entry(filename: str) -> Optional[Dict]:
     try:
-        for entry in listar_archivos():
-            if entry.get("filename") == filename:
-                return True
+        return buscar_por_nombre(filename)
     except Exception:
-        pass
-    return False
+        return None
+
+def _has_file(filename: str) -> bool:
+    return _local_entry(filename) is not None
+
+def _self_holder(entry: Dict) -> Dict:
+    return {"owner_id": _SELF_ID or "", "address": _SELF_ADDR or "", "size": int(entry.get("size") or 0)}
+
+def _merge_holders(holders: List[Dict], resp: Dict) -> None:
+    """Agrega a 'holders' los propietarios de una respuesta (sin repetir direcciones)."""
+    if not resp.get("found"):
+        return
+    found = resp.get("holders")
+    if not isinstance(found, list):
+        # Respuesta de un nodo sin soporte de múltiples propietarios
+        found = [{"owner_id": resp.get("owner_id", ""), "address": resp.get("address", ""), "size": resp.get("size", 0)}]
+    known = {h.get("address") for h in holders}
+    for h in found:
+        if isinstance(h, dict) and h.get("address") and h.get("address") not in known:
+            holders.append(h)
+            known.add(h.get("address"))
+
+def _search_result(holders: List[Dict]) -> Dict:
+    """Formato de respuesta: los campos del primer propietario más la lista completa."""
+    if not holders:
+        return {"found": False}
+    first = holders[0]
+    return {"found": True, "owner_id": first.get("owner_id", ""), "address": first.get("address", ""),
+            "size": first.get("size", 0), "holders": holders}
 
 def _post_json(url: str, payload: Dict, timeout: int = 6) -> Tuple[int, str]:
     data = json.dumps(payload).encode("utf-8")
@@ -83,27 +154,170 @@ def _post_json(url: str, payload: Dict, timeout: int = 6) -> Tuple[int, str]:
     with urllib.request.urlopen(req, timeout=timeout) as r:
         return r.status, r.read().decode("utf-8")
 
-def start_search(filename: str, ttl: int = 3) -> Dict:
+def _route_neighbors(filename: str, ttl: int) -> List[str]:
+    """Vecinos a los que propagar una query que les llegará con 'ttl', con las rutas
+    aprendidas para 'filename' primero. Un super-peer propaga solo a otros super-peers."""
+    neighbors = [a for a in get_all() if a != _SELF_ADDR]
+    if get_role() == ROLE_SUPER:
+        index = get_leaf_index()
+        neighbors = [a for a in neighbors if not index.is_leaf(a)]
+    return get_routing().order(filename, neighbors, ttl)
+
+def _leaf_holders(filename: str) -> Dict:
+    """Propietarios de 'filename' entre las hojas de este nodo si es super-peer, como respuesta de query."""
+    if get_role() != ROLE_SUPER:
+        return {"found": False}
+    holders = get_leaf_index().lookup(filename)
+    return {"found": bool(holders), "holders": holders}
+
+def _learn_route(filename: str, addr: str, ttl: int, resp: Dict) -> None:
+    if resp.get("busy"):
+        # Un vecino saturado no dice nada sobre la ruta
+        return
+    if resp.get("found"):
+        get_routing().record_hit(filename, addr, int(resp.get("hops") or 0))
+    else:
+        get_routing().record_miss(filename, addr, ttl)
+
+def start_search(filename: str, ttl: int = 3, max_results: int = 1) -> Dict:
     """Inicia una búsqueda floodeada con TTL entre vecinos de la DL.
     Retorna dict con found(bool), owner_id(str), address(str) si se encuentra.
+    Con max_results > 1 sigue recorriendo la red hasta reunir esa cantidad de
+    propietarios, devueltos en 'holders' (cada uno con owner_id, address y size).
     """
     qid = str(uuid.uuid4())
+    max_results = max(1, int(max_results))
+    holders: List[Dict] = []
     # Tratar local primero
-    if _has_file(filename):
-        return {"found": True, "owner_id": _SELF_ID or "", "address": _SELF_ADDR or ""}
+    entry = _local_entry(filename)
+    if entry is not None:
+        get_popularity().record(filename)
+        holders.append(_self_holder(entry))
+    _merge_holders(holders, _leaf_holders(filename))
+    if len(holders) >= max_results:
+        return _search_result(holders)
 
-    # Propagar a vecinos (excluyendo la propia dirección para evitar llamadas a sí mismo)
-    for addr in [a for a in list(_DL) if a != _SELF_ADDR]:
-        try:
-            url = f"http://{addr}/directory/query"
-            st, txt = _post_json(url, {"query_id": qid, "filename": filename, "ttl": ttl - 1, "origin": _SELF_ADDR})
-            if st == 200:
-                resp = json.loads(txt)
-                if resp.get("found"):
-                    return resp
-        except Exception:
+    visited = VisitedFilter()
+    if _SELF_ADDR:
+        visited.add(_SELF_ADDR)
+    if get_role() == ROLE_LEAF:
+        return _search_via_super(qid, filename, ttl, visited, holders, max_results)
+    # Propagar a vecinos (excluyendo la propia dirección para evitar llamadas a sí mismo),
+    # primero los que llevaron a este archivo en búsquedas anteriores
+    for addr in _route_neighbors(filename, ttl - 1):
+        if addr in visited:
             continue
-    return {"found": False}
+        resp = _forward_query(addr, qid, filename, ttl - 1, _SELF_ADDR, visited, max_results - len(holders))
+        _learn_route(filename, addr, ttl - 1, resp)
+        _merge_holders(holders, resp)
+        if len(holders) >= max_results:
+            break
+    return _search_result(holders)
+
+def _search_via_super(qid: str, filename: str, ttl: int, visited: VisitedFilter, holders: List[Dict], max_results: int) -> Dict:
+    """Búsqueda de una hoja: la query va solo a su super-peer activo (el substitute si el
+    headline no responde), que contesta por sus hojas y la propaga entre super-peers."""
+    uplink = get_uplink()
+    for addr in uplink.order():
+        resp = _forward_query(addr, qid, filename, ttl - 1, _SELF_ADDR, visited, max_results - len(holders))
+        if resp.get("busy"):
+            continue
+        # Sin 'visited' en la respuesta el super-peer no contestó
+        if "visited" not in resp:
+            uplink.failover(addr)
+            continue
+        _merge_holders(holders, resp)
+        break
+    return _search_result(holders)
+
+def _forward_query(addr: str, query_id: str, filename: str, ttl: int, origin: Optional[str], visited: VisitedFilter,
+                   max_results: int = 1, filtro: Optional[Dict] = None, per_peer: int = DEFAULT_MATCHES) -> Dict:
+    """Envía la query a un vecino y mezcla en 'visited' los nodos que recorrió ese camino.
+    Con 'filtro' es una búsqueda por metadata (ver start_metadata_search)."""
+    payload = {"query_id": query_id, "filename": filename, "ttl": ttl, "origin": origin, "visited": visited.to_hex()}
+    if max_results > 1:
+        payload["max_results"] = max_results
+    if filtro is not None:
+        payload["filter"] = filtro
+        payload["per_peer"] = per_peer
+    try:
+        url = f"http://{addr}/directory/query"
+        st, txt = _post_json(url, payload)
+        if st != 200:
+            return {"found": False}
+        resp = json.loads(txt)
+    except urllib.error.HTTPError as e:
+        # Vecino saturado (admission.py): no se reintenta en esta búsqueda, pero no está caído
+        visited.add(addr)
+        _note_contact(addr, True)
+        return {"found": False, "busy": e.code in (429, 503)}
+    except Exception:
+        # Un vecino caído no se vuelve a intentar dentro de la misma búsqueda
+        visited.add(addr)
+        _note_contact(addr, False)
+        return {"found": False}
+    _note_contact(addr, True)
+    visited.merge(VisitedFilter.from_hex(resp.get("visited")))
+    visited.add(addr)
+    if resp.get("leaf"):
+        # Hoja de otro super-peer en la DL: no se le vuelven a propagar queries
+        get_leaf_index().mark_non_super(addr)
+    return resp
+
+def _local_index() -> Dict[str, int]:
+    return {e["filename"]: int(e.get("size") or 0) for e in listar_archivos()}
+
+def push_leaf_index() -> Dict:
+    """Sube el índice local (o el delta desde la última subida confirmada) al super-peer
+    activo; si no responde pasa al siguiente. Retorna { success, super?, error? }."""
+    uplink = get_uplink()
+    files = _local_index()
+    for addr in uplink.order():
+        for _ in range(2):  # un delta rechazado se reintenta una vez como índice completo
+            update = uplink.next_update(_SELF_ADDR or "", _SELF_ID or "", files)
+            try:
+                st, txt = _post_json(f"http://{addr}/directory/leaf/index", update)
+                resp = json.loads(txt) if st == 200 else {}
+            except Exception:
+                uplink.failover(addr)
+                break
+            if resp.get("success"):
+                uplink.acked(update, files)
+                return {"success": True, "super": addr}
+            if not resp.get("resync"):
+                break
+            uplink.resync()
+    return {"success": False, "error": "ningún super-peer aceptó el índice"}
+
+def start_leaf_uplink() -> None:
+    """Inicia la subida periódica del índice si este nodo es hoja."""
+    if get_role() == ROLE_LEAF:
+        get_uplink().start(push_leaf_index)
+
+def receive_leaf_index(update: Dict) -> Dict:
+    """Índice (completo o delta) subido por una hoja, o replicado por su headline."""
+    if get_role() != ROLE_SUPER:
+        return {"success": False, "error": "este nodo no es super-peer"}
+    resp = get_leaf_index().apply(update)
+    if resp.get("success") and not update.get("replica"):
+        _replicate_leaf_index(update)
+    return resp
+
+def _replicate_leaf_index(update: Dict) -> None:
+    """Copia la subida de una hoja a su substitute; si este perdió la versión base se le manda
+    el índice completo guardado."""
+    substitute = str(update.get("substitute") or "")
+    if not substitute or substitute == _SELF_ADDR:
+        return
+    url = f"http://{substitute}/directory/leaf/index"
+    try:
+        st, txt = _post_json(url, {**update, "replica": True}, timeout=3)
+        if st == 200 and json.loads(txt).get("resync"):
+            snapshot = get_leaf_index().snapshot(str(update.get("address") or ""))
+            if snapshot is not None:
+                _post_json(url, {**snapshot, "replica": True}, timeout=3)
+    except Exception:
+        pass
 
 def join_with(target_addr: str) -> Dict:
     """
@@ -128,34 +342,197 @@ def join_with(target_addr: str) -> Dict:
                     _ensure_in_dl(addr)
         # Asegurar nuestra propia dirección
         _ensure_in_dl(_SELF_ADDR)
+        _note_contact(target_addr, True)
         return {"success": True, "dl": get_all()}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def handle_query(query_id: str, filename: str, ttl: int, origin: Optional[str]) -> Dict:
-    """Maneja una consulta recibida. Deduplica por query_id, verifica local, propaga si ttl>0."""
+def snapshot_dl() -> List[Dict]:
+    """Vecinos de la DL con su puntaje y último contacto, para persistirlos."""
+    out = []
+    with _DL_LOCK:
+        for addr in _DL:
+            if addr != _SELF_ADDR:
+                info = _PEERS.get(addr, {})
+                out.append({"address": addr, "score": round(info.get("score", 1.0), 3),
+                            "last_seen": info.get("last_seen", 0.0)})
+    return out
+
+def warm_rejoin(entries: List[Dict], timeout: float = 1.0) -> Dict:
+    """Reincorporación tras un reinicio con la DL persistida: prueba todos los vecinos en
+    paralelo con un login (que además nos vuelve a registrar en su DL) y adopta los que
+    responden, priorizando los de mayor puntaje.
+    Retorna { success, probed, alive, dl, ms }.
+    """
+    t0 = time.perf_counter()
+    candidates = [e for e in entries if isinstance(e, dict) and e.get("address") and e.get("address") != _SELF_ADDR]
+    candidates.sort(key=lambda e: -float(e.get("score") or 0))
+    if not candidates or not _SELF_ADDR:
+        return {"success": False, "probed": 0, "alive": [], "dl": get_all(), "ms": 0.0}
+
+    def probe(addr: str) -> Tuple[str, bool]:
+        try:
+            st, txt = _post_json(f"http://{addr}/directory/login", {"address": _SELF_ADDR}, timeout=timeout)
+            return addr, st == 200 and bool(json.loads(txt).get("success"))
+        except Exception:
+            return addr, False
+
+    with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+        results = dict(pool.map(probe, [e["address"] for e in candidates]))
+    alive = [e["address"] for e in candidates if results[e["address"]]]
+    # _enforce_max_size conserva las últimas agregadas: primero las de menor puntaje
+    with _DL_LOCK:
+        for entry in reversed(candidates):
+            if results[entry["address"]]:
+                _PEERS[entry["address"]] = {"score": float(entry.get("score") or 1.0),
+                                            "last_seen": float(entry.get("last_seen") or 0.0)}
+                _ensure_in_dl(entry["address"])
+                _note_contact(entry["address"], True)
+    return {"success": bool(alive), "probed": len(candidates), "alive": alive, "dl": get_all(),
+            "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+def rejoin_on_boot(entries: List[Dict], fallbacks: List[Optional[str]]) -> Dict:
+    """Al arrancar con una DL persistida: warm_rejoin y, si ningún vecino responde, join
+    vía los fallbacks (headline_peer, substitute_peer). Sin DL persistida no hace nada."""
+    global _REJOIN
+    result = warm_rejoin(entries) if entries else {"success": False, "probed": 0, "alive": [], "ms": 0.0}
+    if entries and not result["success"]:
+        for target in fallbacks:
+            if target and target != _SELF_ADDR and join_with(target).get("success"):
+                result = {**result, "success": True, "fallback": target, "dl": get_all()}
+                break
+    _REJOIN = result
+    return result
+
+def get_rejoin_info() -> Dict:
+    return dict(_REJOIN)
+
+def handle_query(query_id: str, filename: str, ttl: int, origin: Optional[str], visited: Optional[str] = None, max_results: int = 1) -> Dict:
+    """Maneja una consulta recibida. Deduplica por query_id, verifica local, propaga si ttl>0.
+    'visited' es el filtro de Bloom (hex) de direcciones ya recorridas: no se reenvía a esos
+    vecinos y la respuesta devuelve el filtro ampliado para que el emisor salte los nodos
+    que este camino ya cubrió. 'max_results' indica cuántos propietarios faltan por reunir.
+    """
+    seen = VisitedFilter.from_hex(visited)
+    if _SELF_ADDR:
+        seen.add(_SELF_ADDR)
     if query_id in _QUERY_HISTORY:
-        return {"found": False}
+        return {"found": False, "visited": seen.to_hex()}
     _QUERY_HISTORY.append(query_id)
 
+    max_results = max(1, int(max_results))
+    holders: List[Dict] = []
     # Verificar local
-    if _has_file(filename):
-        return {"found": True, "owner_id": _SELF_ID or "", "address": _SELF_ADDR or ""}
+    entry = _local_entry(filename)
+    hops: Optional[int] = None
+    if entry is not None:
+        # Demanda vista por este nodo: alimenta la replicación proactiva
+        get_popularity().record(filename)
+        holders.append(_self_holder(entry))
+        hops = 0
+    leaves = _leaf_holders(filename)
+    if leaves["found"]:
+        _merge_holders(holders, leaves)
+        hops = 0
+
+    # Una hoja no propaga: responde solo por sí misma
+    if get_role() == ROLE_LEAF:
+        return {**_search_result(holders), "visited": seen.to_hex(), "leaf": True}
 
-    # Propagar si TTL > 0
-    if ttl and ttl > 0:
+    # Propagar si TTL > 0 y aún faltan propietarios
+    if ttl and ttl > 0 and len(holders) < max_results:
         # Propagar a vecinos (excluyendo la propia dirección y evitando enviar de vuelta directo al origin)
-        for addr in [a for a in list(_DL) if a != _SELF_ADDR]:
-            # Evitar enviar de vuelta directo al origin si está en la DL (opcional)
-            if origin and addr == origin:
+        for addr in _route_neighbors(filename, ttl - 1):
+            # Evitar enviar de vuelta directo al origin y a los nodos que la query ya visitó
+            if (origin and addr == origin) or addr in seen:
                 continue
-            try:
-                url = f"http://{addr}/directory/query"
-                st, txt = _post_json(url, {"query_id": query_id, "filename": filename, "ttl": ttl - 1, "origin": origin or _SELF_ADDR})
-                if st == 200:
-                    resp = json.loads(txt)
-                    if resp.get("found"):
-                        return resp
-            except Exception:
+            resp = _forward_query(addr, query_id, filename, ttl - 1, origin or _SELF_ADDR, seen, max_results - len(holders))
+            _learn_route(filename, addr, ttl - 1, resp)
+            if resp.get("found") and hops is None:
+                hops = int(resp.get("hops") or 0) + 1
+            _merge_holders(holders, resp)
+            if len(holders) >= max_results:
+                break
+    result = {**_search_result(holders), "visited": seen.to_hex()}
+    if hops is not None:
+        # Distancia (desde este nodo) al primer propietario: el emisor la guarda en su tabla de ruteo
+        result["hops"] = hops
+    return result
+
+def _local_matches(filtro: Dict, per_peer: int) -> List[Dict]:
+    """Hasta 'per_peer' archivos propios que cumplen el filtro (y de cada hoja si es super-peer)."""
+    matches = [{"owner_id": _SELF_ID or "", "address": _SELF_ADDR or "", "filename": e["filename"],
+                "size": int(e.get("size") or 0), "mtime": e.get("mtime")} for e in buscar_archivos(filtro, per_peer)]
+    if get_role() == ROLE_SUPER:
+        # El índice de las hojas no tiene mtime: los filtros por fecha no las incluyen
+        matches.extend(get_leaf_index().match(lambda e: coincide_filtro(e, filtro), per_peer))
+    return matches
+
+def _merge_matches(matches: List[Dict], resp: Dict, limit: int) -> None:
+    """Agrega a 'matches' las coincidencias de una respuesta, sin repetir (dirección, archivo)."""
+    known = {(m.get("address"), m.get("filename")) for m in matches}
+    for m in resp.get("matches") or []:
+        if len(matches) >= limit:
+            return
+        if isinstance(m, dict) and m.get("address") and (m.get("address"), m.get("filename")) not in known:
+            matches.append(m)
+            known.add((m.get("address"), m.get("filename")))
+
+def start_metadata_search(filtro: Dict, ttl: int = 3, max_results: int = DEFAULT_METADATA_RESULTS,
+                          per_peer: int = DEFAULT_MATCHES) -> Dict:
+    """Búsqueda floodeada por metadata con un filtro normalizado (ver normalizar_filtro).
+    Cada nodo aporta hasta 'per_peer' coincidencias evaluadas sobre sus índices secundarios;
+    se recorre la red hasta reunir 'max_results'.
+    Retorna { found: bool, matches: [{owner_id, address, filename, size, mtime}] }.
+    """
+    qid = str(uuid.uuid4())
+    max_results = max(1, min(int(max_results), MAX_METADATA_RESULTS))
+    per_peer = max(1, min(int(per_peer), MAX_MATCHES))
+    matches = _local_matches(filtro, per_peer)[:max_results]
+    visited = VisitedFilter()
+    if _SELF_ADDR:
+        visited.add(_SELF_ADDR)
+    leaf = get_role() == ROLE_LEAF
+    neighbors = get_uplink().order() if leaf else _route_neighbors("", ttl - 1)
+    for addr in neighbors:
+        if len(matches) >= max_results:
+            break
+        if addr in visited:
+            continue
+        resp = _forward_query(addr, qid, "", ttl - 1, _SELF_ADDR, visited, max_results - len(matches), filtro, per_peer)
+        if leaf and resp.get("busy"):
+            continue
+        if leaf and "visited" not in resp:
+            get_uplink().failover(addr)
+            continue
+        _merge_matches(matches, resp, max_results)
+        if leaf:
+            break
+    return {"found": bool(matches), "matches": matches}
+
+def handle_metadata_query(query_id: str, filtro: Dict, ttl: int, origin: Optional[str], visited: Optional[str] = None,
+                          max_results: int = DEFAULT_METADATA_RESULTS, per_peer: int = DEFAULT_MATCHES) -> Dict:
+    """Maneja una búsqueda por metadata recibida; misma deduplicación y propagación que handle_query."""
+    seen = VisitedFilter.from_hex(visited)
+    if _SELF_ADDR:
+        seen.add(_SELF_ADDR)
+    if query_id in _QUERY_HISTORY:
+        return {"found": False, "matches": [], "visited": seen.to_hex()}
+    _QUERY_HISTORY.append(query_id)
+
+    max_results = max(1, min(int(max_results), MAX_METADATA_RESULTS))
+    per_peer = max(1, min(int(per_peer), MAX_MATCHES))
+    matches = _local_matches(filtro, per_peer)[:max_results]
+    if get_role() == ROLE_LEAF:
+        return {"found": bool(matches), "matches": matches, "visited": seen.to_hex(), "leaf": True}
+
+    if ttl and ttl > 0 and len(matches) < max_results:
+        for addr in _route_neighbors("", ttl - 1):
+            if (origin and addr == origin) or addr in seen:
                 continue
-    return {"found": False}
\ No newline at end of file
+            resp = _forward_query(addr, query_id, "", ttl - 1, origin or _SELF_ADDR, seen,
+                                  max_results - len(matches), filtro, per_peer)
+            _merge_matches(matches, resp, max_results)
+            if len(matches) >= max_results:
+                break
+    return {"found": bool(matches), "matches": matches, "visited": seen.to_hex()}
@@ -0,0 +1,242 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+# Modo jerárquico con super-peers. Con role "leaf" el nodo no participa del flood:
+# sube su índice a su headline_peer (completo la primera vez, después solo las
+# diferencias) y le envía sus búsquedas; si el headline no responde pasa a su
+# substitute_peer. Con role "super" el nodo guarda los índices de sus hojas,
+# responde por ellas y propaga las queries solo entre super-peers; cada índice que
+# recibe de una hoja lo replica al substitute de esa hoja para que el failover no
+# pierda resultados. Con role "flat" (default) todo funciona como antes.
+
+ROLE_FLAT = "flat"
+ROLE_LEAF = "leaf"
+ROLE_SUPER = "super"
+ROLES = (ROLE_FLAT, ROLE_LEAF, ROLE_SUPER)
+DEFAULT_PUSH_INTERVAL_S = 30.0
+DEFAULT_LEAF_TTL_S = 120.0  # una hoja que no refresca su índice en este tiempo se olvida
+
+class LeafIndex:
+    """Índices de las hojas guardados en un super-peer (propios o replicados por otro super-peer)."""
+
+    def __init__(self, leaf_ttl_s: float = DEFAULT_LEAF_TTL_S, clock: Callable[[], float] = time.monotonic):
+        self.leaf_ttl_s = max(1.0, float(leaf_ttl_s))
+        self.clock = clock
+        self._lock = threading.Lock()
+        # address -> {owner_id, files: {filename: size}, version, seen, replica}
+        self._leaves: Dict[str, Dict] = {}
+        self._by_file: Dict[str, Set[str]] = {}  # filename -> direcciones de hojas que lo tienen
+        self._non_super: Set[str] = set()  # vecinos de la DL que respondieron como hoja
+        self._expired_at = clock()
+
+    def apply(self, update: Dict) -> Dict:
+        """Aplica una subida de índice. Un delta sobre una versión distinta de la guardada
+        se rechaza con resync=True para que el emisor mande el índice completo."""
+        address = str(update.get("address") or "")
+        if not address:
+            return {"success": False, "error": "address requerido"}
+        try:
+            version = int(update.get("version") or 0)
+            if update.get("full"):
+                files = {str(f): int(s) for f, s in (update.get("files") or {}).items()}
+            else:
+                added = {str(f): int(s) for f, s in (update.get("added") or {}).items()}
+                removed = [str(f) for f in update.get("removed") or []]
+        except (AttributeError, TypeError, ValueError):
+            return {"success": False, "error": "índice inválido"}
+        now = self.clock()
+        with self._lock:
+            leaf = self._leaves.get(address)
+            if not update.get("full"):
+                if leaf is None or leaf["version"] != int(update.get("base_version") or 0):
+                    return {"success": False, "resync": True}
+                files = dict(leaf["files"])
+                files.update(added)
+                for name in removed:
+                    files.pop(name, None)
+            self._set_files(address, leaf["files"] if leaf else {}, files)
+            self._leaves[address] = {"owner_id": str(update.get("owner_id") or ""), "files": files,
+                                     "version": version, "seen": now, "replica": bool(update.get("replica"))}
+            self._non_super.discard(address)
+            if now - self._expired_at >= self.leaf_ttl_s / 4:
+                self._expire(now)
+        return {"success": True, "version": version}
+
+    def _set_files(self, address: str, old: Dict[str, int], new: Dict[str, int]) -> None:
+        for name in old:
+            if name not in new:
+                holders = self._by_file.get(name)
+                if holders is not None:
+                    holders.discard(address)
+                    if not holders:
+                        del self._by_file[name]
+        for name in new:
+            self._by_file.setdefault(name, set()).add(address)
+
+    def _expire(self, now: float) -> None:
+        self._expired_at = now
+        for address in [a for a, leaf in self._leaves.items() if now - leaf["seen"] > self.leaf_ttl_s]:
+            self._set_files(address, self._leaves.pop(address)["files"], {})
+
+    def lookup(self, filename: str) -> List[Dict]:
+        """Hojas vigentes que tienen 'filename', en el formato de holders de la búsqueda."""
+        now = self.clock()
+        with self._lock:
+            holders = []
+            for address in sorted(self._by_file.get(filename, ())):
+                leaf = self._leaves[address]
+                if now - leaf["seen"] <= self.leaf_ttl_s:
+                    holders.append({"owner_id": leaf["owner_id"], "address": address,
+                                    "size": leaf["files"][filename]})
+            return holders
+
+    def match(self, predicate: Callable[[Dict], bool], per_leaf: int) -> List[Dict]:
+        """Hasta 'per_leaf' archivos de cada hoja vigente que cumplen 'predicate' (sobre filename y size)."""
+        now = self.clock()
+        with self._lock:
+            matches = []
+            for address in sorted(self._leaves):
+                leaf = self._leaves[address]
+                if now - leaf["seen"] > self.leaf_ttl_s:
+                    continue
+                found = 0
+                for filename, size in leaf["files"].items():
+                    if predicate({"filename": filename, "size": size}):
+                        matches.append({"owner_id": leaf["owner_id"], "address": address,
+                                        "filename": filename, "size": size, "mtime": None})
+                        found += 1
+                        if found >= per_leaf:
+                            break
+            return matches
+
+    def snapshot(self, address: str) -> Optional[Dict]:
+        """Índice completo guardado de una hoja, como payload de subida."""
+        with self._lock:
+            leaf = self._leaves.get(address)
+            if leaf is None:
+                return None
+            return {"address": address, "owner_id": leaf["owner_id"], "version": leaf["version"],
+                    "full": True, "files": dict(leaf["files"])}
+
+    def is_leaf(self, address: str) -> bool:
+        with self._lock:
+            return address in self._leaves or address in self._non_super
+
+    def mark_non_super(self, address: str) -> None:
+        with self._lock:
+            self._non_super.add(address)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            replicas = sum(1 for leaf in self._leaves.values() if leaf["replica"])
+            return {"leaves": len(self._leaves) - replicas, "replicated_leaves": replicas,
+                    "files": len(self._by_file)}
+
+class LeafUplink:
+    """Estado de una hoja: a qué super-peer subir el índice, qué versión confirmó y el failover."""
+
+    def __init__(self, headline: Optional[str] = None, substitute: Optional[str] = None,
+                 push_interval_s: float = DEFAULT_PUSH_INTERVAL_S):
+        self.supers: List[str] = []
+        for addr in (headline, substitute):
+            if addr and addr not in self.supers:
+                self.supers.append(addr)
+        self.push_interval_s = max(0.1, float(push_interval_s))
+        self.active = 0
+        self.version = 0
+        self._sent: Optional[Dict[str, int]] = None  # índice confirmado por el super-peer activo
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def active_super(self) -> Optional[str]:
+        with self._lock:
+            return self.supers[self.active] if self.supers else None
+
+    def order(self) -> List[str]:
+        """Super-peers a probar: el activo primero."""
+        with self._lock:
+            return self.supers[self.active:] + self.supers[:self.active]
+
+    def next_update(self, address: str, owner_id: str, files: Dict[str, int]) -> Dict:
+        """Payload de la próxima subida: el índice completo o el delta desde la última confirmada.
+        Un delta vacío sirve de heartbeat."""
+        with self._lock:
+            update = {"address": address, "owner_id": owner_id, "version": self.version + 1}
+            others = [a for i, a in enumerate(self.supers) if i != self.active]
+            if others:
+                update["substitute"] = others[0]
+            if self._sent is None:
+                update.update({"full": True, "files": dict(files)})
+            else:
+                update.update({"base_version": self.version,
+                               "added": {f: s for f, s in files.items() if self._sent.get(f) != s},
+                               "removed": [f for f in self._sent if f not in files]})
+            return update
+
+    def acked(self, update: Dict, files: Dict[str, int]) -> None:
+        with self._lock:
+            self.version = int(update["version"])
+            self._sent = dict(files)
+
+    def resync(self) -> None:
+        with self._lock:
+            self._sent = None
+
+    def failover(self, address: str) -> None:
+        """'address' no respondió: si era el super-peer activo se pasa al siguiente."""
+        with self._lock:
+            if self.supers and self.supers[self.active] == address and len(self.supers) > 1:
+                self.active = (self.active + 1) % len(self.supers)
+                self._sent = None
+                self.failovers += 1
+
+    def _loop(self, push: Callable[[], Dict]) -> None:
+        while True:
+            try:
+                push()
+            except Exception:
+                pass
+            if self._stop.wait(self.push_interval_s):
+                return
+
+    def start(self, push: Callable[[], Dict]) -> None:
+        if self.supers and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(push,), daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"supers": list(self.supers), "active": self.supers[self.active] if self.supers else None,
+                    "version": self.version, "failovers": self.failovers}
+
+_ROLE = ROLE_FLAT
+_LEAF_INDEX = LeafIndex()
+_UPLINK = LeafUplink()
+
+def get_role() -> str:
+    return _ROLE
+
+def get_leaf_index() -> LeafIndex:
+    return _LEAF_INDEX
+
+def get_uplink() -> LeafUplink:
+    return _UPLINK
+
+def configure_superpeer(role: str = ROLE_FLAT, headline: Optional[str] = None, substitute: Optional[str] = None,
+                        push_interval_s: float = DEFAULT_PUSH_INTERVAL_S, leaf_ttl_s: float = DEFAULT_LEAF_TTL_S) -> str:
+    """Configura el rol del nodo (sección 'superpeer' del YAML más headline_peer/substitute_peer)."""
+    global _ROLE, _LEAF_INDEX, _UPLINK
+    role = str(role or ROLE_FLAT).lower()
+    if role not in ROLES:
+        raise ValueError(f"rol de super-peer inválido: {role}")
+    _UPLINK.stop()
+    _ROLE = role
+    _LEAF_INDEX = LeafIndex(leaf_ttl_s)
+    _UPLINK = LeafUplink(headline, substitute, push_interval_s)
+    return _ROLE
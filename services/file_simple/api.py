@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from services.file_simple.service import indexar, listar_archivos
+from services.file_simple.reindex import get_reindexer
 from services.directory_simple.api import router as directory_router
 from services.transfer_runtime.api import router as transfer_router
 
@@ -27,6 +28,11 @@ def api_indexar():
     total = indexar()
     return {"success": True, "total": total}
 
+@app.get("/indexar/estado")
+def api_estado_reindexado():
+    """Estado de la reindexación en segundo plano: intervalo actual, directorios vigilados y cambios aplicados."""
+    return {"success": True, **get_reindexer().stats()}
+
 @app.get("/archivos")
 def api_archivos():
     """Lista archivos indexados en memoria para este nodo."""
@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from services.file_simple.service import actualizar_entrada, es_temporal, get_base_directory, indexar, quitar_entrada
+
+# Reindexación en segundo plano para cuando no hay eventos del sistema de archivos.
+# Cada tick solo hace stat de los directorios conocidos y compara su mtime con el del
+# último listado (agregar, borrar o renombrar un archivo cambia el mtime de su
+# directorio); solo los que cambiaron se vuelven a listar. Los archivos nuevos o con
+# otro tamaño/mtime pasan por actualizar_entrada y los que faltan por quitar_entrada
+# (que mantienen los índices secundarios); un subdirectorio nuevo se recorre entero y
+# uno que desapareció se quita entero. El intervalo se adapta a la tasa de cambios:
+# se reduce a la mitad tras un tick con cambios y crece 1.5x tras uno sin cambios,
+# entre min_interval_s y max_interval_s, y nunca baja de COST_FACTOR veces lo que
+# tardó el último tick. Corre en su propio hilo, nunca en el camino de una request.
+# Reescribir un archivo en el lugar no cambia el mtime de su directorio: eso lo cubren
+# actualizar_entrada tras las descargas o POST /indexar.
+
+DEFAULT_MIN_INTERVAL_S = 2.0
+DEFAULT_MAX_INTERVAL_S = 60.0
+COST_FACTOR = 10
+# Un directorio modificado hace menos de esto se vuelve a listar en el próximo tick:
+# en sistemas de archivos con mtime de baja resolución un cambio posterior al listado
+# puede dejar el mismo mtime
+RACY_NS = 2 * 10**9
+
+Listing = Tuple[int, Dict[str, Tuple[int, int]], List[str]]
+
+class ReindexScheduler:
+    def __init__(self, min_interval_s: float = DEFAULT_MIN_INTERVAL_S, max_interval_s: float = DEFAULT_MAX_INTERVAL_S):
+        self.min_interval_s = max(0.05, float(min_interval_s))
+        self.max_interval_s = max(self.min_interval_s, float(max_interval_s))
+        self.interval_s = self.min_interval_s
+        # directorio -> (mtime_ns, {archivo: (tamaño, mtime_ns)}) del último listado
+        self._dirs: Dict[str, Tuple[int, Dict[str, Tuple[int, int]]]] = {}
+        self._base: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ticks = 0
+        self.rescanned = 0
+        self.updated = 0
+        self.removed = 0
+        self.last_tick_ms = 0.0
+
+    def _list(self, path: str) -> Optional[Listing]:
+        """Lista un directorio: (mtime_ns, archivos, subdirectorios); None si ya no existe."""
+        files: Dict[str, Tuple[int, int]] = {}
+        subdirs: List[str] = []
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            # Como os.walk en indexar(): los enlaces a directorios no se recorren
+                            if not entry.is_symlink():
+                                subdirs.append(entry.name)
+                            continue
+                        if es_temporal(entry.name):
+                            continue
+                        st = entry.stat()
+                        files[entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, files, subdirs
+
+    def _store(self, path: str, mtime: int, files: Dict[str, Tuple[int, int]], now_ns: int) -> None:
+        self._dirs[path] = (-1 if mtime > now_ns - RACY_NS else mtime, files)
+
+    def _add_subtree(self, path: str, now_ns: int, update: bool = True) -> int:
+        changes = 0
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            listing = self._list(current)
+            if listing is None:
+                continue
+            mtime, files, subdirs = listing
+            if update:
+                for name in files:
+                    actualizar_entrada(os.path.join(current, name))
+                changes += len(files)
+            self._store(current, mtime, files, now_ns)
+            pending.extend(os.path.join(current, sub) for sub in subdirs)
+        self.updated += changes
+        return changes
+
+    def _drop_subtree(self, path: str) -> int:
+        changes = 0
+        prefix = path + os.sep
+        for current in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            for name in self._dirs.pop(current)[1]:
+                quitar_entrada(os.path.join(current, name))
+                changes += 1
+        self.removed += changes
+        return changes
+
+    def _rescan(self, path: str, now_ns: int) -> int:
+        listing = self._list(path)
+        if listing is None:
+            return self._drop_subtree(path)
+        self.rescanned += 1
+        mtime, files, subdirs = listing
+        old_files = self._dirs[path][1]
+        changes = 0
+        for name, signature in files.items():
+            if old_files.get(name) != signature:
+                actualizar_entrada(os.path.join(path, name))
+                self.updated += 1
+                changes += 1
+        for name in old_files.keys() - files.keys():
+            quitar_entrada(os.path.join(path, name))
+            self.removed += 1
+            changes += 1
+        self._store(path, mtime, files, now_ns)
+        for sub in subdirs:
+            full = os.path.join(path, sub)
+            if full not in self._dirs:
+                changes += self._add_subtree(full, now_ns)
+        return changes
+
+    def tick(self) -> int:
+        """Un recorrido incremental. Retorna la cantidad de entradas actualizadas o quitadas."""
+        with self._lock:
+            base = get_base_directory()
+            if not base:
+                return 0
+            now_ns = time.time_ns()
+            if base != self._base or not self._dirs:
+                # Directorio base nuevo (o que aún no existía): se toma el listado de
+                # referencia y luego se indexa completo, así lo que cambie entre ambos
+                # pasos se ve en el próximo tick
+                self._base = base
+                self._dirs = {}
+                self._add_subtree(os.path.normpath(base), now_ns, update=False)
+                indexar()
+                return 0
+            changes = 0
+            for path in list(self._dirs):
+                state = self._dirs.get(path)
+                if state is None:
+                    continue  # quitado junto con su directorio padre
+                try:
+                    if os.stat(path).st_mtime_ns == state[0]:
+                        continue
+                except OSError:
+                    pass
+                changes += self._rescan(path, now_ns)
+            self.ticks += 1
+            return changes
+
+    def _adapt(self, changes: int, elapsed_s: float) -> None:
+        if changes:
+            self.interval_s = max(self.min_interval_s, self.interval_s / 2)
+        else:
+            self.interval_s = min(self.max_interval_s, self.interval_s * 1.5)
+        self.interval_s = max(self.interval_s, COST_FACTOR * elapsed_s)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                ticks, t0 = self.ticks, time.perf_counter()
+                try:
+                    changes = self.tick()
+                except Exception:
+                    changes = 0
+                elapsed = time.perf_counter() - t0
+                # El indexado completo inicial no cuenta para el costo de un tick
+                if self.ticks > ticks:
+                    self.last_tick_ms = round(elapsed * 1000, 2)
+                    self._adapt(changes, elapsed)
+                if self._stop.wait(self.interval_s):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="reindex", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {"running": self._thread is not None and not self._stop.is_set(),
+                "interval_s": round(self.interval_s, 2), "dirs": len(self._dirs), "ticks": self.ticks,
+                "rescanned": self.rescanned, "updated": self.updated, "removed": self.removed,
+                "last_tick_ms": self.last_tick_ms}
+
+_REINDEXER = ReindexScheduler()
+
+def get_reindexer() -> ReindexScheduler:
+    return _REINDEXER
+
+def configure_reindexer(min_interval_s: float = DEFAULT_MIN_INTERVAL_S,
+                        max_interval_s: float = DEFAULT_MAX_INTERVAL_S) -> ReindexScheduler:
+    global _REINDEXER
+    _REINDEXER.stop()
+    _REINDEXER = ReindexScheduler(min_interval_s, max_interval_s)
+    return _REINDEXER
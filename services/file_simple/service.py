@@ -1,14 +1,51 @@
 import os
-from typing import List, Dict, Optional
+import re
+import time
+import bisect
+import hashlib
+import threading
+from datetime import datetime
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 
-# Índice simple en memoria por proceso (un proceso = un nodo)
-_INDEX: List[Dict] = []
+# Índice simple en memoria por proceso (un proceso = un nodo), por ruta del archivo.
+# indexar() lo reconstruye completo; actualizar_entrada()/quitar_entrada() tocan una
+# sola entrada tras una descarga o subida, sin recorrer todo el directorio.
+_INDEX: Dict[str, Dict] = {}
+_INDEX_BUILT = False
+_INDEX_LOCK = threading.Lock()
 _BASE_DIR: Optional[str] = None
 
+# Índices secundarios sobre _INDEX (mismo lock) para las búsquedas por metadata:
+# nombre -> rutas, extensión -> rutas y listas ordenadas de (tamaño, ruta) y (mtime, ruta)
+_BY_NAME: Dict[str, Set[str]] = {}
+_BY_EXT: Dict[str, Set[str]] = {}
+_BY_SIZE: List[Tuple[int, str]] = []
+_BY_MTIME: List[Tuple[float, str]] = []
+DEFAULT_MATCHES = 10
+MAX_MATCHES = 100
+
+# Temporales de transferencias en curso dentro del directorio base (descarga reanudable
+# y su progreso, por piezas, por deltas, por lotes y subidas): llevan este prefijo en
+# el nombre y nunca se indexan ni se anuncian, así ningún peer descarga un archivo a
+# medio escribir. Un archivo del usuario terminado en .part, .delta, etc. se indexa normal
+TEMP_PREFIX = ".p2ptmp-"
+
+# Caché de SHA-256 por (ruta, tamaño, mtime, longitud del prefijo): un archivo que no
+# cambió no se vuelve a leer para comparar copias en transferencias condicionales
+_DIGESTS: Dict[Tuple[str, int, int, int], str] = {}
+_DIGESTS_LOCK = threading.Lock()
+MAX_CACHED_DIGESTS = 4096
+
 def set_base_directory(path: str) -> None:
     """Configura el directorio base desde el cual se indexarán archivos."""
-    global _BASE_DIR
-    _BASE_DIR = path
+    global _BASE_DIR, _INDEX, _INDEX_BUILT
+    with _INDEX_LOCK:
+        if path != _BASE_DIR:
+            # El índice del directorio anterior ya no aplica: se reconstruye al primer uso
+            _INDEX = {}
+            _INDEX_BUILT = False
+            _rebuild_secondary()
+        _BASE_DIR = path
 
 def get_base_directory() -> Optional[str]:
     """Devuelve el directorio base configurado para este nodo."""
@@ -16,35 +53,309 @@ def get_base_directory() -> Optional[str]:
 
 def listar_archivos() -> List[Dict]:
     """Devuelve el índice simple en memoria."""
-    return list(_INDEX)
+    with _INDEX_LOCK:
+        return list(_INDEX.values())
+
+def total_indexados() -> int:
+    with _INDEX_LOCK:
+        return len(_INDEX)
+
+def _entry(fpath: str) -> Dict:
+    try:
+        st = os.stat(fpath)
+        size, mtime = st.st_size, st.st_mtime
+    except Exception:
+        size, mtime = 0, 0.0
+    return {
+        "filename": os.path.basename(fpath),
+        "path": fpath,
+        "size": size,
+        "mtime": mtime,
+    }
+
+def es_temporal(filename: str) -> bool:
+    """True si el nombre (o la ruta) corresponde a un temporal de transferencia (TEMP_PREFIX)."""
+    return os.path.basename(filename).startswith(TEMP_PREFIX)
+
+def ruta_temporal(dest_path: str, kind: str) -> str:
+    """Temporal de transferencia para 'dest_path' en su mismo directorio: '.p2ptmp-<nombre>.<kind>'."""
+    directory, name = os.path.split(dest_path)
+    return os.path.join(directory, f"{TEMP_PREFIX}{name}.{kind}")
 
-def _scan_directory(base_dir: str) -> List[Dict]:
-    entries: List[Dict] = []
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1][1:].lower()
+
+def _add_secondary(key: str, entry: Dict) -> None:
+    _BY_NAME.setdefault(entry["filename"], set()).add(key)
+    _BY_EXT.setdefault(_extension(entry["filename"]), set()).add(key)
+    bisect.insort(_BY_SIZE, (int(entry.get("size") or 0), key))
+    bisect.insort(_BY_MTIME, (float(entry.get("mtime") or 0.0), key))
+
+def _remove_sorted(items: List[Tuple], item: Tuple) -> None:
+    pos = bisect.bisect_left(items, item)
+    if pos < len(items) and items[pos] == item:
+        del items[pos]
+
+def _remove_secondary(key: str, entry: Dict) -> None:
+    for mapping, value in ((_BY_NAME, entry["filename"]), (_BY_EXT, _extension(entry["filename"]))):
+        keys = mapping.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del mapping[value]
+    _remove_sorted(_BY_SIZE, (int(entry.get("size") or 0), key))
+    _remove_sorted(_BY_MTIME, (float(entry.get("mtime") or 0.0), key))
+
+def _rebuild_secondary() -> None:
+    global _BY_NAME, _BY_EXT, _BY_SIZE, _BY_MTIME
+    _BY_NAME, _BY_EXT = {}, {}
+    for key, entry in _INDEX.items():
+        _BY_NAME.setdefault(entry["filename"], set()).add(key)
+        _BY_EXT.setdefault(_extension(entry["filename"]), set()).add(key)
+    _BY_SIZE = sorted((int(e.get("size") or 0), k) for k, e in _INDEX.items())
+    _BY_MTIME = sorted((float(e.get("mtime") or 0.0), k) for k, e in _INDEX.items())
+
+def _scan_directory(base_dir: str) -> Dict[str, Dict]:
+    entries: Dict[str, Dict] = {}
     for root, _, files in os.walk(base_dir):
         for fname in files:
-            fpath = os.path.join(root, fname)
-            try:
-                size = os.path.getsize(fpath)
-            except Exception:
-                size = 0
-            entries.append({
-                "filename": fname,
-                "path": fpath,
-                "size": size,
-            })
+            if es_temporal(fname):
+                continue
+            fpath = os.path.normpath(os.path.join(root, fname))
+            entries[fpath] = _entry(fpath)
     return entries
 
+def _index_key(path: str) -> Optional[str]:
+    """Clave de índice de 'path' (absoluto o relativo al directorio base); None si está fuera de él."""
+    if not _BASE_DIR:
+        return None
+    base = os.path.abspath(_BASE_DIR)
+    full = os.path.abspath(os.path.join(_BASE_DIR, path))
+    if os.path.commonpath([base, full]) != base or full == base:
+        return None
+    return os.path.normpath(os.path.join(_BASE_DIR, os.path.relpath(full, base)))
+
 def indexar() -> int:
     """Re-indexa el directorio configurado y guarda en memoria.
     Retorna el número de archivos indexados.
     """
-    global _INDEX
+    global _INDEX, _INDEX_BUILT
     if not _BASE_DIR:
         raise RuntimeError("Base directory not set. Call set_base_directory() first.")
     if not os.path.isdir(_BASE_DIR):
         # No falla: retorna 0 si no existe el directorio
-        _INDEX = []
-        return 0
+        entries: Dict[str, Dict] = {}
+    else:
+        entries = _scan_directory(_BASE_DIR)
+    with _INDEX_LOCK:
+        _INDEX = entries
+        _INDEX_BUILT = True
+        _rebuild_secondary()
+        return len(_INDEX)
+
+def actualizar_entrada(path: str) -> Optional[Dict]:
+    """Agrega o actualiza la entrada de un archivo del directorio base (ruta absoluta o
+    relativa a él); si el archivo ya no existe, la quita. Si el índice nunca se
+    construyó, la primera actualización lo indexa completo. Los temporales de
+    transferencia se ignoran.
+    Retorna la entrada (None si se quitó, es temporal o está fuera del directorio base).
+    """
+    key = _index_key(path)
+    if key is None or es_temporal(key):
+        return None
+    if not _INDEX_BUILT:
+        indexar()
+    if not os.path.isfile(key):
+        quitar_entrada(key)
+        return None
+    entry = _entry(key)
+    with _INDEX_LOCK:
+        old = _INDEX.get(key)
+        if old is not None:
+            _remove_secondary(key, old)
+        _INDEX[key] = entry
+        _add_secondary(key, entry)
+    return entry
+
+def quitar_entrada(path: str) -> bool:
+    """Quita la entrada de un archivo del índice. Retorna True si estaba indexado."""
+    key = _index_key(path)
+    if key is None:
+        return False
+    with _INDEX_LOCK:
+        old = _INDEX.pop(key, None)
+        if old is None:
+            return False
+        _remove_secondary(key, old)
+        return True
+
+def buscar_por_nombre(filename: str) -> Optional[Dict]:
+    """Primera entrada indexada con ese nombre de archivo (None si no hay)."""
+    with _INDEX_LOCK:
+        keys = _BY_NAME.get(filename)
+        return dict(_INDEX[min(keys)]) if keys else None
+
+_SIZE_UNITS = {"": 1, "b": 1, "kb": 2**10, "mb": 2**20, "gb": 2**30, "tb": 2**40}
+_TIME_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_TERM_RE = re.compile(r"^(name|ext|size|age|after|before)(:|>=|<=|>|<)(.+)$")
+
+def _parse_amount(text: str, units: Dict[str, int]) -> float:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]*)", text.strip())
+    if not match or match.group(2).lower() not in units:
+        raise ValueError(f"cantidad inválida: {text}")
+    return float(match.group(1)) * units[match.group(2).lower()]
+
+def _parse_date(text: str) -> float:
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"fecha inválida (se espera ISO 8601): {text}")
+
+def parsear_consulta(texto: str) -> Dict:
+    """Traduce el lenguaje de consulta a un filtro. Términos separados por espacios, todos
+    deben cumplirse: name:<texto>, ext:pdf[,docx], size>100MB, size<=1GB, age<7d (modificado
+    en los últimos 7 días), age>30d, after:2026-10-01, before:2026-10-15T12:00.
+    Unidades de tamaño B/KB/MB/GB/TB (base 1024) y de tiempo s/m/h/d/w.
+    """
+    filtro: Dict = {}
+    for term in texto.split():
+        match = _TERM_RE.match(term)
+        if not match:
+            raise ValueError(f"término inválido: {term}")
+        field, op, value = match.groups()
+        if field in ("name", "ext", "after", "before") and op != ":":
+            raise ValueError(f"'{field}' se usa como {field}:<valor>")
+        if field in ("size", "age") and op == ":":
+            raise ValueError(f"'{field}' se usa con >, >=, < o <=")
+        if field == "name":
+            filtro["name"] = value
+        elif field == "ext":
+            filtro["ext"] = [e for e in value.split(",") if e]
+        elif field == "after":
+            filtro["modified_after"] = _parse_date(value)
+        elif field == "before":
+            filtro["modified_before"] = _parse_date(value)
+        elif field == "size":
+            amount = int(_parse_amount(value, _SIZE_UNITS))
+            if op.startswith(">"):
+                filtro["min_size"] = amount + (1 if op == ">" else 0)
+            else:
+                filtro["max_size"] = amount - (1 if op == "<" else 0)
+        else:
+            # La antigüedad se evalúa con el reloj de cada nodo al recibir la query
+            seconds = _parse_amount(value, _TIME_UNITS)
+            filtro["modified_within_s" if op.startswith("<") else "modified_older_s"] = seconds
+    return normalizar_filtro(filtro)
+
+def normalizar_filtro(raw: object) -> Dict:
+    """Valida un filtro de metadata (o lo parsea si es texto, ver parsear_consulta).
+    Claves opcionales, combinadas con AND: name (subcadena del nombre, sin distinguir
+    mayúsculas), ext (extensión o lista), min_size/max_size (bytes), modified_after/
+    modified_before (epoch s), modified_within_s/modified_older_s (antigüedad en s).
+    Lanza ValueError si el filtro es inválido o vacío.
+    """
+    if isinstance(raw, str):
+        return parsear_consulta(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("filtro inválido: se espera un objeto o texto de consulta")
+    filtro: Dict = {}
+    try:
+        if raw.get("name"):
+            filtro["name"] = str(raw["name"]).lower()
+        if raw.get("ext"):
+            exts = raw["ext"] if isinstance(raw["ext"], list) else [raw["ext"]]
+            filtro["ext"] = sorted({str(e).lower().lstrip(".") for e in exts})
+        for field in ("min_size", "max_size"):
+            if raw.get(field) is not None:
+                filtro[field] = int(raw[field])
+        for field in ("modified_after", "modified_before", "modified_within_s", "modified_older_s"):
+            if raw.get(field) is not None:
+                filtro[field] = float(raw[field])
+    except (TypeError, ValueError):
+        raise ValueError("filtro inválido: tipos incorrectos")
+    if not filtro:
+        raise ValueError("filtro vacío")
+    return filtro
+
+def _mtime_range(filtro: Dict, now: float) -> Tuple[Optional[float], Optional[float]]:
+    """Rango [desde, hasta) de mtime que pide el filtro, con las antigüedades ya resueltas."""
+    lo, hi = filtro.get("modified_after"), filtro.get("modified_before")
+    if filtro.get("modified_within_s") is not None:
+        since = now - filtro["modified_within_s"]
+        lo = since if lo is None else max(lo, since)
+    if filtro.get("modified_older_s") is not None:
+        until = now - filtro["modified_older_s"]
+        hi = until if hi is None else min(hi, until)
+    return lo, hi
+
+def coincide_filtro(entry: Dict, filtro: Dict, now: Optional[float] = None) -> bool:
+    """Evalúa un filtro normalizado contra una entrada (filename, size y, si hay, mtime)."""
+    filename = str(entry.get("filename") or "")
+    if filtro.get("name") and filtro["name"] not in filename.lower():
+        return False
+    if filtro.get("ext") and _extension(filename) not in filtro["ext"]:
+        return False
+    size = int(entry.get("size") or 0)
+    if size < filtro.get("min_size", size) or size > filtro.get("max_size", size):
+        return False
+    lo, hi = _mtime_range(filtro, time.time() if now is None else now)
+    if lo is not None or hi is not None:
+        mtime = entry.get("mtime")
+        if mtime is None or (lo is not None and mtime < lo) or (hi is not None and mtime >= hi):
+            return False
+    return True
+
+def buscar_archivos(filtro: Dict, limit: int = DEFAULT_MATCHES) -> List[Dict]:
+    """Entradas que cumplen un filtro normalizado, hasta 'limit'. Recorre solo los candidatos
+    del índice secundario más selectivo (extensión, rango de tamaño o rango de mtime) y
+    verifica el resto de las condiciones sobre ellos; solo 'name' obliga a recorrer todo."""
+    limit = max(1, min(int(limit), MAX_MATCHES))
+    now = time.time()
+    with _INDEX_LOCK:
+        options: List[Tuple[int, Iterable[str]]] = []
+        if filtro.get("ext"):
+            keys = [k for e in filtro["ext"] for k in _BY_EXT.get(e, ())]
+            options.append((len(keys), keys))
+        if "min_size" in filtro or "max_size" in filtro:
+            lo = bisect.bisect_left(_BY_SIZE, (filtro.get("min_size", 0),))
+            hi = len(_BY_SIZE) if "max_size" not in filtro else bisect.bisect_left(_BY_SIZE, (filtro["max_size"] + 1,))
+            options.append((max(0, hi - lo), (_BY_SIZE[i][1] for i in range(lo, hi))))
+        mtime_lo, mtime_hi = _mtime_range(filtro, now)
+        if mtime_lo is not None or mtime_hi is not None:
+            lo = 0 if mtime_lo is None else bisect.bisect_left(_BY_MTIME, (mtime_lo,))
+            hi = len(_BY_MTIME) if mtime_hi is None else bisect.bisect_left(_BY_MTIME, (mtime_hi,))
+            options.append((max(0, hi - lo), (_BY_MTIME[i][1] for i in range(lo, hi))))
+        candidates = min(options, key=lambda o: o[0])[1] if options else _INDEX.keys()
+        matches: List[Dict] = []
+        for key in candidates:
+            entry = _INDEX[key]
+            if coincide_filtro(entry, filtro, now):
+                matches.append(dict(entry))
+                if len(matches) >= limit:
+                    break
+        return matches
 
-    _INDEX = _scan_directory(_BASE_DIR)
-    return len(_INDEX)
\ No newline at end of file
+def file_digest(path: str, length: Optional[int] = None) -> str:
+    """SHA-256 hex de los primeros 'length' bytes de 'path' (todo el archivo si es None)."""
+    st = os.stat(path)
+    length = st.st_size if length is None else min(int(length), st.st_size)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns, length)
+    with _DIGESTS_LOCK:
+        cached = _DIGESTS.get(key)
+    if cached is not None:
+        return cached
+    h = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    digest = h.hexdigest()
+    with _DIGESTS_LOCK:
+        if len(_DIGESTS) >= MAX_CACHED_DIGESTS:
+            _DIGESTS.clear()
+        _DIGESTS[key] = digest
+    return digest
@@ -0,0 +1,146 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import grpc
+from services.transfer_runtime.transport import get_transport
+
+# Pool de canales gRPC por proceso, indexado por dirección 'ip:puerto'.
+# Reutilizar el canal evita el handshake TCP + HTTP/2 en cada transferencia y
+# conserva las ventanas de control de flujo ya "calentadas".
+
+MAX_CHANNELS_PER_PEER = 2
+IDLE_TIMEOUT_S = 120.0
+
+
+_UNHEALTHY = (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN)
+
+class _PooledChannel:
+    def __init__(self, address: str, options: List[Tuple[str, int]]):
+        self.address = address
+        self.channel = grpc.insecure_channel(address, options=options)
+        self.state: Optional[grpc.ChannelConnectivity] = None
+        self.in_use = 0
+        self.discarded = False
+        self.last_used = time.monotonic()
+        # El callback corre en un hilo de gRPC; solo registra el último estado observado
+        self.channel.subscribe(self._on_state, try_to_connect=False)
+
+    def _on_state(self, state: grpc.ChannelConnectivity) -> None:
+        self.state = state
+
+    @property
+    def healthy(self) -> bool:
+        return self.state not in _UNHEALTHY
+
+    def close(self) -> None:
+        try:
+            self.channel.unsubscribe(self._on_state)
+        except Exception:
+            pass
+        self.channel.close()
+
+class ChannelPool:
+    def __init__(self, max_per_peer: int = MAX_CHANNELS_PER_PEER, idle_timeout: float = IDLE_TIMEOUT_S,
+                 options: Optional[List[Tuple[str, int]]] = None):
+        self.max_per_peer = max(1, int(max_per_peer))
+        self.idle_timeout = float(idle_timeout)
+        # Sin opciones explícitas se usan las de transporte vigentes (keepalive, ventanas, mensaje)
+        self._options = list(options) if options is not None else None
+        self._lock = threading.Lock()
+        self._channels: Dict[str, List[_PooledChannel]] = {}
+
+    @property
+    def options(self) -> List[Tuple[str, int]]:
+        return self._options if self._options is not None else get_transport().channel_options()
+
+    def _evict_locked(self) -> List[_PooledChannel]:
+        """Quita canales ociosos vencidos o en falla; devuelve los que hay que cerrar."""
+        now = time.monotonic()
+        dead: List[_PooledChannel] = []
+        for address in list(self._channels):
+            keep = []
+            for pc in self._channels[address]:
+                idle = pc.in_use == 0 and now - pc.last_used > self.idle_timeout
+                if pc.in_use == 0 and (idle or not pc.healthy):
+                    dead.append(pc)
+                else:
+                    keep.append(pc)
+            if keep:
+                self._channels[address] = keep
+            else:
+                del self._channels[address]
+        return dead
+
+    def _acquire(self, address: str) -> _PooledChannel:
+        with self._lock:
+            dead = self._evict_locked()
+            entries = self._channels.setdefault(address, [])
+            healthy = [pc for pc in entries if pc.healthy]
+            pc = min(healthy, key=lambda c: c.in_use) if healthy else None
+            # Abrir otro canal solo si todos están ocupados (o en falla) y no se alcanzó el
+            # tope por peer. Los en falla ociosos ya los quitó _evict_locked; en el tope se
+            # comparte el menos cargado aunque esté en falla (gRPC lo reconecta solo)
+            if (pc is None or pc.in_use > 0) and len(entries) < self.max_per_peer:
+                pc = _PooledChannel(address, self.options)
+                entries.append(pc)
+            elif pc is None:
+                pc = min(entries, key=lambda c: c.in_use)
+            pc.in_use += 1
+        for old in dead:
+            old.close()
+        return pc
+
+    def _release(self, pc: _PooledChannel) -> None:
+        with self._lock:
+            pc.in_use -= 1
+            pc.last_used = time.monotonic()
+            close = pc.discarded and pc.in_use == 0
+        if close:
+            pc.close()
+
+    @contextmanager
+    def lease(self, address: str) -> Iterator[grpc.Channel]:
+        """Presta un canal hacia 'address'. Ante UNAVAILABLE el canal se descarta del pool."""
+        pc = self._acquire(address)
+        try:
+            yield pc.channel
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self.discard(pc)
+            raise
+        finally:
+            self._release(pc)
+
+    def discard(self, pc: _PooledChannel) -> None:
+        """Saca el canal del pool; se cierra cuando lo libera su último usuario."""
+        with self._lock:
+            entries = self._channels.get(pc.address, [])
+            if pc in entries:
+                entries.remove(pc)
+            pc.discarded = True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {address: len(entries) for address, entries in self._channels.items()}
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries = [pc for lst in self._channels.values() for pc in lst]
+            self._channels.clear()
+        for pc in entries:
+            pc.close()
+
+_POOL = ChannelPool()
+
+def get_pool() -> ChannelPool:
+    return _POOL
+
+def configure_pool(max_per_peer: int = MAX_CHANNELS_PER_PEER, idle_timeout: float = IDLE_TIMEOUT_S,
+                   options: Optional[List[Tuple[str, int]]] = None) -> ChannelPool:
+    """Reemplaza el pool del proceso (los canales del pool anterior se cierran)."""
+    global _POOL
+    old = _POOL
+    _POOL = ChannelPool(max_per_peer, idle_timeout, options)
+    old.close_all()
+    return _POOL
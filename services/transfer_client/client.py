@@ -1,11 +1,44 @@
 import os
-from typing import Tuple, Iterator
+import json
+import shutil
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple, Iterator
 import grpc
 import transfer_pb2 as pb2
 import transfer_pb2_grpc as pb2_grpc
-from services.file_simple.service import get_base_directory
+from services.file_simple.service import actualizar_entrada, file_digest, get_base_directory, ruta_temporal
+from services.transfer_client.channel_pool import get_pool
+from services.transfer_runtime.compression import HEADER as COMPRESSION_HEADER, accepted_codecs, choose_codec, grpc_compression
+from services.transfer_runtime.integrity import ChunkVerifier, IntegrityError, chunk_crc, trailer_chunk
+from services.transfer_runtime.scheduler import get_scheduler
+from services.transfer_runtime.grpc_transfer import CONDITION_HEADER
+from services.transfer_runtime.transport import ChunkSizer, get_transport
+from services.transfer_runtime.delta import SIGNATURE_BATCH, block_size_for, iter_signatures
+from services.transfer_runtime.replicas import REPLICA_HEADER, replica_header
 
-CHUNK_SIZE = 64 * 1024
+PIECE_SIZE = 4 * 1024 * 1024  # tamaño de pieza para descargas desde varias fuentes
+SLOW_SOURCE_FACTOR = 4.0  # una fuente N veces más lenta que la mejor deja de tomar piezas nuevas
+CHECKPOINT_BYTES = 8 * 1024 * 1024  # cada cuánto se persiste el progreso de una descarga
+BULK_MANIFEST_BATCH = 512  # nombres por mensaje del manifiesto de BulkDownload
+RETRYABLE_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.ABORTED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+}
+
+def grpc_address_of(rest_address: object) -> str:
+    """Deriva ip:puerto_grpc (puerto REST + 1000 por convención); "" si no es válida."""
+    try:
+        host, port_str = str(rest_address).split(":", 1)
+        return f"{host}:{int(port_str) + 1000}"
+    except Exception:
+        return ""
 
 def _ensure_base_dir() -> str:
     base = get_base_directory()
@@ -14,44 +47,425 @@ def _ensure_base_dir() -> str:
     os.makedirs(base, exist_ok=True)
     return base
 
-def _iter_file_chunks(path: str) -> Iterator[pb2.FileChunk]:
+class DownloadCancelled(Exception):
+    """La descarga se interrumpió porque se activó su evento 'cancel'."""
+
+def _iter_file_chunks(path: str, peer: str = "") -> Iterator[pb2.FileChunk]:
+    digest = hashlib.sha256()
+    size = 0
+    # Los Upload salientes comparten el enlace de subida con los Download que sirve el nodo
+    scheduler = get_scheduler()
+    stream = scheduler.open_stream(peer)
+    sizer = ChunkSizer(get_transport())
+    try:
+        with open(path, "rb") as f:
+            seq = 0
+            while True:
+                data = f.read(sizer.size)
+                if not data:
+                    break
+                scheduler.acquire(stream, len(data))
+                digest.update(data)
+                size += len(data)
+                yield pb2.FileChunk(content=data, seq=seq, crc32=chunk_crc(data))
+                sizer.record(len(data))
+                seq += 1
+        yield trailer_chunk(seq, digest, size)
+    finally:
+        scheduler.close_stream(stream)
+
+def _load_progress(part_path: str, state_path: str, filename: str) -> Tuple[int, str]:
+    """(offset verificado, SHA-256 de los bytes [0, offset) del .part) desde el cual
+    reanudar; (0, "") si no hay estado válido."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("filename") != filename or not state.get("sha256"):
+            return 0, ""
+        offset = int(state.get("offset", 0))
+        # Nunca más allá de lo que realmente quedó en disco
+        if offset <= 0 or offset > os.path.getsize(part_path):
+            return 0, ""
+        return offset, str(state["sha256"])
+    except Exception:
+        return 0, ""
+
+def _save_progress(state_path: str, filename: str, offset: int, sha256: str) -> None:
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"filename": filename, "offset": offset, "sha256": sha256, "updated": time.time()}, f)
+    os.replace(tmp, state_path)
+
+def _prefix_digest(path: str, length: int):
+    """SHA-256 (objeto hashlib, para seguir actualizándolo) de los primeros 'length' bytes de 'path'."""
+    digest = hashlib.sha256()
     with open(path, "rb") as f:
-        seq = 0
-        while True:
-            data = f.read(CHUNK_SIZE)
+        while length > 0:
+            data = f.read(min(CHECKPOINT_BYTES, length))
             if not data:
                 break
-            yield pb2.FileChunk(content=data, seq=seq)
-            seq += 1
+            digest.update(data)
+            length -= len(data)
+    return digest
+
+def _download_range(channel: grpc.Channel, filename: str, part_path: str, state_path: str, offset: int,
+                    prefix_sha256: str = "", local_copy: Optional[str] = None,
+                    progress: Optional[Callable[[int], None]] = None,
+                    cancel: Optional[threading.Event] = None) -> str:
+    """Un intento de descarga hacia part_path; lanza excepción si el stream falla.
 
-def download_file(grpc_address: str, filename: str) -> Tuple[bool, str]:
+    Con 'offset' (reanudación) el pedido es condicional sobre lo que ya hay en el .part:
+    se envían 'offset' y 'prefix_sha256' y el servidor envía solo el resto si su archivo
+    empieza con esos bytes, o el archivo entero si cambió desde el intento anterior.
+    Con 'local_copy' (y sin offset) se envían tamaño y digest de esa copia y el servidor
+    decide. Retorna la condición aplicada ("" si no hubo o si el .part ya quedó completo).
+    'progress' recibe los bytes verificados en disco; 'cancel' corta el stream.
+    """
+    stub = pb2_grpc.TransferStub(channel)
+    request = pb2.FileRequest(filename=filename, accept_compression=accepted_codecs())
+    digest = _prefix_digest(part_path, offset) if offset else hashlib.sha256()
+    if offset and digest.hexdigest() != prefix_sha256:
+        # El .part cambió en disco desde el último registro: no sirve como prefijo
+        offset, digest = 0, hashlib.sha256()
+    if offset:
+        request.have_size = offset
+        request.have_sha256 = prefix_sha256
+    elif local_copy:
+        request.have_size = os.path.getsize(local_copy)
+        request.have_sha256 = file_digest(local_copy)
+    stream = stub.Download(request)
+    condition = dict(stream.initial_metadata() or ()).get(CONDITION_HEADER, "") if request.have_sha256 else ""
+    if condition == "not-modified":
+        verifier = ChunkVerifier()
+        for chunk in stream:
+            verifier.feed(chunk)
+        verifier.finish()
+        # Reanudación: el .part ya es el archivo completo
+        return "" if offset else condition
+    if condition == "tail":
+        if not offset:
+            # Se parte de la copia local (prefijo verificado por el servidor) y se agrega la cola
+            shutil.copyfile(local_copy, part_path)
+            offset = int(request.have_size)
+            digest = _prefix_digest(part_path, offset)
+    elif offset:
+        # El archivo del propietario ya no empieza con lo descargado: se baja entero
+        offset, digest = 0, hashlib.sha256()
+    start = (offset, digest.hexdigest())
+    _save_progress(state_path, filename, *start)
+    written = offset
+    with open(part_path, "r+b" if offset else "wb") as out:
+        out.truncate(offset)
+        out.seek(offset)
+        checkpoint = offset
+        verifier = ChunkVerifier()
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    stream.cancel()
+                    raise DownloadCancelled(f"cancelada en el byte {written}")
+                # Solo se escribe (y cuenta como progreso) lo que pasó la verificación
+                data = verifier.feed(chunk)
+                if data:
+                    out.write(data)
+                    digest.update(data)
+                    written += len(data)
+                    if progress is not None:
+                        progress(written)
+                    if written - checkpoint >= CHECKPOINT_BYTES:
+                        out.flush()
+                        os.fsync(out.fileno())
+                        _save_progress(state_path, filename, written, digest.hexdigest())
+                        checkpoint = written
+            verifier.finish()
+        except IntegrityError:
+            stream.cancel()
+            out.flush()
+            # Si falla el digest del rango no se sabe qué chunk quedó mal:
+            # se descarta todo lo recibido en este intento
+            _save_progress(state_path, filename, *(start if verifier.digest_failed else (written, digest.hexdigest())))
+            raise
+        except BaseException:
+            # Lo escrito es válido aunque el stream se corte: se registra para reanudar
+            out.flush()
+            _save_progress(state_path, filename, written, digest.hexdigest())
+            raise
+    return condition
+
+def download_file(grpc_address: str, filename: str, retries: int = 3, conditional: bool = True,
+                  progress: Optional[Callable[[int], None]] = None,
+                  cancel: Optional[threading.Event] = None) -> Tuple[bool, str]:
     """
     Descarga 'filename' desde un servidor gRPC Transfer en grpc_address y
     lo guarda en el directorio base del nodo.
 
+    Los datos se escriben en '.p2ptmp-<nombre>.part' y el progreso persistido (bytes
+    ya escritos y sincronizados y su SHA-256) en '.p2ptmp-<nombre>.part.json'. Si el
+    stream falla se reintenta hasta 'retries' veces pidiendo solo desde el último offset
+    verificado; el archivo final se renombra de forma atómica al completarse.
+    Un .part que queda tras agotar los reintentos se retoma en la próxima llamada, aun
+    desde otro propietario: el servidor compara el digest de lo ya descargado con el
+    comienzo de su archivo y, si no coincide, lo envía entero.
+    El canal se toma del pool del proceso (ver channel_pool).
+    Con 'conditional' y una copia local ya existente, el servidor responde "sin
+    cambios" si coincide o envía solo la cola si la copia es un prefijo del archivo.
+    'progress' recibe los bytes ya escritos; con 'cancel' activado se corta y el
+    .part queda para reanudar.
+
     Retorna (ok, message)
     """
     base_dir = _ensure_base_dir()
     dest_path = os.path.join(base_dir, filename)
     os.makedirs(os.path.dirname(dest_path) or base_dir, exist_ok=True)
+    part_path = ruta_temporal(dest_path, "part")
+    state_path = part_path + ".json"
 
-    with grpc.insecure_channel(grpc_address) as channel:
-        stub = pb2_grpc.TransferStub(channel)
+    attempt = 0
+    while True:
+        offset, prefix_sha256 = _load_progress(part_path, state_path, filename)
+        local_copy = dest_path if conditional and not offset and os.path.isfile(dest_path) else None
+        have = os.path.getsize(local_copy) if local_copy else 0
         try:
-            stream = stub.Download(pb2.FileRequest(filename=filename))
-            with open(dest_path, "wb") as out:
-                for chunk in stream:
-                    if chunk and chunk.content:
-                        out.write(chunk.content)
-            return True, f"Descargado en {dest_path}"
+            with get_pool().lease(grpc_address) as channel:
+                condition = _download_range(channel, filename, part_path, state_path, offset, prefix_sha256,
+                                            local_copy, progress, cancel)
+            if condition == "not-modified":
+                return True, f"Sin cambios: la copia local {dest_path} coincide con la del propietario"
+            os.replace(part_path, dest_path)
+            # Solo se actualiza la entrada de este archivo en el índice del nodo
+            actualizar_entrada(dest_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            if condition == "tail" and have:
+                return True, f"Descargado en {dest_path} (solo la cola desde el byte {have})"
+            resumed = f" (reanudado en byte {offset})" if offset and condition != "full" else ""
+            return True, f"Descargado en {dest_path}{resumed}"
         except grpc.RpcError as e:
-            return False, f"gRPC error: {e.code().name} {e.details()}"
+            if e.code() in RETRYABLE_CODES and attempt < retries:
+                attempt += 1
+                time.sleep(min(0.2 * 2 ** attempt, 5.0))
+                continue
+            done = _load_progress(part_path, state_path, filename)[0]
+            return False, f"gRPC error: {e.code().name} {e.details()} ({done} bytes en {part_path})"
+        except IntegrityError as e:
+            if attempt < retries:
+                attempt += 1
+                continue
+            return False, f"integridad: {e}"
+        except DownloadCancelled as e:
+            return False, f"{e} ({part_path} queda para reanudar)"
         except Exception as e:
             return False, str(e)
 
-def upload_file(grpc_address: str, filename: str) -> Tuple[bool, str]:
+def _iter_delta_requests(filename: str, basis_path: str, block_size: int, basis_size: int) -> Iterator[pb2.DeltaRequest]:
+    # Encabezado primero (el servidor puede responder "sin cambios" sin esperar las firmas)
+    yield pb2.DeltaRequest(filename=filename, block_size=block_size, basis_size=basis_size,
+                           basis_sha256=file_digest(basis_path))
+    batch = []
+    for sig in iter_signatures(basis_path, block_size):
+        batch.append(sig)
+        if len(batch) >= SIGNATURE_BATCH:
+            yield pb2.DeltaRequest(blocks=batch)
+            batch = []
+    if batch:
+        yield pb2.DeltaRequest(blocks=batch)
+
+def _apply_delta(stream, basis_path: str, block_size: int, basis_size: int, out_path: str,
+                 progress: Optional[Callable[[int], None]] = None,
+                 cancel: Optional[threading.Event] = None) -> Tuple[bool, int, int]:
+    """Reconstruye el archivo nuevo en out_path a partir de la copia vieja y el delta.
+
+    Retorna (sin_cambios, bytes literales recibidos, bytes reutilizados de la copia vieja).
+    """
+    digest = hashlib.sha256()
+    literal = reused = 0
+    next_seq = 0
+    with open(basis_path, "rb") as basis, open(out_path, "wb") as out:
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                stream.cancel()
+                raise DownloadCancelled(f"cancelada en el byte {literal + reused}")
+            if chunk.seq != next_seq:
+                raise IntegrityError(f"chunk fuera de orden: esperado {next_seq}, recibido {chunk.seq}")
+            next_seq += 1
+            if chunk.last:
+                if chunk.not_modified:
+                    return True, 0, 0
+                if chunk.size != literal + reused or chunk.sha256 != digest.hexdigest():
+                    raise IntegrityError("el archivo reconstruido no coincide con el del propietario")
+                return False, literal, reused
+            if chunk.literal:
+                if chunk_crc(chunk.literal) != chunk.crc32:
+                    raise IntegrityError(f"CRC inválido en el chunk {chunk.seq}")
+                out.write(chunk.literal)
+                digest.update(chunk.literal)
+                literal += len(chunk.literal)
+            else:
+                # Referencia a bloques consecutivos de la copia vieja
+                start = chunk.block_index * block_size
+                end = min(basis_size, start + chunk.block_count * block_size)
+                if chunk.block_count <= 0 or start >= end:
+                    raise IntegrityError(f"referencia inválida a los bloques {chunk.block_index}+{chunk.block_count}")
+                basis.seek(start)
+                while start < end:
+                    data = basis.read(min(CHECKPOINT_BYTES, end - start))
+                    if not data:
+                        raise IntegrityError("la copia local cambió durante la sincronización")
+                    out.write(data)
+                    digest.update(data)
+                    start += len(data)
+                    reused += len(data)
+            if progress is not None:
+                progress(literal + reused)
+    raise IntegrityError("stream terminado sin chunk final")
+
+def delta_sync_file(grpc_address: str, filename: str, progress: Optional[Callable[[int], None]] = None,
+                    cancel: Optional[threading.Event] = None) -> Tuple[bool, str]:
+    """
+    Actualiza la copia local de 'filename' por deltas (estilo rsync): se envían firmas
+    por bloque de la copia vieja y el propietario responde solo los datos nuevos más
+    referencias a bloques ya presentes. El archivo se reconstruye en '.p2ptmp-<nombre>.delta'
+    y se renombra al verificar su SHA-256. Sin copia local, o si el propietario no
+    soporta DeltaSync o el resultado no verifica, se usa download_file.
+
+    Retorna (ok, message)
+    """
+    base_dir = _ensure_base_dir()
+    dest_path = os.path.join(base_dir, filename)
+    if not os.path.isfile(dest_path):
+        return download_file(grpc_address, filename, progress=progress, cancel=cancel)
+    tmp_path = ruta_temporal(dest_path, "delta")
+    basis_size = os.path.getsize(dest_path)
+    block_size = block_size_for(basis_size)
+    try:
+        with get_pool().lease(grpc_address) as channel:
+            stub = pb2_grpc.TransferStub(channel)
+            stream = stub.DeltaSync(_iter_delta_requests(filename, dest_path, block_size, basis_size))
+            unchanged, literal, reused = _apply_delta(stream, dest_path, block_size, basis_size, tmp_path, progress, cancel)
+        if unchanged:
+            os.remove(tmp_path)
+            return True, f"Sin cambios: la copia local {dest_path} coincide con la del propietario"
+        os.replace(tmp_path, dest_path)
+        actualizar_entrada(dest_path)
+        return True, f"Sincronizado en {dest_path} por deltas ({literal} bytes nuevos, {reused} reutilizados)"
+    except DownloadCancelled as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False, str(e)
+    except (grpc.RpcError, IntegrityError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return download_file(grpc_address, filename, progress=progress, cancel=cancel)
+
+def _iter_manifest(filenames: List[str]) -> Iterator[pb2.BulkRequest]:
+    for i in range(0, len(filenames), BULK_MANIFEST_BATCH):
+        yield pb2.BulkRequest(filenames=filenames[i:i + BULK_MANIFEST_BATCH])
+
+def _receive_bulk(stream, base_dir: str, filenames: List[str], results: Dict[str, Tuple[bool, str]],
+                  progress: Optional[Callable[[int], None]] = None,
+                  cancel: Optional[threading.Event] = None) -> None:
+    """Escribe los archivos de un stream BulkDownload; el resultado de cada uno va a 'results'."""
+    out = None
+    tmp_path = ""
+    digest = None
+    written = 0
+    current = -1  # índice del archivo en curso (-1: ninguno abierto)
+    broken = False  # el archivo en curso falló: se ignoran sus trozos restantes
+    done = 0
+    try:
+        for response in stream:
+            if cancel is not None and cancel.is_set():
+                stream.cancel()
+                raise DownloadCancelled(f"cancelada tras {done} archivos")
+            for piece in response.pieces:
+                if piece.index != current:
+                    # Los archivos llegan uno tras otro, en el orden del manifiesto
+                    if current >= 0 or piece.index != done or piece.index >= len(filenames):
+                        raise IntegrityError(f"archivo fuera de orden: esperado {done}, recibido {piece.index}")
+                    current, broken = piece.index, False
+                    if not piece.error:
+                        dest_path = os.path.join(base_dir, filenames[current])
+                        os.makedirs(os.path.dirname(dest_path) or base_dir, exist_ok=True)
+                        tmp_path = ruta_temporal(dest_path, "bulk")
+                        out = open(tmp_path, "wb")
+                        digest = hashlib.sha256()
+                        written = 0
+                name = filenames[current]
+                if piece.error:
+                    results[name] = (False, piece.error)
+                elif not broken:
+                    if chunk_crc(piece.content) != piece.crc32:
+                        broken = True
+                        results[name] = (False, "integridad: CRC inválido")
+                    else:
+                        out.write(piece.content)
+                        digest.update(piece.content)
+                        written += len(piece.content)
+                if not piece.last:
+                    continue
+                if out is not None:
+                    out.close()
+                    out = None
+                    if not broken and (piece.size != written or piece.sha256 != digest.hexdigest()):
+                        broken = True
+                        results[name] = (False, "integridad: el digest del archivo no coincide")
+                    if broken:
+                        os.remove(tmp_path)
+                    else:
+                        os.replace(tmp_path, os.path.join(base_dir, name))
+                        actualizar_entrada(name)
+                        results[name] = (True, "ok")
+                current = -1
+                done += 1
+                if progress is not None:
+                    progress(len(results))
+    finally:
+        if out is not None:
+            out.close()
+            os.remove(tmp_path)
+
+def download_files_bulk(grpc_address: str, filenames: List[str], retries: int = 3,
+                        progress: Optional[Callable[[int], None]] = None,
+                        cancel: Optional[threading.Event] = None) -> Dict[str, Tuple[bool, str]]:
+    """
+    Descarga muchos archivos de un mismo propietario en un solo stream BulkDownload:
+    se envía el manifiesto completo por lotes (sin esperar respuestas) y los archivos
+    llegan uno tras otro. Cada archivo se escribe en '.p2ptmp-<nombre>.bulk', se valida (CRC
+    por trozo y SHA-256 del archivo) y se renombra. Si el stream se corta se reintenta
+    solo con los archivos que faltan. 'progress' recibe la cantidad de archivos terminados.
+
+    Retorna {filename: (ok, message)}
+    """
+    base_dir = _ensure_base_dir()
+    results: Dict[str, Tuple[bool, str]] = {}
+    attempt = 0
+    while True:
+        pending = [name for name in filenames if name not in results]
+        if not pending:
+            return results
+        try:
+            with get_pool().lease(grpc_address) as channel:
+                stream = pb2_grpc.TransferStub(channel).BulkDownload(_iter_manifest(pending))
+                _receive_bulk(stream, base_dir, pending, results, progress, cancel)
+            for name in pending:
+                results.setdefault(name, (False, "el propietario no envió el archivo"))
+        except grpc.RpcError as e:
+            if e.code() in RETRYABLE_CODES and attempt < retries:
+                attempt += 1
+                time.sleep(min(0.2 * 2 ** attempt, 5.0))
+                continue
+            for name in pending:
+                results.setdefault(name, (False, f"gRPC error: {e.code().name} {e.details()}"))
+        except (IntegrityError, DownloadCancelled) as e:
+            for name in pending:
+                results.setdefault(name, (False, str(e)))
+        return results
+
+def upload_file(grpc_address: str, filename: str, replica_score: Optional[float] = None) -> Tuple[bool, str]:
     """
     Sube 'filename' desde el directorio base del nodo a un servidor gRPC Transfer en grpc_address.
+    Con 'replica_score' se sube como réplica (con la popularidad local del archivo) y
+    el receptor la acepta solo si entra en su cuota de réplicas.
 
     Retorna (ok, message)
     """
@@ -60,13 +474,254 @@ def upload_file(grpc_address: str, filename: str) -> Tuple[bool, str]:
     if not os.path.isfile(src_path):
         return False, f"Archivo no existe: {src_path}"
 
-    with grpc.insecure_channel(grpc_address) as channel:
-        stub = pb2_grpc.TransferStub(channel)
-        try:
+    # Misma decisión de compresión que usa el servidor al enviar
+    size = os.path.getsize(src_path)
+    codec = choose_codec(src_path, 0, size, accepted_codecs())
+    metadata = [("filename", filename), (COMPRESSION_HEADER, codec)]
+    if replica_score is not None:
+        metadata.append((REPLICA_HEADER, replica_header(size, replica_score)))
+    try:
+        with get_pool().lease(grpc_address) as channel:
+            stub = pb2_grpc.TransferStub(channel)
             # Enviar stream de chunks con metadata para filename destino
-            response = stub.Upload(_iter_file_chunks(src_path), metadata=(("filename", filename),))
-            return bool(response.ok), response.message or ("ok" if response.ok else "error")
-        except grpc.RpcError as e:
-            return False, f"gRPC error: {e.code().name} {e.details()}"
-        except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            response = stub.Upload(_iter_file_chunks(src_path, grpc_address.rsplit(":", 1)[0]),
+                                   metadata=tuple(metadata),
+                                   compression=grpc_compression(codec))
+        return bool(response.ok), response.message or ("ok" if response.ok else "error")
+    except grpc.RpcError as e:
+        return False, f"gRPC error: {e.code().name} {e.details()}"
+    except Exception as e:
+        return False, str(e)
+
+class _Swarm:
+    """Estado compartido de una descarga por piezas desde varias fuentes.
+
+    Cada fuente tiene un hilo que toma piezas de una cola común, así las fuentes
+    rápidas terminan tomando más piezas. Al vaciarse la cola, una fuente ociosa
+    duplica la pieza en curso que más tardaría en completarse (endgame) y la
+    primera copia que termina cancela a la otra.
+    """
+
+    def __init__(self, part_path: str, filename: str, size: int, piece_size: int, sources: List[str],
+                 on_progress: Optional[Callable[[int], None]] = None, cancel: Optional[threading.Event] = None):
+        self.part_path = part_path
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.filename = filename
+        self.size = size
+        self.sources = sources
+        self.lock = threading.Lock()
+        self.pending: Deque[Tuple[int, int]] = deque(
+            (off, min(piece_size, size - off)) for off in range(0, size, piece_size)
+        )
+        self.piece_size = piece_size
+        self.total_pieces = len(self.pending)
+        self.inflight: Dict[int, Dict] = {}
+        self.done: Set[int] = set()
+        self.rates: Dict[str, float] = {}
+        self.active: Set[str] = set(sources)
+        self.bytes_by_source: Dict[str, int] = {src: 0 for src in sources}
+        self.errors: List[str] = []
+
+    def _is_slow(self, source: str) -> bool:
+        rate = self.rates.get(source)
+        others = [self.rates[s] for s in self.active if s != source and s in self.rates]
+        return rate is not None and bool(others) and rate * SLOW_SOURCE_FACTOR < max(others)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def downloaded(self) -> int:
+        """Bytes ya escritos: piezas completas más lo mejor de cada pieza en curso."""
+        with self.lock:
+            done = sum(min(self.size - off, self.piece_size) for off in self.done)
+            return done + sum(max(info["progress"].values() or [0]) for info in self.inflight.values())
+
+    def next_piece(self, source: str) -> Optional[Tuple[int, int]]:
+        with self.lock:
+            if self.cancelled:
+                return None
+            if self.pending and not self._is_slow(source):
+                off, length = self.pending.popleft()
+                self.inflight[off] = {"length": length, "calls": {}, "progress": {}, "start": time.monotonic()}
+                return off, length
+            if self.pending:
+                # Fuente lenta: cede la cola a las demás
+                return None
+            my_rate = self.rates.get(source)
+            if not my_rate:
+                return None
+            best, best_eta = None, 0.0
+            for off, info in self.inflight.items():
+                if source in info["calls"]:
+                    continue
+                done = max(info["progress"].values() or [0])
+                elapsed = max(time.monotonic() - info["start"], 1e-3)
+                eta = (info["length"] - done) / max(done / elapsed, 1.0)
+                if eta > 1.5 * info["length"] / my_rate and eta > best_eta:
+                    best, best_eta = off, eta
+            if best is None:
+                return None
+            return best, self.inflight[best]["length"]
+
+    def register_call(self, off: int, source: str, call) -> bool:
+        with self.lock:
+            info = self.inflight.get(off)
+            if info is None:
+                return False
+            info["calls"][source] = call
+            info["progress"][source] = 0
+            return True
+
+    def progress(self, off: int, source: str, nbytes: int) -> None:
+        with self.lock:
+            info = self.inflight.get(off)
+            if info is not None:
+                info["progress"][source] = nbytes
+
+    def complete(self, off: int, source: str, length: int, elapsed: float) -> None:
+        rate = length / max(elapsed, 1e-6)
+        with self.lock:
+            prev = self.rates.get(source)
+            self.rates[source] = rate if prev is None else 0.5 * prev + 0.5 * rate
+            self.bytes_by_source[source] += length
+            if off in self.done:
+                return
+            self.done.add(off)
+            info = self.inflight.pop(off, None)
+        if info:
+            for other, call in info["calls"].items():
+                if other != source:
+                    call.cancel()
+
+    def fail(self, off: int, source: str, length: int, error: str) -> None:
+        with self.lock:
+            self.active.discard(source)
+            self.errors.append(f"{source}: {error}")
+            info = self.inflight.get(off)
+            if info is None or off in self.done:
+                return
+            info["calls"].pop(source, None)
+            info["progress"].pop(source, None)
+            if not info["calls"]:
+                # Nadie más la está descargando: vuelve a la cola
+                self.inflight.pop(off)
+                self.pending.appendleft((off, length))
+
+    def worker(self, source: str) -> None:
+        with get_pool().lease(source) as channel, open(self.part_path, "r+b") as out:
+            stub = pb2_grpc.TransferStub(channel)
+            while True:
+                piece = self.next_piece(source)
+                if piece is None:
+                    return
+                off, length = piece
+                call = stub.Download(pb2.FileRequest(filename=self.filename, offset=off, length=length,
+                                                     accept_compression=accepted_codecs()))
+                if not self.register_call(off, source, call):
+                    call.cancel()
+                    continue
+                t0 = time.monotonic()
+                got = 0
+                verifier = ChunkVerifier()
+                try:
+                    out.seek(off)
+                    for chunk in call:
+                        if self.cancelled:
+                            call.cancel()
+                            return
+                        data = verifier.feed(chunk)
+                        if data:
+                            out.write(data)
+                            got += len(data)
+                            self.progress(off, source, got)
+                            if self.on_progress is not None:
+                                self.on_progress(self.downloaded())
+                    verifier.finish()
+                    if got != length:
+                        raise RuntimeError(f"pieza incompleta en offset {off}: {got}/{length} bytes")
+                    self.complete(off, source, length, time.monotonic() - t0)
+                except grpc.RpcError as e:
+                    if e.code() == grpc.StatusCode.CANCELLED and off in self.done:
+                        continue  # otra fuente terminó primero esta pieza
+                    self.fail(off, source, length, f"{e.code().name} {e.details()}")
+                    return
+                except Exception as e:
+                    call.cancel()
+                    self.fail(off, source, length, str(e))
+                    return
+
+def _matches_source(source: str, filename: str, path: str) -> bool:
+    """True si 'path' es idéntico al archivo de 'source': pedido condicional en el que el
+    servidor compara tamaño y SHA-256 y responde not-modified sin enviar datos."""
+    request = pb2.FileRequest(filename=filename, have_size=os.path.getsize(path), have_sha256=file_digest(path))
+    try:
+        with get_pool().lease(source) as channel:
+            stream = pb2_grpc.TransferStub(channel).Download(request)
+            try:
+                return dict(stream.initial_metadata() or ()).get(CONDITION_HEADER, "") == "not-modified"
+            finally:
+                stream.cancel()
+    except grpc.RpcError:
+        return False
+
+def download_file_multi(grpc_addresses: List[str], filename: str, size: int, piece_size: int = PIECE_SIZE,
+                        progress: Optional[Callable[[int], None]] = None,
+                        cancel: Optional[threading.Event] = None) -> Tuple[bool, str]:
+    """
+    Descarga 'filename' por rangos desde varias fuentes gRPC a la vez y lo
+    guarda en el directorio base del nodo. 'size' es el tamaño anunciado por
+    la búsqueda. Con una sola fuente (o un archivo de una sola pieza) equivale
+    a download_file. La primera fuente es la de referencia: el archivo armado
+    se compara con el suyo (tamaño y SHA-256) antes de moverlo a su lugar y, si
+    las fuentes tenían versiones distintas, se descarga entero desde ella.
+
+    Retorna (ok, message)
+    """
+    sources = [a for i, a in enumerate(grpc_addresses) if a and a not in grpc_addresses[:i]]
+    if not sources:
+        return False, "sin fuentes"
+    if len(sources) == 1 or size <= piece_size:
+        return download_file(sources[0], filename, progress=progress, cancel=cancel)
+
+    base_dir = _ensure_base_dir()
+    dest_path = os.path.join(base_dir, filename)
+    os.makedirs(os.path.dirname(dest_path) or base_dir, exist_ok=True)
+    # Temporal propio: el '.part' (y su '.part.json') de download_file no se pisa ni se
+    # retoma luego sobre piezas escritas por el enjambre
+    part_path = ruta_temporal(dest_path, "swarm")
+    with open(part_path, "wb") as f:
+        f.truncate(size)
+
+    swarm = _Swarm(part_path, filename, size, piece_size, sources, progress, cancel)
+    threads = [threading.Thread(target=swarm.worker, args=(src,), daemon=True) for src in sources]
+    for t in threads:
+        t.start()
+    # Si todas las fuentes activas terminan pero quedan piezas (p. ej. la única rápida falló),
+    # las fuentes lentas vuelven a tomar la cola en una segunda ronda.
+    for t in threads:
+        t.join()
+    if len(swarm.done) < swarm.total_pieces and swarm.active and not swarm.cancelled:
+        swarm.rates.clear()
+        threads = [threading.Thread(target=swarm.worker, args=(src,), daemon=True) for src in list(swarm.active)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    if swarm.cancelled:
+        os.remove(part_path)
+        return False, f"cancelada ({len(swarm.done)}/{swarm.total_pieces} piezas)"
+    if len(swarm.done) < swarm.total_pieces:
+        # Las piezas no se pueden retomar: el archivo disperso se descarta
+        os.remove(part_path)
+        return False, f"descarga incompleta ({len(swarm.done)}/{swarm.total_pieces} piezas): {'; '.join(swarm.errors)}"
+    if not _matches_source(sources[0], filename, part_path):
+        os.remove(part_path)
+        ok, msg = download_file(sources[0], filename, progress=progress, cancel=cancel)
+        return ok, f"las fuentes no coinciden con {sources[0]}; descarga desde esa fuente: {msg}"
+    os.replace(part_path, dest_path)
+    actualizar_entrada(dest_path)
+    used = ", ".join(f"{src}={n}" for src, n in swarm.bytes_by_source.items())
+    return True, f"Descargado en {dest_path} desde {len(sources)} fuentes ({used})"
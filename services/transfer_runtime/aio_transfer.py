@@ -0,0 +1,223 @@
+import os
+import asyncio
+import hashlib
+import threading
+from typing import AsyncIterator, Iterator, List, Optional
+import aiofiles
+import aiofiles.os
+import grpc
+import transfer_pb2 as pb2
+import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.grpc_transfer import (
+    CONDITION_HEADER, TransferError, begin_upload, counts_as_serve, delta_unchanged, end_upload, iter_bulk_responses, peer_host,
+    resolve_condition, resolve_delta, resolve_range, upload_temp,
+)
+from services.transfer_runtime.delta import SignatureTable, compute_delta
+from services.file_simple.service import actualizar_entrada, file_digest
+from services.transfer_runtime.integrity import ChunkVerifier, IntegrityError, chunk_crc, trailer_chunk
+from services.transfer_runtime.compression import HEADER as COMPRESSION_HEADER, choose_codec, grpc_compression
+from services.transfer_runtime.scheduler import get_scheduler
+from services.transfer_runtime.transport import ChunkSizer, get_transport
+from services.transfer_runtime.chunk_cache import get_chunk_cache
+from services.transfer_runtime.replicas import REPLICA_HEADER, admit_replica, get_replica_store
+from services.directory_simple.popularity import get_popularity
+
+# Implementación grpc.aio del servicio Transfer. Cada stream es una corrutina en un
+# único event loop (no ocupa un hilo del pool mientras el peer consume lento) y la
+# E/S de archivos va por aiofiles. Se elige con 'grpc_server: aio' en el YAML del peer.
+
+DELTA_BATCH = 16  # DeltaChunks (o BulkResponses) calculados por salto a un hilo
+
+def _take(items: Iterator, n: int) -> List:
+    return [item for _, item in zip(range(n), items)]
+
+class AioTransferService(pb2_grpc.TransferServicer):
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    async def Download(self, request: pb2.FileRequest, context) -> AsyncIterator[pb2.FileChunk]:
+        try:
+            file_path, offset, remaining = resolve_range(self.base_dir, request)
+        except TransferError as e:
+            await context.abort(e.code, e.details)
+        # El digest de la copia del servidor puede requerir leer el archivo: fuera del loop
+        condition, offset, remaining = await asyncio.to_thread(resolve_condition, file_path, offset, remaining, request)
+        metadata = [(CONDITION_HEADER, condition)] if condition else []
+        if request.accept_compression:
+            # La elección lee muestras del archivo: también fuera del loop
+            codec = await asyncio.to_thread(choose_codec, file_path, offset, remaining, request.accept_compression)
+            if codec != "identity":
+                context.set_compression(grpc_compression(codec))
+            metadata.append((COMPRESSION_HEADER, codec))
+        if metadata:
+            await context.send_initial_metadata(tuple(metadata))
+        digest = hashlib.sha256()
+        sent = 0
+        seq = 0
+        # Con topes configurados cada chunk espera su turno en el event loop (acquire_async)
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        sizer = ChunkSizer(get_transport())
+        # Archivo caliente: los chunks (contenido + CRC) salen de la caché compartida
+        cache = get_chunk_cache()
+        path = os.path.abspath(file_path)
+        mtime_ns = (await aiofiles.os.stat(file_path)).st_mtime_ns
+        cached = cache.admit(path, mtime_ns)
+        try:
+            async with aiofiles.open(file_path, "rb") as f:
+                pos = None  # posición del archivo; tras un acierto de caché hay que reubicarse
+                while remaining > 0:
+                    length = min(sizer.size, remaining)
+                    key = (path, mtime_ns, offset, length)
+                    entry = cache.get(key) if cached else None
+                    if entry is None:
+                        if pos != offset:
+                            await f.seek(offset)
+                        data = await f.read(length)
+                        if not data:
+                            break
+                        pos = offset + len(data)
+                        entry = (data, chunk_crc(data))
+                        if cached and len(data) == length:
+                            cache.put(key, *entry)
+                    data, crc = entry
+                    await scheduler.acquire_async(stream, len(data))
+                    offset += len(data)
+                    remaining -= len(data)
+                    digest.update(data)
+                    sent += len(data)
+                    yield pb2.FileChunk(content=data, seq=seq, crc32=crc)
+                    sizer.record(len(data))
+                    seq += 1
+            if counts_as_serve(request, condition):
+                get_popularity().record(request.filename)
+            yield trailer_chunk(seq, digest, sent)
+        finally:
+            scheduler.close_stream(stream)
+
+    async def Upload(self, request_iterator: AsyncIterator[pb2.FileChunk], context) -> pb2.UploadResponse:
+        md = dict(context.invocation_metadata() or [])
+        filename = md.get("filename", "")
+        if not filename:
+            return pb2.UploadResponse(ok=False, message="filename metadata requerido")
+        dest_path = os.path.join(self.base_dir, filename)
+        os.makedirs(os.path.dirname(dest_path) or self.base_dir, exist_ok=True)
+        if not begin_upload(dest_path):
+            return pb2.UploadResponse(ok=False, message=f"subida en curso: {filename}")
+        try:
+            return await self._receive_upload(request_iterator, filename, dest_path, md.get(REPLICA_HEADER))
+        finally:
+            end_upload(dest_path)
+
+    async def _receive_upload(self, request_iterator: AsyncIterator[pb2.FileChunk], filename: str, dest_path: str,
+                              replica: Optional[str]) -> pb2.UploadResponse:
+        # Réplica empujada por un vecino: debe entrar en la cuota de réplicas
+        if replica is not None:
+            refused = await asyncio.to_thread(admit_replica, dest_path, filename, replica)
+            if refused:
+                return pb2.UploadResponse(ok=False, message=refused)
+        tmp_path = ""
+        verifier = ChunkVerifier()
+        try:
+            fd, tmp_path = await asyncio.to_thread(upload_temp, dest_path)
+            os.close(fd)
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in request_iterator:
+                    data = verifier.feed(chunk)
+                    if data:
+                        await f.write(data)
+                verifier.finish()
+            await aiofiles.os.replace(tmp_path, dest_path)
+            # Puede disparar un indexar() completo si el índice aún no se construyó
+            await asyncio.to_thread(actualizar_entrada, dest_path)
+            return pb2.UploadResponse(ok=True, message="ok")
+        except IntegrityError as e:
+            if replica is not None:
+                get_replica_store().discard(filename)
+            await aiofiles.os.remove(tmp_path)
+            return pb2.UploadResponse(ok=False, message=f"integridad: {e}")
+        except Exception as e:
+            if replica is not None:
+                get_replica_store().discard(filename)
+            if tmp_path and os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+            return pb2.UploadResponse(ok=False, message=str(e))
+
+    async def DeltaSync(self, request_iterator: AsyncIterator[pb2.DeltaRequest], context) -> AsyncIterator[pb2.DeltaChunk]:
+        header = None
+        async for header in request_iterator:
+            break
+        try:
+            file_path, size = resolve_delta(self.base_dir, header)
+        except TransferError as e:
+            await context.abort(e.code, e.details)
+        if await asyncio.to_thread(delta_unchanged, file_path, size, header):
+            yield pb2.DeltaChunk(seq=0, last=True, not_modified=True, sha256=header.basis_sha256, size=size)
+            return
+        table = SignatureTable(header.block_size, header.basis_size)
+        for sig in header.blocks:
+            table.add(sig)
+        async for request in request_iterator:
+            for sig in request.blocks:
+                table.add(sig)
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        # El cálculo del delta es CPU + lecturas del archivo: corre en hilos, por lotes
+        chunks = compute_delta(file_path, table, get_transport().chunk_size)
+        seq = 0
+        try:
+            while True:
+                batch = await asyncio.to_thread(_take, chunks, DELTA_BATCH)
+                if not batch:
+                    break
+                for chunk in batch:
+                    if chunk.literal:
+                        await scheduler.acquire_async(stream, len(chunk.literal))
+                    seq = chunk.seq + 1
+                    yield chunk
+        finally:
+            scheduler.close_stream(stream)
+            try:
+                chunks.close()
+            except ValueError:
+                pass  # cancelado con un lote aún en su hilo: el generador se cierra al recolectarse
+        get_popularity().record(header.filename)
+        digest = await asyncio.to_thread(file_digest, file_path)
+        yield pb2.DeltaChunk(seq=seq, last=True, sha256=digest, size=size)
+
+    async def BulkDownload(self, request_iterator: AsyncIterator[pb2.BulkRequest], context) -> AsyncIterator[pb2.BulkResponse]:
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        message_size = get_transport().chunk_size
+        index = 0
+        try:
+            async for request in request_iterator:
+                # Abrir y leer muchos archivos chicos bloquea: se empaqueta en hilos, por lotes
+                responses = iter_bulk_responses(self.base_dir, request.filenames, index, message_size)
+                while True:
+                    batch = await asyncio.to_thread(_take, responses, DELTA_BATCH)
+                    if not batch:
+                        break
+                    for response in batch:
+                        await scheduler.acquire_async(stream, sum(len(p.content) for p in response.pieces))
+                        yield response
+                index += len(request.filenames)
+        finally:
+            scheduler.close_stream(stream)
+
+async def _serve(base_dir: str, port: int, started: threading.Event) -> None:
+    server = grpc.aio.server(options=get_transport().server_options())
+    pb2_grpc.add_TransferServicer_to_server(AioTransferService(base_dir), server)
+    server.add_insecure_port(f"[::]:{int(port)}")
+    await server.start()
+    started.set()
+    await server.wait_for_termination()
+
+def start_aio_grpc_server(base_dir: str, port: int) -> threading.Thread:
+    """Levanta el servidor grpc.aio en un hilo propio con su event loop (uvicorn usa el principal)."""
+    started = threading.Event()
+    t = threading.Thread(target=lambda: asyncio.run(_serve(base_dir, port, started)), daemon=True)
+    t.start()
+    started.wait(timeout=10)
+    return t
@@ -1,29 +1,134 @@
 from fastapi import APIRouter
-from typing import Dict, List
+from fastapi.responses import StreamingResponse
+import os
+from typing import Dict, List, Optional
 import json
+import threading
 import urllib.request
 from services.directory_simple.service import get_all
-from services.transfer_client.client import download_file
-from services.file_simple.service import indexar
+from services.transfer_client.client import delta_sync_file, download_file, download_file_multi, grpc_address_of
+from services.file_simple.service import actualizar_entrada, get_base_directory, total_indexados
+from services.transfer_runtime.singleflight import Abandoned, SingleFlight
+from services.transfer_runtime.jobs import FINISHED, Job, QueueFull, get_job_queue
+from services.transfer_runtime.chunk_cache import get_chunk_cache
+from services.transfer_runtime.replication import get_replicator
 
 router = APIRouter(prefix="/transfer", tags=["transfer"])
 
+# Búsquedas y descargas idénticas en curso se comparten entre pedidos concurrentes:
+# una sola inundación de la red y un solo stream escribiendo el archivo destino
+_SEARCHES = SingleFlight()
+_DOWNLOADS = SingleFlight()
+
+class _SharedDownload:
+    """Progreso y cancelación de una descarga compartida por pedidos coalescidos: el
+    progreso llega a todos sus trabajos y la descarga solo se corta cuando todos
+    cancelaron (un pedido síncrono, sin trabajo, nunca cancela). Hace de evento
+    'cancel' para el cliente, que solo consulta is_set()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: List[Job] = []
+        self._sync = 0
+        self._bytes = 0
+
+    def join(self, job: Optional[Job]) -> None:
+        with self._lock:
+            if job is None:
+                self._sync += 1
+            else:
+                self._jobs.append(job)
+            nbytes = self._bytes
+        if job is not None and nbytes:
+            job.update(nbytes)
+
+    def progress(self, nbytes: int) -> None:
+        with self._lock:
+            self._bytes = nbytes
+            jobs = list(self._jobs)
+        for job in jobs:
+            job.update(nbytes)
+
+    def is_set(self) -> bool:
+        with self._lock:
+            return not self._sync and all(job.cancel_event.is_set() for job in self._jobs)
+
+# filename -> señales de la descarga en vuelo (mismo ciclo de vida que su clave en _DOWNLOADS)
+_SHARED: Dict[str, _SharedDownload] = {}
+_SHARED_LOCK = threading.Lock()
+
+def _shared_for(filename: str, job: Optional[Job], current: Optional[_SharedDownload] = None) -> _SharedDownload:
+    """Suma 'job' a las señales registradas de 'filename' (las crea si no hay)."""
+    with _SHARED_LOCK:
+        shared = _SHARED.get(filename)
+        if shared is current and shared is not None:
+            return shared
+        if shared is None:
+            shared = _SHARED[filename] = _SharedDownload()
+        shared.join(job)
+        return shared
+
+def _coalesced_download(filename: str, job: Optional[Job], fn):
+    """Corre fn(shared) una sola vez por filename en vuelo; 'job' recibe el progreso y su
+    cancelación solo deja de esperar (la descarga sigue mientras otro pedido la quiera)."""
+    shared = _shared_for(filename, job)
+
+    def run():
+        # Si el vuelo al que se sumó terminó antes de tomarlo, se usan las señales vigentes
+        current = _shared_for(filename, job, shared)
+        try:
+            return fn(current)
+        finally:
+            with _SHARED_LOCK:
+                if _SHARED.get(filename) is current:
+                    del _SHARED[filename]
+
+    return _DOWNLOADS.do(filename, run, job.cancel_event if job else None)
+
 def _post_json(url: str, payload: Dict, timeout: int = 8):
     data = json.dumps(payload or {}).encode("utf-8")
     req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
     with urllib.request.urlopen(req, timeout=timeout) as r:
         return r.status, r.read().decode("utf-8")
 
-@router.post("/download")
-def transfer_download(payload: Dict[str, object]):
-    """
-    - Toma filename (y TTL opcional, default=3)
-    - Pide a algún vecino de la DL que ejecute /directory/search
-    - Si se encuentra, deriva la dirección gRPC y descarga el archivo
-    - Luego solicita al propietario que re-indexe (best-effort)
-    - Retorna el resultado simple
-    Body: { "filename": str, "ttl"?: int }
-    """
+def _search_neighbors(filename: str, ttl: int, sources: int) -> Dict[str, object]:
+    """Pide a algún vecino de la DL que ejecute la búsqueda distribuida."""
+    for addr in get_all():
+        try:
+            st, txt = _post_json(f"http://{addr}/directory/search", {"filename": filename, "ttl": ttl, "max_results": sources})
+            if st == 200:
+                resp = json.loads(txt)
+                if resp.get("success") and resp.get("found"):
+                    return resp
+        except Exception:
+            continue
+    return {}
+
+def _download_and_index(filename: str, owner_grpc: str, sources_grpc: List[str], size: int, sources: int,
+                        shared: Optional[_SharedDownload] = None):
+    # Con una copia local se sincroniza por deltas contra un solo propietario (sin cambios,
+    # o solo los bloques modificados) en lugar de volver a bajar todo por piezas
+    base_dir = get_base_directory()
+    has_local = bool(base_dir) and os.path.isfile(os.path.join(base_dir, filename))
+    progress = shared.progress if shared else None
+    cancel = shared
+    if sources > 1 and len(sources_grpc) > 1 and size > 0 and not has_local:
+        ok, msg = download_file_multi(sources_grpc, filename, size, progress=progress, cancel=cancel)
+    elif has_local:
+        ok, msg = delta_sync_file(owner_grpc, filename, progress=progress, cancel=cancel)
+    else:
+        ok, msg = download_file(owner_grpc, filename, progress=progress, cancel=cancel)
+    # El cliente ya actualizó la entrada del archivo descargado; acá solo se asegura
+    # (por ejemplo si el índice nunca se construyó) sin recorrer todo el directorio
+    try:
+        actualizar_entrada(filename)
+        total = total_indexados()
+    except Exception:
+        total = None
+    return ok, msg, total
+
+def _parse_download(payload: Dict[str, object]):
+    """Valida el body de una descarga. Retorna (filename, ttl, sources) o un dict de error."""
     if not isinstance(payload, dict):
         return {"success": False, "error": "payload inválido"}
 
@@ -34,20 +139,16 @@ def transfer_download(payload: Dict[str, object]):
         ttl = int(payload.get("ttl", 3))
     except Exception:
         ttl = 3
+    try:
+        sources = max(1, int(payload.get("sources", 1)))
+    except Exception:
+        sources = 1
+    return filename, ttl, sources
 
+def _run_download(filename: str, ttl: int, sources: int, job: Optional[Job] = None) -> Dict[str, object]:
+    """Búsqueda + descarga + reindexado; con 'job' reporta tamaño y progreso y acepta cancelación."""
     # 1) Pedir a algún vecino que ejecute la búsqueda distribuida
-    dl: List[str] = get_all()
-    found_resp: Dict[str, object] = {}
-    for addr in dl:
-        try:
-            st, txt = _post_json(f"http://{addr}/directory/search", {"filename": filename, "ttl": ttl})
-            if st == 200:
-                resp = json.loads(txt)
-                if resp.get("success") and resp.get("found"):
-                    found_resp = resp
-                    break
-        except Exception:
-            continue
+    found_resp, _ = _SEARCHES.do((filename, ttl, sources), lambda: _search_neighbors(filename, ttl, sources))
 
     if not found_resp:
         return {"success": True, "found": False}
@@ -58,20 +159,31 @@ def transfer_download(payload: Dict[str, object]):
         return {"success": True, "found": False}
 
     # 2) Encontrar el puerto gRPC que es el puerto REST + 1000 por convención
-    try:
-        host, port_str = owner_rest.split(":", 1)
-        owner_grpc = f"{host}:{int(port_str) + 1000}"
-    except Exception:
+    owner_grpc = grpc_address_of(owner_rest)
+    if not owner_grpc:
         return {"success": False, "error": "no se pudo derivar direccion gRPC"}
 
-    # 3) Descargar vía gRPC
-    ok, msg = download_file(owner_grpc, filename)
-
+    # 3) Descargar vía gRPC (desde varias fuentes si la búsqueda devolvió más de un propietario)
     # 4) Indexar el nodo que recibe el archivo
+    # La clave es solo el filename: todas las descargas escriben el mismo destino
+    # Solo se combinan piezas de propietarios con el mismo tamaño que el elegido (el
+    # cliente además compara el archivo armado con el del propietario antes de usarlo)
+    holders = found_resp.get("holders") if isinstance(found_resp.get("holders"), list) else []
+    size = int(found_resp.get("size") or 0)
+    sources_grpc = [owner_grpc]
+    for h in holders:
+        if isinstance(h, dict) and int(h.get("size") or 0) == size:
+            g = grpc_address_of(h.get("address"))
+            if g and g not in sources_grpc:
+                sources_grpc.append(g)
+    if job is not None:
+        job.set_total(size)
     try:
-        total = indexar()
-    except Exception:
-        total = None
+        (ok, msg, total), coalesced = _coalesced_download(
+            filename, job, lambda shared: _download_and_index(filename, owner_grpc, sources_grpc, size, sources, shared)
+        )
+    except Abandoned:
+        ok, msg, total, coalesced = False, "cancelada", None, True
 
     return {
         "success": True,
@@ -79,7 +191,99 @@ def transfer_download(payload: Dict[str, object]):
         "owner_id": owner_id,
         "owner_rest": owner_rest,
         "owner_grpc": owner_grpc,
+        "sources_grpc": sources_grpc if sources > 1 else [owner_grpc],
         "download_ok": ok,
         "message": msg,
         "local_reindex_total": total,
-    }
\ No newline at end of file
+        "coalesced": coalesced,
+    }
+
+@router.post("/download")
+def transfer_download(payload: Dict[str, object]):
+    """
+    - Toma filename (y TTL opcional, default=3)
+    - Pide a algún vecino de la DL que ejecute /directory/search
+    - Si se encuentra, deriva la dirección gRPC y descarga el archivo
+    - Con "sources" > 1 busca hasta esa cantidad de propietarios y descarga
+      por rangos desde todos a la vez
+    - Luego solicita al propietario que re-indexe (best-effort)
+    - Pedidos concurrentes del mismo archivo comparten búsqueda y descarga
+    - Retorna el resultado simple
+    Body: { "filename": str, "ttl"?: int, "sources"?: int }
+    """
+    parsed = _parse_download(payload)
+    if isinstance(parsed, dict):
+        return parsed
+    return _run_download(*parsed)
+
+@router.post("/jobs")
+def create_job(payload: Dict[str, object]):
+    """
+    Encola la misma descarga que /transfer/download y responde al instante con el id.
+    Body: { "filename": str, "ttl"?: int, "sources"?: int, "priority"?: int (mayor = antes) }
+    """
+    parsed = _parse_download(payload)
+    if isinstance(parsed, dict):
+        return parsed
+    filename, ttl, sources = parsed
+    try:
+        priority = int(payload.get("priority", 0))
+    except Exception:
+        priority = 0
+
+    def runner(job: Job):
+        result = _run_download(filename, ttl, sources, job)
+        return bool(result.get("found") and result.get("download_ok")), result
+
+    try:
+        job = get_job_queue().submit(filename, runner, priority)
+    except QueueFull as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "job_id": job.id, "status": job.status}
+
+@router.get("/jobs")
+def list_jobs():
+    return {"success": True, "data": get_job_queue().list_jobs()}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return {"success": False, "error": "trabajo no encontrado"}
+    return {"success": True, **job.snapshot()}
+
+@router.get("/jobs/{job_id}/events")
+def job_events(job_id: str):
+    """Progreso del trabajo como NDJSON: una línea por cambio (o cada 5 s) hasta que termina."""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return {"success": False, "error": "trabajo no encontrado"}
+
+    def events():
+        while True:
+            version = job.version
+            snap = job.snapshot()
+            yield json.dumps(snap) + "\n"
+            if snap["status"] in FINISHED:
+                return
+            queue.wait_change(job, version, timeout=5.0)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return {"success": False, "error": "trabajo no encontrado"}
+    return {"success": True, "job_id": job.id, "status": job.status}
+
+@router.get("/cache")
+def cache_stats():
+    """Métricas de la caché de chunks del servidor gRPC (aciertos, bytes, desalojos)."""
+    return {"success": True, **get_chunk_cache().stats()}
+
+@router.get("/replication")
+def replication_stats():
+    """Archivos calientes de este nodo, réplicas empujadas y cuota de réplicas recibidas."""
+    return {"success": True, **get_replicator().stats()}
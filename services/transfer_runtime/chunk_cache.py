@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Caché LRU en memoria de chunks de archivos "calientes" del servidor de transferencia.
+# - Clave: (ruta, mtime_ns, offset, largo); un archivo modificado cambia de mtime y sus
+#   chunks viejos salen por LRU sin invalidación explícita
+# - Se guarda el contenido y su CRC, así un acierto evita la lectura y el cálculo del CRC
+# - Presupuesto en bytes: al superarlo se descartan los chunks menos usados
+# - Admisión: un archivo entra en caché recién cuando fue pedido 'admit_after' veces,
+#   para que una descarga única de un archivo grande no desplace a los populares
+
+DEFAULT_ADMIT_AFTER = 2
+MAX_TRACKED_FILES = 10000
+
+ChunkKey = Tuple[str, int, int, int]
+
+class ChunkCache:
+    def __init__(self, budget_bytes: int = 0, admit_after: int = DEFAULT_ADMIT_AFTER):
+        self.budget = max(0, int(budget_bytes))
+        self.admit_after = max(1, int(admit_after))
+        self._lock = threading.Lock()
+        self._chunks: "OrderedDict[ChunkKey, Tuple[bytes, int]]" = OrderedDict()
+        self._requests: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_hit = 0
+        self.bytes_missed = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def admit(self, path: str, mtime_ns: int) -> bool:
+        """Registra un pedido del archivo; True si sus chunks deben pasar por la caché."""
+        if not self.enabled:
+            return False
+        key = (path, mtime_ns)
+        with self._lock:
+            count = self._requests.pop(key, 0) + 1
+            self._requests[key] = count
+            if len(self._requests) > MAX_TRACKED_FILES:
+                self._requests.popitem(last=False)
+            return count >= self.admit_after
+
+    def get(self, key: ChunkKey) -> Optional[Tuple[bytes, int]]:
+        with self._lock:
+            entry = self._chunks.get(key)
+            if entry is None:
+                self.misses += 1
+                self.bytes_missed += key[3]
+                return None
+            self._chunks.move_to_end(key)
+            self.hits += 1
+            self.bytes_hit += len(entry[0])
+            return entry
+
+    def put(self, key: ChunkKey, data: bytes, crc: int) -> None:
+        if len(data) > self.budget:
+            return
+        with self._lock:
+            old = self._chunks.pop(key, None)
+            if old is not None:
+                self.used -= len(old[0])
+            self._chunks[key] = (data, crc)
+            self.used += len(data)
+            while self.used > self.budget:
+                _, (evicted, _) = self._chunks.popitem(last=False)
+                self.used -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "budget_bytes": self.budget,
+                "used_bytes": self.used,
+                "chunks": len(self._chunks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes_hit": self.bytes_hit,
+                "bytes_missed": self.bytes_missed,
+                "evictions": self.evictions,
+                "tracked_files": len(self._requests),
+            }
+
+_CACHE = ChunkCache()
+
+def get_chunk_cache() -> ChunkCache:
+    return _CACHE
+
+def configure_chunk_cache(budget_bytes: int = 0, admit_after: int = DEFAULT_ADMIT_AFTER) -> ChunkCache:
+    """Presupuesto de la caché en bytes (0 = desactivada) y pedidos necesarios para admitir un archivo."""
+    global _CACHE
+    _CACHE = ChunkCache(budget_bytes, admit_after)
+    return _CACHE
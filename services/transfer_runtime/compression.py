@@ -0,0 +1,66 @@
+import os
+import zlib
+import threading
+from typing import Dict, Optional, Tuple
+import grpc
+
+# Negociación de compresión por transferencia. El cliente anuncia los códecs que
+# acepta (FileRequest.accept_compression) y el emisor decide con una muestra del
+# rango a enviar: formatos ya comprimidos se envían tal cual y el resto solo se
+# comprime si la muestra se reduce lo suficiente. La compresión la hace gRPC a
+# nivel de mensaje, así los CRC/digest siguen calculándose sobre los bytes originales.
+
+SUPPORTED_CODECS = {"gzip": grpc.Compression.Gzip}
+COMPRESSED_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".zip", ".gz", ".tgz", ".bz2", ".xz",
+    ".zst", ".7z", ".rar", ".mp3", ".mp4", ".mkv", ".webm", ".avi", ".docx", ".xlsx", ".pptx",
+}
+SAMPLE_BYTES = 16 * 1024  # por cada una de las 3 posiciones muestreadas
+MAX_RATIO = 0.85  # comprimir solo si la muestra queda en <= 85% de su tamaño
+MIN_SIZE = 4 * 1024  # rangos más chicos no compensan
+MAX_CACHED_DECISIONS = 4096
+
+HEADER = "x-transfer-compression"
+
+_lock = threading.Lock()
+_decisions: Dict[Tuple[str, int, int], float] = {}
+
+def _sample_ratio(path: str, offset: int, length: int) -> float:
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, offset // (1 << 20))
+    with _lock:
+        if key in _decisions:
+            return _decisions[key]
+    positions = {offset, offset + max(0, length // 2 - SAMPLE_BYTES // 2), offset + max(0, length - SAMPLE_BYTES)}
+    sample = bytearray()
+    with open(path, "rb") as f:
+        for pos in sorted(positions):
+            f.seek(pos)
+            sample += f.read(min(SAMPLE_BYTES, length))
+    ratio = len(zlib.compress(bytes(sample), 1)) / max(1, len(sample))
+    with _lock:
+        if len(_decisions) >= MAX_CACHED_DECISIONS:
+            _decisions.clear()
+        _decisions[key] = ratio
+    return ratio
+
+def choose_codec(path: str, offset: int, length: int, accepted: str) -> str:
+    """Devuelve el códec a usar para enviar [offset, offset+length) de 'path' ("identity" = sin compresión)."""
+    codecs = [c.strip() for c in (accepted or "").split(",") if c.strip() in SUPPORTED_CODECS]
+    if not codecs or length < MIN_SIZE:
+        return "identity"
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return "identity"
+    try:
+        if _sample_ratio(path, offset, length) > MAX_RATIO:
+            return "identity"
+    except OSError:
+        return "identity"
+    return codecs[0]
+
+def grpc_compression(codec: str) -> Optional[grpc.Compression]:
+    return SUPPORTED_CODECS.get(codec)
+
+def accepted_codecs() -> str:
+    """Valor para FileRequest.accept_compression desde este nodo."""
+    return ",".join(SUPPORTED_CODECS)
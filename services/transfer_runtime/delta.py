@@ -0,0 +1,213 @@
+import os
+import math
+import zlib
+import hashlib
+from typing import Dict, Iterator, List, Optional, Tuple
+import transfer_pb2 as pb2
+from services.transfer_runtime.integrity import chunk_crc
+
+# Sincronización por deltas estilo rsync.
+# - El cliente divide su copia vieja en bloques fijos y envía por bloque un checksum
+#   débil (adler32, el mismo de zlib) y uno fuerte (BLAKE2b de 16 bytes).
+# - El servidor recorre el archivo nuevo: si el bloque en la posición actual coincide
+#   con algún bloque viejo envía una referencia; si no, lo acumula como literal.
+# - Camino rápido alineado: cada bloque se prueba entero con zlib.adler32 (en C), y ante
+#   un fallo se prueban los bloques alineados siguientes (edición en el lugar). Solo
+#   cuando la alineación se pierde (inserciones/borrados) se desliza el adler32 byte a
+#   byte en Python, y como mucho un bloque por intento; tras una búsqueda fallida se
+#   reintenta cada ROLL_EVERY bloques sin coincidencia.
+# Así los bytes en el cable son proporcionales al cambio y no al tamaño del archivo.
+
+MIN_BLOCK = 2 * 1024
+MAX_BLOCK = 64 * 1024
+SIGNATURE_BATCH = 4096  # firmas por mensaje DeltaRequest
+ROLL_EVERY = 8
+# Bloques más chicos que los de rsync: más firmas (~24 bytes por bloque) a cambio de
+# menos literal por cada edición pequeña, que es el caso dominante entre versiones
+BLOCK_DIVISOR = 4
+ALIGNED_PROBES = 2  # una edición de hasta un bloque toca como mucho dos bloques alineados
+_ADLER_MOD = 65521
+# El archivo nuevo se lee por tramos (sin mmap: si se trunca mientras se recorre, un
+# mapeo produciría SIGBUS; una lectura solo se acorta y el digest final no verifica)
+WINDOW_BYTES = 4 * 1024 * 1024
+
+def block_size_for(size: int) -> int:
+    """Bloque ~ raíz cuadrada del tamaño (como rsync) / BLOCK_DIVISOR, múltiplo de 1 KiB y acotado."""
+    bs = int(math.sqrt(max(size, 1)) / BLOCK_DIVISOR) // 1024 * 1024
+    return max(MIN_BLOCK, min(MAX_BLOCK, bs))
+
+def strong_hash(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def iter_signatures(path: str, block_size: int) -> Iterator[pb2.BlockSignature]:
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block_size * 256)
+            if not buf:
+                break
+            view = memoryview(buf)
+            for pos in range(0, len(buf), block_size):
+                block = view[pos:pos + block_size]
+                yield pb2.BlockSignature(weak=zlib.adler32(block), strong=strong_hash(block))
+
+class SignatureTable:
+    """Firmas de la copia vieja indexadas por checksum débil."""
+
+    def __init__(self, block_size: int, basis_size: int):
+        self.block_size = block_size
+        self.basis_size = basis_size
+        self.strong: List[bytes] = []
+        self.by_weak: Dict[int, List[int]] = {}
+
+    def add(self, sig: pb2.BlockSignature) -> None:
+        self.by_weak.setdefault(sig.weak, []).append(len(self.strong))
+        self.strong.append(bytes(sig.strong))
+
+    def block_len(self, index: int) -> int:
+        return min(self.block_size, self.basis_size - index * self.block_size)
+
+    def find(self, weak: int, data, prefer: int) -> int:
+        """Índice del bloque viejo idéntico a 'data' (-1 si no hay); ante varios, 'prefer'."""
+        candidates = self.by_weak.get(weak)
+        if not candidates:
+            return -1
+        strong = strong_hash(data)
+        if prefer in candidates and self.strong[prefer] == strong and self.block_len(prefer) == len(data):
+            return prefer
+        for i in candidates:
+            if self.strong[i] == strong and self.block_len(i) == len(data):
+                return i
+        return -1
+
+class _DeltaEncoder:
+    def __init__(self, f, size: int, table: SignatureTable, chunk_size: int):
+        self.f = f
+        self.n = size
+        self.buf = b""
+        self.base = 0  # posición en el archivo de buf[0]
+        self.table = table
+        self.bs = table.block_size
+        self.chunk_size = chunk_size
+        self.seq = 0
+        self.lit_start = 0
+        self.ref: Optional[Tuple[int, int]] = None  # (primer bloque, cantidad)
+
+    def _window(self, start: int, end: int) -> memoryview:
+        """Bytes [start, end) del archivo (recortados al final). En memoria se conserva
+        desde lit_start: lo anterior ya se envió o se referenció y no se vuelve a leer."""
+        end = min(end, self.n)
+        top = self.base + len(self.buf)
+        if start < self.base or end > top:
+            keep = self.lit_start  # nunca mayor que 'start'
+            want = keep + max(end - keep, WINDOW_BYTES)
+            if self.base <= keep < top:
+                head = self.buf[keep - self.base:]
+            else:
+                head, top = b"", keep
+            self.f.seek(top)
+            tail = self.f.read(want - top)
+            self.buf = head + tail
+            self.base = keep
+            if len(tail) < want - top:
+                # El archivo se acortó mientras se recorría
+                self.n = min(self.n, keep + len(self.buf))
+                end = min(end, self.n)
+        return memoryview(self.buf)[start - self.base:max(start, end) - self.base]
+
+    def _chunk(self, **fields) -> pb2.DeltaChunk:
+        chunk = pb2.DeltaChunk(seq=self.seq, **fields)
+        self.seq += 1
+        return chunk
+
+    def _flush_ref(self) -> Iterator[pb2.DeltaChunk]:
+        if self.ref is not None:
+            start, count = self.ref
+            self.ref = None
+            yield self._chunk(block_index=start, block_count=count)
+
+    def _flush_literal(self, end: int, whole: bool) -> Iterator[pb2.DeltaChunk]:
+        """Emite literales de [lit_start, end); con whole=False solo los chunks completos."""
+        while self.lit_start < end and (whole or end - self.lit_start >= self.chunk_size):
+            yield from self._flush_ref()
+            stop = min(end, self.lit_start + self.chunk_size)
+            data = bytes(self._window(self.lit_start, stop))
+            yield self._chunk(literal=data, crc32=chunk_crc(data))
+            self.lit_start = stop
+
+    def _match(self, pos: int, prefer: int) -> int:
+        length = min(self.bs, self.n - pos)
+        if length <= 0:
+            return -1
+        block = self._window(pos, pos + length)
+        return self.table.find(zlib.adler32(block), block, prefer)
+
+    def _roll(self, pos: int, prefer: int) -> Tuple[int, int]:
+        """Desliza el adler32 desde 'pos' hasta un bloque; retorna (posición, índice) o (-1, -1)."""
+        bs = self.bs
+        if min(pos + bs, self.n - bs) <= pos:
+            return -1, -1
+        view = self._window(pos, pos + 2 * bs)
+        end = min(pos + bs, self.n - bs)
+        if end <= pos:
+            return -1, -1
+        weak = zlib.adler32(view[:bs])
+        a, b = weak & 0xFFFF, weak >> 16
+        by_weak = self.table.by_weak
+        buf, base = self.buf, self.base
+        for i in range(pos - base, end - base):
+            x_out = buf[i]
+            a = (a - x_out + buf[i + bs]) % _ADLER_MOD
+            b = (b - bs * x_out + a - 1) % _ADLER_MOD
+            weak = (b << 16) | a
+            if weak in by_weak:
+                j = self.table.find(weak, memoryview(buf)[i + 1:i + 1 + bs], prefer)
+                if j >= 0:
+                    return base + i + 1, j
+        return -1, -1
+
+    def encode(self) -> Iterator[pb2.DeltaChunk]:
+        p = 0
+        expected = 0
+        misses = 0
+        known: Optional[Tuple[int, int]] = None  # coincidencia ya calculada (posición, índice)
+        while p < self.n:
+            i = known[1] if known and known[0] == p else self._match(p, expected)
+            known = None
+            if i >= 0:
+                yield from self._flush_literal(p, whole=True)
+                if self.ref is not None and self.ref[0] + self.ref[1] == i:
+                    self.ref = (self.ref[0], self.ref[1] + 1)
+                else:
+                    yield from self._flush_ref()
+                    self.ref = (i, 1)
+                p += self.table.block_len(i)
+                self.lit_start = p
+                expected = i + 1
+                misses = 0
+                continue
+            misses += 1
+            # Edición en el lugar: alguno de los ALIGNED_PROBES bloques siguientes sigue alineado
+            nxt = p + self.bs
+            for step in range(1, ALIGNED_PROBES + 1):
+                at = p + step * self.bs
+                j = self._match(at, expected + step) if at < self.n else -1
+                if j >= 0:
+                    break
+            if j >= 0:
+                known = (at, j)
+                p = at
+            else:
+                q, j = self._roll(p, expected) if misses == 1 or misses % ROLL_EVERY == 0 else (-1, -1)
+                if q >= 0:
+                    known = (q, j)
+                    p = q
+                else:
+                    p = min(nxt, self.n)
+            yield from self._flush_literal(p, whole=False)
+        yield from self._flush_literal(self.n, whole=True)
+        yield from self._flush_ref()
+
+def compute_delta(file_path: str, table: SignatureTable, chunk_size: int) -> Iterator[pb2.DeltaChunk]:
+    """DeltaChunks (sin el chunk final) que transforman la copia vieja en 'file_path'."""
+    with open(file_path, "rb") as f:
+        yield from _DeltaEncoder(f, os.fstat(f.fileno()).st_size, table, chunk_size).encode()
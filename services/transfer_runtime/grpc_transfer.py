@@ -1,12 +1,259 @@
 import os
+import mmap
+import struct
+import hashlib
+import itertools
+import tempfile
 import threading
 from concurrent import futures
-from typing import Iterator
+from typing import Dict, Iterator, Optional, Set, Tuple
 import grpc
 import transfer_pb2 as pb2
 import transfer_pb2_grpc as pb2_grpc
+from services.transfer_runtime.integrity import ChunkVerifier, IntegrityError, chunk_crc, trailer_chunk
+from services.transfer_runtime.compression import HEADER as COMPRESSION_HEADER, choose_codec, grpc_compression
+from services.transfer_runtime.scheduler import get_scheduler
+from services.file_simple.service import actualizar_entrada, es_temporal, file_digest, ruta_temporal
+from services.transfer_runtime.transport import ChunkSizer, get_transport
+from services.transfer_runtime.chunk_cache import get_chunk_cache
+from services.transfer_runtime.replicas import REPLICA_HEADER, admit_replica, get_replica_store
+from services.directory_simple.popularity import get_popularity
+from services.transfer_runtime.delta import MAX_BLOCK, MIN_BLOCK, SignatureTable, compute_delta
 
-CHUNK_SIZE = 64 * 1024  # 64KB
+# Servir Download desde un mmap compartido en lugar de f.read() por chunk. Es opt-in
+# (mmap_download en el YAML): si un archivo se trunca fuera del nodo mientras se sirve,
+# el acceso a sus páginas truncadas produce SIGBUS y mata todo el proceso del nodo.
+USE_MMAP = False
+# Resultado de una transferencia condicional (FileRequest.have_size/have_sha256),
+# enviado en la metadata inicial: "not-modified" (solo el chunk final, sin datos),
+# "tail" (solo los bytes desde have_size) o "full" (la copia local no sirve)
+CONDITION_HEADER = "x-transfer-condition"
+# BulkDownload: trozo mínimo al partir un archivo entre mensajes y costo estimado
+# de cada BulkPiece (índice, CRC, flags) al llenar un mensaje
+BULK_MIN_PIECE = 4 * 1024
+BULK_PIECE_OVERHEAD = 16
+# Permisos de los archivos subidos: mkstemp crea el temporal con 0600
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+class _ChunkView:
+    """FileChunk cuyo contenido es una vista (memoryview) sobre el mmap del archivo.
+
+    Se serializa a mano con el mismo formato de wire que pb2.FileChunk, así el
+    contenido se copia una sola vez (de la página mapeada al mensaje final) en
+    lugar de pasar por un bytes intermedio y por el objeto protobuf.
+    """
+    __slots__ = ("content", "seq", "crc32")
+
+    def __init__(self, content: memoryview, seq: int, crc32: Optional[int] = None):
+        self.content = content
+        self.seq = seq
+        self.crc32 = chunk_crc(content) if crc32 is None else crc32
+
+    def SerializeToString(self) -> bytes:
+        parts = []
+        if len(self.content):
+            parts.append(b"\x0a" + _varint(len(self.content)))  # campo 1 (content), bytes
+            parts.append(self.content)
+        if self.seq:
+            parts.append(b"\x10" + _varint(self.seq))  # campo 2 (seq), varint
+        parts.append(b"\x1d" + struct.pack("<I", self.crc32))  # campo 3 (crc32), fixed32
+        return b"".join(parts)
+
+class _MappedFile:
+    __slots__ = ("key", "file", "mm", "view", "refs")
+
+    def __init__(self, key: Tuple[str, int, int]):
+        self.key = key
+        self.file = open(key[0], "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self.mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.mm.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.mm)
+        self.refs = 0
+
+    def close(self) -> None:
+        try:
+            self.view.release()
+            self.mm.close()
+        except BufferError:
+            # Aún hay chunks en vuelo apuntando al mapeo: se libera cuando el GC los recoja
+            pass
+        self.file.close()
+
+class _MappingRegistry:
+    """Mapeos abiertos por (ruta, mtime, tamaño), compartidos entre lectores concurrentes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[str, int, int], _MappedFile] = {}
+
+    def acquire(self, path: str) -> Optional[_MappedFile]:
+        st = os.stat(path)
+        if st.st_size == 0:
+            return None  # no se puede mapear un archivo vacío
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._open.get(key)
+            if entry is None:
+                entry = _MappedFile(key)
+                self._open[key] = entry
+            entry.refs += 1
+            return entry
+
+    def release(self, entry: Optional[_MappedFile]) -> None:
+        if entry is None:
+            return
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            if self._open.get(entry.key) is entry:
+                del self._open[entry.key]
+        entry.close()
+
+_MAPPINGS = _MappingRegistry()
+
+class TransferError(Exception):
+    """Error de validación de una transferencia, con el código gRPC a devolver."""
+
+    def __init__(self, code: grpc.StatusCode, details: str):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+def peer_host(context) -> str:
+    """Host del peer remoto ('ipv4:127.0.0.1:5432' -> '127.0.0.1'), para agrupar sus streams."""
+    try:
+        peer = context.peer() or ""
+    except Exception:
+        return ""
+    host = peer.split(":", 1)[1] if peer.startswith(("ipv4:", "ipv6:")) else peer
+    return host.rsplit(":", 1)[0]
+
+def resolve_range(base_dir: str, request: pb2.FileRequest) -> Tuple[str, int, int]:
+    """Valida un FileRequest y devuelve (ruta, offset, bytes a enviar)."""
+    filename = request.filename or ""
+    if not filename:
+        raise TransferError(grpc.StatusCode.INVALID_ARGUMENT, "filename requerido")
+    file_path = os.path.join(base_dir, filename)
+    # Un temporal de una transferencia en curso no se sirve aunque se lo pida por nombre
+    if es_temporal(filename) or not os.path.isfile(file_path):
+        raise TransferError(grpc.StatusCode.NOT_FOUND, f"archivo no encontrado: {filename}")
+    size = os.path.getsize(file_path)
+    offset = max(0, int(request.offset or 0))
+    if offset > size:
+        raise TransferError(grpc.StatusCode.OUT_OF_RANGE, f"offset {offset} fuera del archivo ({size} bytes)")
+    # length=0 significa "hasta el final"; los rangos se recortan al tamaño real
+    remaining = size - offset
+    if request.length and request.length > 0:
+        remaining = min(remaining, int(request.length))
+    return file_path, offset, remaining
+
+# Destinos con una subida en curso (compartido por los servidores de hilos y aio): una
+# segunda subida del mismo archivo se rechaza en lugar de mezclarse con la primera
+_UPLOADS: Set[str] = set()
+_UPLOADS_LOCK = threading.Lock()
+
+def begin_upload(dest_path: str) -> bool:
+    """Reserva 'dest_path' para una subida; False si ya hay otra en curso."""
+    key = os.path.abspath(dest_path)
+    with _UPLOADS_LOCK:
+        if key in _UPLOADS:
+            return False
+        _UPLOADS.add(key)
+        return True
+
+def end_upload(dest_path: str) -> None:
+    with _UPLOADS_LOCK:
+        _UPLOADS.discard(os.path.abspath(dest_path))
+
+def upload_temp(dest_path: str) -> Tuple[int, str]:
+    """Crea un temporal único para una subida hacia 'dest_path'. Retorna (descriptor, ruta)."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path),
+                                    prefix=os.path.basename(ruta_temporal(dest_path, "")), suffix=".upload")
+    os.fchmod(fd, 0o666 & ~_UMASK)
+    return fd, tmp_path
+
+def resolve_condition(file_path: str, offset: int, remaining: int, request: pb2.FileRequest) -> Tuple[str, int, int]:
+    """Aplica la condición de un pedido del archivo completo. Retorna (condición, offset, bytes a enviar)."""
+    if not request.have_sha256 or request.have_size <= 0 or offset or request.length:
+        return "", offset, remaining
+    size = offset + remaining
+    have = int(request.have_size)
+    try:
+        if have == size and file_digest(file_path) == request.have_sha256:
+            return "not-modified", size, 0
+        # La copia local es un prefijo del archivo: solo falta la cola
+        if have < size and file_digest(file_path, have) == request.have_sha256:
+            return "tail", have, size - have
+    except OSError:
+        pass
+    return "full", offset, remaining
+
+def counts_as_serve(request: pb2.FileRequest, condition: str) -> bool:
+    """True si un Download completo cuenta para la popularidad del archivo: solo el del
+    archivo entero (o la primera pieza de uno por piezas) y si envió datos. Un "sin
+    cambios" y una sonda cortada antes del final (client._matches_source) no cuentan."""
+    return not request.offset and condition != "not-modified"
+
+def resolve_delta(base_dir: str, header: Optional[pb2.DeltaRequest]) -> Tuple[str, int]:
+    """Valida el primer DeltaRequest y devuelve (ruta, tamaño actual del archivo)."""
+    if header is None:
+        raise TransferError(grpc.StatusCode.INVALID_ARGUMENT, "DeltaRequest vacío")
+    if not MIN_BLOCK <= header.block_size <= MAX_BLOCK or header.basis_size < 0:
+        raise TransferError(grpc.StatusCode.INVALID_ARGUMENT, f"block_size inválido: {header.block_size}")
+    file_path, _, size = resolve_range(base_dir, pb2.FileRequest(filename=header.filename))
+    return file_path, size
+
+def delta_unchanged(file_path: str, size: int, header: pb2.DeltaRequest) -> bool:
+    """True si la copia del cliente ya es idéntica al archivo (mismo tamaño y SHA-256)."""
+    return bool(header.basis_sha256) and header.basis_size == size and file_digest(file_path) == header.basis_sha256
+
+def iter_bulk_responses(base_dir: str, filenames, first_index: int, message_size: int) -> Iterator[pb2.BulkResponse]:
+    """Empaqueta los archivos de un lote del manifiesto en BulkResponse de ~message_size bytes."""
+    response = pb2.BulkResponse()
+    packed = 0
+    for index, filename in enumerate(filenames, first_index):
+        try:
+            file_path, _, size = resolve_range(base_dir, pb2.FileRequest(filename=filename))
+        except TransferError as e:
+            response.pieces.add(index=index, last=True, error=e.details)
+            continue
+        digest = hashlib.sha256()
+        sent = 0
+        with open(file_path, "rb") as f:
+            while True:
+                # Un archivo chico entra entero en un trozo; uno grande se reparte entre mensajes
+                data = f.read(min(max(message_size - packed, BULK_MIN_PIECE), size - sent))
+                digest.update(data)
+                sent += len(data)
+                last = not data or sent >= size
+                piece = response.pieces.add(index=index, content=data, crc32=chunk_crc(data), last=last)
+                if last:
+                    piece.sha256 = digest.hexdigest()
+                    piece.size = sent
+                    get_popularity().record(filename)
+                packed += len(data) + BULK_PIECE_OVERHEAD
+                if packed >= message_size:
+                    yield response
+                    response = pb2.BulkResponse()
+                    packed = 0
+                if last:
+                    break
+    if response.pieces:
+        yield response
 
 ## Implementaciones de los métodos del servicio gRPC.
 class TransferService(pb2_grpc.TransferServicer):
@@ -15,21 +262,110 @@ class TransferService(pb2_grpc.TransferServicer):
         os.makedirs(self.base_dir, exist_ok=True)
 
     def Download(self, request: pb2.FileRequest, context) -> Iterator[pb2.FileChunk]:
-        filename = request.filename or ""
-        if not filename:
-            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "filename requerido")
-        file_path = os.path.join(self.base_dir, filename)
-        if not os.path.isfile(file_path):
-            context.abort(grpc.StatusCode.NOT_FOUND, f"archivo no encontrado: {filename}")
+        try:
+            file_path, offset, remaining = resolve_range(self.base_dir, request)
+        except TransferError as e:
+            context.abort(e.code, e.details)
+        condition, offset, remaining = resolve_condition(file_path, offset, remaining, request)
+        metadata = [(CONDITION_HEADER, condition)] if condition else []
+        if request.accept_compression:
+            # Compresión negociada por transferencia según una muestra del rango
+            codec = choose_codec(file_path, offset, remaining, request.accept_compression)
+            if codec != "identity":
+                context.set_compression(grpc_compression(codec))
+            metadata.append((COMPRESSION_HEADER, codec))
+        if metadata:
+            context.send_initial_metadata(tuple(metadata))
+        # Cada chunk lleva su CRC; al final se envía el SHA-256 de todo el rango servido
+        digest = hashlib.sha256()
+        sent = 0
+        seq = 0
+        # La emisión de cada chunk la reparte el scheduler (WFQ + topes de nodo/peer/stream)
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        try:
+            # Tamaño de chunk según la configuración de transporte (fijo o adaptativo)
+            sizer = ChunkSizer(get_transport())
+            cache = get_chunk_cache()
+            st = os.stat(file_path)
+            if cache.admit(os.path.abspath(file_path), st.st_mtime_ns):
+                # Archivo caliente: sus chunks (contenido + CRC) se sirven desde memoria
+                chunks = self._iter_cached(file_path, st.st_mtime_ns, offset, remaining, sizer)
+            elif USE_MMAP:
+                chunks = self._iter_mapped(file_path, offset, remaining, sizer)
+            else:
+                chunks = self._iter_read(file_path, offset, remaining, sizer)
+            for chunk in chunks:
+                scheduler.acquire(stream, len(chunk.content))
+                digest.update(chunk.content)
+                sent += len(chunk.content)
+                seq = chunk.seq + 1
+                yield chunk
+                sizer.record(len(chunk.content))
+            if counts_as_serve(request, condition):
+                get_popularity().record(request.filename)
+            yield trailer_chunk(seq, digest, sent)
+        finally:
+            scheduler.close_stream(stream)
+
+    def _iter_read(self, file_path: str, offset: int, remaining: int, sizer: ChunkSizer) -> Iterator[pb2.FileChunk]:
         seq = 0
         with open(file_path, "rb") as f:
-            while True:
-                data = f.read(CHUNK_SIZE)
+            f.seek(offset)
+            while remaining > 0:
+                data = f.read(min(sizer.size, remaining))
                 if not data:
                     break
-                yield pb2.FileChunk(content=data, seq=seq)
+                remaining -= len(data)
+                yield pb2.FileChunk(content=data, seq=seq, crc32=chunk_crc(data))
                 seq += 1
 
+    def _iter_cached(self, file_path: str, mtime_ns: int, offset: int, remaining: int, sizer: ChunkSizer) -> Iterator[_ChunkView]:
+        cache = get_chunk_cache()
+        path = os.path.abspath(file_path)
+        f = None
+        seq = 0
+        try:
+            while remaining > 0:
+                length = min(sizer.size, remaining)
+                key = (path, mtime_ns, offset, length)
+                entry = cache.get(key)
+                if entry is None:
+                    if f is None:
+                        f = open(file_path, "rb")
+                    if f.tell() != offset:
+                        f.seek(offset)
+                    data = f.read(length)
+                    if not data:
+                        break
+                    entry = (data, chunk_crc(data))
+                    if len(data) == length:
+                        cache.put(key, *entry)
+                data, crc = entry
+                yield _ChunkView(data, seq, crc)
+                offset += len(data)
+                remaining -= len(data)
+                seq += 1
+        finally:
+            if f is not None:
+                f.close()
+
+    def _iter_mapped(self, file_path: str, offset: int, remaining: int, sizer: ChunkSizer) -> Iterator[_ChunkView]:
+        entry = _MAPPINGS.acquire(file_path)
+        if entry is None:
+            return
+        try:
+            end = min(offset + remaining, len(entry.mm))
+            seq = 0
+            pos = offset
+            while pos < end:
+                step = min(sizer.size, end - pos)
+                yield _ChunkView(entry.view[pos:pos + step], seq)
+                pos += step
+                seq += 1
+        finally:
+            _MAPPINGS.release(entry)
+
     def Upload(self, request_iterator: Iterator[pb2.FileChunk], context) -> pb2.UploadResponse:
         # filename llega por metadata del contexto
         md = dict(context.invocation_metadata() or [])
@@ -38,20 +374,136 @@ class TransferService(pb2_grpc.TransferServicer):
             return pb2.UploadResponse(ok=False, message="filename metadata requerido")
         dest_path = os.path.join(self.base_dir, filename)
         os.makedirs(os.path.dirname(dest_path) or self.base_dir, exist_ok=True)
+        if not begin_upload(dest_path):
+            return pb2.UploadResponse(ok=False, message=f"subida en curso: {filename}")
+        try:
+            return self._receive_upload(request_iterator, filename, dest_path, md.get(REPLICA_HEADER))
+        finally:
+            end_upload(dest_path)
+
+    def _receive_upload(self, request_iterator: Iterator[pb2.FileChunk], filename: str, dest_path: str,
+                        replica: Optional[str]) -> pb2.UploadResponse:
+        # Réplica empujada por un vecino: debe entrar en la cuota de réplicas
+        if replica is not None:
+            refused = admit_replica(dest_path, filename, replica)
+            if refused:
+                return pb2.UploadResponse(ok=False, message=refused)
+        # Se escribe en un temporal propio del stream y se renombra al final: nunca se
+        # trunca un archivo que otro stream pueda estar sirviendo (mapeado) ni queda uno a medias
+        tmp_path = ""
+        verifier = ChunkVerifier()
         try:
-            with open(dest_path, "wb") as f:
+            fd, tmp_path = upload_temp(dest_path)
+            with os.fdopen(fd, "wb") as f:
                 for chunk in request_iterator:
                     if not isinstance(chunk, pb2.FileChunk):
                         continue
-                    if chunk.content:
-                        f.write(chunk.content)
+                    # Se valida antes de escribir: un chunk corrupto corta la subida de inmediato
+                    data = verifier.feed(chunk)
+                    if data:
+                        f.write(data)
+                verifier.finish()
+            os.replace(tmp_path, dest_path)
+            # Si el directorio servido es el del nodo, el archivo subido queda indexado
+            actualizar_entrada(dest_path)
             return pb2.UploadResponse(ok=True, message="ok")
+        except IntegrityError as e:
+            if replica is not None:
+                get_replica_store().discard(filename)
+            os.remove(tmp_path)
+            return pb2.UploadResponse(ok=False, message=f"integridad: {e}")
         except Exception as e:
+            if replica is not None:
+                get_replica_store().discard(filename)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return pb2.UploadResponse(ok=False, message=str(e))
 
+    def DeltaSync(self, request_iterator: Iterator[pb2.DeltaRequest], context) -> Iterator[pb2.DeltaChunk]:
+        # El primer mensaje trae el encabezado (y quizá firmas); el resto, más firmas
+        header = next(request_iterator, None)
+        try:
+            file_path, size = resolve_delta(self.base_dir, header)
+        except TransferError as e:
+            context.abort(e.code, e.details)
+        if delta_unchanged(file_path, size, header):
+            yield pb2.DeltaChunk(seq=0, last=True, not_modified=True, sha256=header.basis_sha256, size=size)
+            return
+        table = SignatureTable(header.block_size, header.basis_size)
+        for request in itertools.chain((header,), request_iterator):
+            for sig in request.blocks:
+                table.add(sig)
+        # Solo los literales pasan por el scheduler: las referencias no cargan datos
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        seq = 0
+        try:
+            for chunk in compute_delta(file_path, table, get_transport().chunk_size):
+                if chunk.literal:
+                    scheduler.acquire(stream, len(chunk.literal))
+                seq = chunk.seq + 1
+                yield chunk
+        finally:
+            scheduler.close_stream(stream)
+        get_popularity().record(header.filename)
+        yield pb2.DeltaChunk(seq=seq, last=True, sha256=file_digest(file_path), size=size)
+
+    def BulkDownload(self, request_iterator: Iterator[pb2.BulkRequest], context) -> Iterator[pb2.BulkResponse]:
+        # Cada lote del manifiesto se atiende apenas llega; el cliente no espera respuestas
+        # para enviar el siguiente, así que el stream nunca queda vacío entre archivos
+        scheduler = get_scheduler()
+        stream = scheduler.open_stream(peer_host(context))
+        message_size = get_transport().chunk_size
+        index = 0
+        try:
+            for request in request_iterator:
+                for response in iter_bulk_responses(self.base_dir, request.filenames, index, message_size):
+                    scheduler.acquire(stream, sum(len(p.content) for p in response.pieces))
+                    yield response
+                index += len(request.filenames)
+        finally:
+            scheduler.close_stream(stream)
+
+def _serialize_chunk(chunk) -> bytes:
+    # Acepta tanto pb2.FileChunk como _ChunkView
+    return chunk.SerializeToString()
+
+def add_transfer_servicer(servicer: TransferService, server: grpc.Server) -> None:
+    """Equivalente a pb2_grpc.add_TransferServicer_to_server, pero con un serializador
+    de respuesta que admite los chunks pre-codificados del camino mmap."""
+    handlers = {
+        "Download": grpc.unary_stream_rpc_method_handler(
+            servicer.Download,
+            request_deserializer=pb2.FileRequest.FromString,
+            response_serializer=_serialize_chunk,
+        ),
+        "Upload": grpc.stream_unary_rpc_method_handler(
+            servicer.Upload,
+            request_deserializer=pb2.FileChunk.FromString,
+            response_serializer=pb2.UploadResponse.SerializeToString,
+        ),
+        "DeltaSync": grpc.stream_stream_rpc_method_handler(
+            servicer.DeltaSync,
+            request_deserializer=pb2.DeltaRequest.FromString,
+            response_serializer=pb2.DeltaChunk.SerializeToString,
+        ),
+        "BulkDownload": grpc.stream_stream_rpc_method_handler(
+            servicer.BulkDownload,
+            request_deserializer=pb2.BulkRequest.FromString,
+            response_serializer=pb2.BulkResponse.SerializeToString,
+        ),
+    }
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler("transfer.Transfer", handlers),))
+
+def configure_mmap(enabled: bool) -> None:
+    """Activa o desactiva el camino mmap de Download (por defecto, read())."""
+    global USE_MMAP
+    USE_MMAP = bool(enabled)
+
 def start_grpc_server(base_dir: str, port: int) -> threading.Thread:
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
-    pb2_grpc.add_TransferServicer_to_server(TransferService(base_dir), server)
+    # Ventanas, tamaño de mensaje y keepalive según la sección 'transport' del YAML
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8), options=get_transport().server_options())
+    add_transfer_servicer(TransferService(base_dir), server)
     server.add_insecure_port(f"[::]:{int(port)}")
     server.start()
 
@@ -0,0 +1,53 @@
+import zlib
+import hashlib
+import transfer_pb2 as pb2
+
+# Verificación incremental de un stream de FileChunk: cada chunk trae el CRC-32
+# de su contenido y el stream cierra con un chunk 'last' que lleva el SHA-256 y
+# el tamaño de todo lo enviado. El receptor valida a medida que llegan los chunks
+# (sin una segunda pasada sobre el archivo) y corta en el primer error.
+
+class IntegrityError(Exception):
+    pass
+
+def chunk_crc(data) -> int:
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+def trailer_chunk(seq: int, digest: "hashlib._Hash", size: int) -> pb2.FileChunk:
+    return pb2.FileChunk(seq=seq, last=True, sha256=digest.hexdigest(), size=size)
+
+class ChunkVerifier:
+    def __init__(self):
+        self.next_seq = 0
+        self.received = 0
+        self.complete = False
+        # True si falló la validación final: lo recibido pasó los CRC pero el rango no es confiable
+        self.digest_failed = False
+        self._digest = hashlib.sha256()
+
+    def feed(self, chunk: pb2.FileChunk) -> bytes:
+        """Valida un chunk y devuelve su contenido (vacío para el chunk final)."""
+        if self.complete:
+            raise IntegrityError("chunk recibido después del chunk final")
+        if chunk.seq != self.next_seq:
+            raise IntegrityError(f"chunk fuera de orden: esperado {self.next_seq}, recibido {chunk.seq}")
+        self.next_seq += 1
+        if chunk.last:
+            if chunk.size != self.received:
+                self.digest_failed = True
+                raise IntegrityError(f"tamaño inconsistente: anunciado {chunk.size}, recibido {self.received}")
+            if chunk.sha256 != self._digest.hexdigest():
+                self.digest_failed = True
+                raise IntegrityError("SHA-256 del stream no coincide")
+            self.complete = True
+            return b""
+        data = chunk.content
+        if chunk_crc(data) != chunk.crc32:
+            raise IntegrityError(f"CRC inválido en chunk {chunk.seq}")
+        self._digest.update(data)
+        self.received += len(data)
+        return data
+
+    def finish(self) -> None:
+        if not self.complete:
+            raise IntegrityError(f"stream truncado tras {self.received} bytes: falta el chunk final")
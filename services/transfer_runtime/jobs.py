@@ -0,0 +1,196 @@
+import time
+import heapq
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Cola de trabajos de descarga en segundo plano. El endpoint encola y responde con
+# el id al instante; un pool acotado de hilos ejecuta los trabajos por prioridad
+# (mayor primero, FIFO entre iguales). Cada trabajo publica su progreso (bytes,
+# tasa, ETA) y puede cancelarse estando en cola o en curso.
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 100
+KEEP_FINISHED = 200  # trabajos terminados que se conservan para consulta
+NOTIFY_INTERVAL_S = 0.25  # frecuencia máxima de avisos de progreso a los observadores
+RATE_SMOOTHING = 0.3
+
+FINISHED = ("done", "failed", "cancelled")
+
+class QueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id: str, filename: str, priority: int, runner: Callable[["Job"], Tuple[bool, Dict]]):
+        self.id = job_id
+        self.filename = filename
+        self.priority = priority
+        self.runner = runner
+        self.status = "queued"
+        self.total = 0
+        self.bytes = 0
+        self.rate = 0.0
+        self.result: Dict = {}
+        self.error = ""
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.version = 0
+        self._queue: Optional["JobQueue"] = None
+        self._mark: Tuple[float, int] = (time.monotonic(), 0)
+
+    def set_total(self, total: int) -> None:
+        self.total = max(0, int(total or 0))
+        self._changed()
+
+    def update(self, nbytes: int) -> None:
+        """Callback de progreso: bytes escritos hasta ahora."""
+        self.bytes = nbytes
+        now = time.monotonic()
+        t0, b0 = self._mark
+        if now - t0 >= NOTIFY_INTERVAL_S:
+            rate = (nbytes - b0) / (now - t0)
+            self.rate = rate if not self.rate else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+            self._mark = (now, nbytes)
+            self._changed()
+
+    def _changed(self) -> None:
+        if self._queue is not None:
+            self._queue._notify(self)
+        else:
+            self.version += 1
+
+    def snapshot(self) -> Dict:
+        eta = None
+        if self.status == "running" and self.total and self.rate > 0:
+            eta = max(0.0, (self.total - self.bytes) / self.rate)
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "priority": self.priority,
+            "bytes": self.bytes,
+            "total": self.total,
+            "rate_bps": round(self.rate, 1),
+            "eta_s": round(eta, 1) if eta is not None else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "result": self.result,
+        }
+
+class JobQueue:
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED):
+        self.workers = max(1, int(workers))
+        self.max_queued = max(1, int(max_queued))
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int, Job]] = []
+        self._seq = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+
+    def _start_workers_locked(self) -> None:
+        # Los hilos se crean con el primer trabajo: importar el módulo no levanta nada
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def submit(self, filename: str, runner: Callable[[Job], Tuple[bool, Dict]], priority: int = 0) -> Job:
+        with self._cond:
+            queued = sum(1 for _, _, j in self._heap if j.status == "queued")
+            if queued >= self.max_queued:
+                raise QueueFull(f"cola llena ({queued} trabajos en espera)")
+            job = Job(uuid.uuid4().hex[:12], filename, int(priority), runner)
+            job._queue = self
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (-job.priority, self._seq, job))
+            self._seq += 1
+            self._trim_locked()
+            self._start_workers_locked()
+            self._cond.notify_all()
+            return job
+
+    def _trim_locked(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED]
+        for jid in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return [j.snapshot() for j in jobs]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """En cola: se descarta. En curso: se activa su evento y la descarga corta en el próximo chunk."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_event.set()
+            if job.status == "queued":
+                self._finish_locked(job, "cancelled")
+            return job
+
+    def _finish_locked(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished = time.time()
+        job.version += 1
+        self._cond.notify_all()
+
+    def _notify(self, job: Job) -> None:
+        with self._cond:
+            job.version += 1
+            self._cond.notify_all()
+
+    def wait_change(self, job: Job, version: int, timeout: float) -> int:
+        """Espera a que el trabajo cambie respecto de 'version'; devuelve la versión actual."""
+        with self._cond:
+            if job.version == version and job.status not in FINISHED:
+                self._cond.wait(timeout)
+            return job.version
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if job.status != "queued":
+                    continue  # cancelado mientras esperaba
+                job.status = "running"
+                job.started = time.time()
+                job._mark = (time.monotonic(), 0)
+                job.version += 1
+                self._cond.notify_all()
+            try:
+                ok, result = job.runner(job)
+                error = "" if ok else str(result.get("message") or result.get("error") or "")
+            except Exception as e:
+                ok, result, error = False, {}, str(e)
+            with self._cond:
+                job.result = result
+                job.error = error
+                if job.cancel_event.is_set():
+                    status = "cancelled"
+                else:
+                    status = "done" if ok else "failed"
+                self._finish_locked(job, status)
+
+_QUEUE = JobQueue()
+
+def get_job_queue() -> JobQueue:
+    return _QUEUE
+
+def configure_job_queue(workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED) -> JobQueue:
+    """Tamaño del pool de trabajos y tope de la cola; llamar antes de encolar."""
+    global _QUEUE
+    _QUEUE = JobQueue(workers, max_queued)
+    return _QUEUE
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from services.file_simple.service import quitar_entrada
+from services.directory_simple.popularity import get_popularity
+
+# Réplicas recibidas de otros nodos (Upload con la metadata REPLICA_HEADER). Ocupan
+# una cuota propia en bytes: para admitir una réplica nueva se descartan las réplicas
+# locales menos populares, y solo si son más frías que la que llega. Los archivos
+# originales del nodo nunca se cuentan ni se descartan. Con 'path' la lista de réplicas
+# se persiste en un JSON tras cada cambio y se recarga al arrancar: sin ella, tras un
+# reinicio las réplicas pasarían por originales y quedarían fuera de la cuota.
+
+REPLICA_HEADER = "x-replica"  # valor: "<tamaño>:<puntaje de popularidad en el emisor>"
+DEFAULT_QUOTA_BYTES = 0
+
+def replica_header(size: int, score: float) -> str:
+    return f"{int(size)}:{float(score):.3f}"
+
+def parse_replica_header(value: str) -> Tuple[int, float]:
+    size, _, score = str(value).partition(":")
+    return max(0, int(size)), float(score or 0)
+
+class ReplicaStore:
+    def __init__(self, quota_bytes: int = DEFAULT_QUOTA_BYTES, clock: Callable[[], float] = time.time, path: str = ""):
+        self.quota = max(0, int(quota_bytes))
+        self.clock = clock
+        self.path = path
+        self._lock = threading.Lock()
+        self._replicas: Dict[str, Tuple[str, int, float]] = {}  # filename -> (ruta, tamaño, llegada)
+        self.used = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Recarga las réplicas persistidas cuyo archivo sigue en disco; si ya no entran en
+        la cuota (p. ej. porque se redujo) se descartan las más antiguas."""
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        entries = data.get("replicas") if isinstance(data, dict) else None
+        with self._lock:
+            for entry in entries if isinstance(entries, list) else []:
+                try:
+                    filename, path, added = str(entry["filename"]), str(entry["path"]), float(entry.get("added") or 0)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    continue
+                if os.path.isfile(path):
+                    size = os.path.getsize(path)
+                    self._replicas[filename] = (path, size, added)
+                    self.used += size
+            evicted = []
+            for name in sorted(self._replicas, key=lambda n: self._replicas[n][2]):
+                if self.used <= self.quota:
+                    break
+                path, size, _ = self._replicas.pop(name)
+                self.used -= size
+                evicted.append((name, path))
+            self._save_locked()
+        for name, path in evicted:
+            self.evictions += 1
+            self._delete(name, path)
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        data = {"version": 1, "replicas": [{"filename": name, "path": path, "size": size, "added": added}
+                                           for name, (path, size, added) in self._replicas.items()]}
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def is_replica(self, filename: str) -> bool:
+        with self._lock:
+            return filename in self._replicas
+
+    def replicas(self) -> List[str]:
+        with self._lock:
+            return list(self._replicas)
+
+    def reserve(self, filename: str, path: str, size: int, score: float, score_fn: Callable[[str], float]) -> bool:
+        """Reserva cuota para la réplica 'filename' (escrita en 'path'), descartando réplicas
+        más frías si hace falta."""
+        with self._lock:
+            old = self._replicas.get(filename)
+            used = self.used - (old[1] if old else 0)
+            victims: List[str] = []
+            for name in sorted((n for n in self._replicas if n != filename), key=score_fn):
+                if used + size <= self.quota or score_fn(name) >= score:
+                    break
+                victims.append(name)
+                used -= self._replicas[name][1]
+            if used + size > self.quota:
+                return False
+            evicted = [(name, self._replicas.pop(name)[0]) for name in victims]
+            self._replicas[filename] = (path, size, self.clock())
+            self.used = used + size
+            self._save_locked()
+        for name, victim_path in evicted:
+            self.evictions += 1
+            self._delete(name, victim_path)
+        return True
+
+    def discard(self, filename: str) -> None:
+        """Libera la reserva de una réplica cuya subida falló (si ya había una copia, queda)."""
+        with self._lock:
+            entry = self._replicas.pop(filename, None)
+            if entry is not None:
+                path, size, added = entry
+                self.used -= size
+                if os.path.isfile(path):
+                    size = os.path.getsize(path)
+                    self._replicas[filename] = (path, size, added)
+                    self.used += size
+                self._save_locked()
+
+    def expire(self, score_fn: Callable[[str], float], cold_score: float, min_age_s: float) -> List[str]:
+        """Descarta las réplicas con puntaje < cold_score que ya tuvieron 'min_age_s' para enfriarse."""
+        now = self.clock()
+        with self._lock:
+            victims = [name for name, (_, _, added) in self._replicas.items()
+                       if now - added >= min_age_s and score_fn(name) < cold_score]
+            evicted = [(name, self._replicas.pop(name)) for name in victims]
+            for _, (_, size, _) in evicted:
+                self.used -= size
+            if evicted:
+                self._save_locked()
+        for name, (path, _, _) in evicted:
+            self.evictions += 1
+            self._delete(name, path)
+        return victims
+
+    def _delete(self, filename: str, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        quitar_entrada(path)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"quota_bytes": self.quota, "used_bytes": self.used,
+                    "replicas": len(self._replicas), "evictions": self.evictions}
+
+def admit_replica(dest_path: str, filename: str, header: str) -> Optional[str]:
+    """Decide si se acepta una réplica entrante. Retorna el motivo del rechazo o None."""
+    try:
+        size, score = parse_replica_header(header)
+    except ValueError:
+        return "metadata de réplica inválida"
+    store = get_replica_store()
+    if os.path.exists(dest_path) and not store.is_replica(filename):
+        return "el archivo ya existe en este nodo"
+    if not store.reserve(filename, dest_path, size, score, get_popularity().score):
+        return "sin cuota para réplicas"
+    return None
+
+_STORE = ReplicaStore()
+
+def get_replica_store() -> ReplicaStore:
+    return _STORE
+
+def configure_replica_store(quota_bytes: int = DEFAULT_QUOTA_BYTES, path: str = "") -> ReplicaStore:
+    global _STORE
+    _STORE = ReplicaStore(quota_bytes, path=path)
+    return _STORE
@@ -0,0 +1,127 @@
+import os
+import time
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+from services.file_simple.service import get_base_directory, listar_archivos
+from services.directory_simple.service import get_all, get_self_address
+from services.directory_simple.popularity import get_popularity
+from services.transfer_client.client import grpc_address_of, upload_file
+from services.transfer_runtime.replicas import get_replica_store
+
+# Replicación proactiva según demanda. Cada 'interval_s' el nodo toma sus archivos
+# más populares (puntaje >= hot_score, ver popularity.py) y los empuja como réplica
+# por Upload a hasta 'fanout' vecinos de la DL que aún no los recibieron. Como los
+# vecinos también replican lo que se les pide, un archivo caliente se expande desde
+# su dueño mientras dura la demanda; las réplicas que se enfrían (puntaje < cold_score)
+# se descartan en el receptor, que además respeta su propia cuota (replicas.py).
+
+DEFAULT_INTERVAL_S = 30.0
+DEFAULT_HOT_SCORE = 8.0
+DEFAULT_COLD_SCORE = 1.0
+DEFAULT_FANOUT = 1
+DEFAULT_MAX_HOT_FILES = 4
+DEFAULT_REPUSH_S = 600.0  # no se reintenta el mismo archivo al mismo vecino antes de esto
+DEFAULT_REPLICA_MIN_AGE_S = 300.0  # una réplica nueva no se descarta por fría antes de esto
+
+class Replicator:
+    def __init__(self, enabled: bool = False, interval_s: float = DEFAULT_INTERVAL_S,
+                 hot_score: float = DEFAULT_HOT_SCORE, cold_score: float = DEFAULT_COLD_SCORE,
+                 fanout: int = DEFAULT_FANOUT, max_hot_files: int = DEFAULT_MAX_HOT_FILES,
+                 repush_s: float = DEFAULT_REPUSH_S, replica_min_age_s: float = DEFAULT_REPLICA_MIN_AGE_S):
+        self.enabled = bool(enabled)
+        self.interval_s = max(0.1, float(interval_s))
+        self.hot_score = float(hot_score)
+        self.cold_score = float(cold_score)
+        self.fanout = max(1, int(fanout))
+        self.max_hot_files = max(1, int(max_hot_files))
+        self.repush_s = float(repush_s)
+        self.replica_min_age_s = float(replica_min_age_s)
+        self.pushes = 0
+        self.failures = 0
+        self._pushed: Dict[Tuple[str, str], float] = {}  # (archivo, vecino) -> último intento
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict]) -> "Replicator":
+        cfg = cfg or {}
+        def num(key: str, default: float) -> float:
+            value = cfg.get(key)
+            return default if value is None else float(value)
+        return cls(
+            enabled=bool(cfg.get("enabled", False)),
+            interval_s=num("interval_s", DEFAULT_INTERVAL_S),
+            hot_score=num("hot_score", DEFAULT_HOT_SCORE),
+            cold_score=num("cold_score", DEFAULT_COLD_SCORE),
+            fanout=int(num("fanout", DEFAULT_FANOUT)),
+            max_hot_files=int(num("max_hot_files", DEFAULT_MAX_HOT_FILES)),
+            repush_s=num("repush_s", DEFAULT_REPUSH_S),
+            replica_min_age_s=num("replica_min_age_s", DEFAULT_REPLICA_MIN_AGE_S),
+        )
+
+    def _local_files(self) -> Dict[str, str]:
+        """filename -> ruta relativa al directorio base de los archivos indexados."""
+        base_dir = get_base_directory() or ""
+        return {e["filename"]: os.path.relpath(e["path"], base_dir) for e in listar_archivos()}
+
+    def _neighbors(self) -> List[str]:
+        return [a for a in get_all() if a != get_self_address()]
+
+    def _push(self, neighbor: str, relpath: str, score: float) -> Tuple[bool, str]:
+        return upload_file(grpc_address_of(neighbor), relpath, replica_score=score)
+
+    def run_once(self, now: Optional[float] = None) -> List[Tuple[str, str, bool]]:
+        """Una ronda: descarta réplicas frías y empuja los archivos calientes. Retorna los envíos."""
+        now = time.monotonic() if now is None else now
+        popularity = get_popularity()
+        get_replica_store().expire(popularity.score, self.cold_score, self.replica_min_age_s)
+        self._pushed = {k: t for k, t in self._pushed.items() if now - t < self.repush_s}
+        files = self._local_files()
+        neighbors = self._neighbors()
+        done: List[Tuple[str, str, bool]] = []
+        for filename, score in popularity.top(self.max_hot_files, self.hot_score):
+            relpath = files.get(filename)
+            if relpath is None:
+                continue
+            candidates = [n for n in neighbors if (filename, n) not in self._pushed]
+            for neighbor in random.sample(candidates, k=min(self.fanout, len(candidates))):
+                self._pushed[(filename, neighbor)] = now
+                ok, _ = self._push(neighbor, relpath, score)
+                self.pushes += 1 if ok else 0
+                self.failures += 0 if ok else 1
+                done.append((filename, neighbor, ok))
+        return done
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.run_once()
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {"enabled": self.enabled, "pushes": self.pushes, "failures": self.failures,
+                "hot": get_popularity().top(self.max_hot_files, self.hot_score),
+                "replicas": get_replica_store().stats()}
+
+_REPLICATOR = Replicator()
+
+def get_replicator() -> Replicator:
+    return _REPLICATOR
+
+def configure_replication(cfg: Optional[Dict] = None) -> Replicator:
+    """Configura (sección 'replication' del YAML) e inicia la replicación si está habilitada."""
+    global _REPLICATOR
+    _REPLICATOR.stop()
+    _REPLICATOR = Replicator.from_config(cfg)
+    _REPLICATOR.start()
+    return _REPLICATOR
@@ -0,0 +1,181 @@
+import time
+import asyncio
+import threading
+from typing import Dict, List, Optional
+
+# Reparto del ancho de banda de subida del nodo entre streams concurrentes.
+# - Token bucket por nodo, por peer y por stream (tasas en bytes/s; 0 = sin límite)
+# - Weighted fair queuing entre streams: cada pedido de N bytes recibe una etiqueta
+#   de fin virtual F = max(V, F_anterior_del_stream) + N / peso y se atiende primero el
+#   pedido elegible con menor F. Un Download enorme no puede acaparar el enlace: un
+#   stream nuevo (p. ej. un archivo chico) entra con la etiqueta del tiempo virtual
+#   actual y se intercala de inmediato.
+# Los buckets admiten "deuda": un pedido se concede si el bucket no está en negativo,
+# así chunks más grandes que la ráfaga no bloquean y la tasa media se respeta.
+# acquire() bloquea el hilo (servidor de hilos, clientes); el servidor grpc.aio usa
+# acquire_async(), que espera en el event loop sin ocupar un hilo por stream frenado.
+
+BURST_SECONDS = 0.25  # ráfaga permitida = tasa * BURST_SECONDS
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate * BURST_SECONDS, 1.0))
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if now > self.last:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+    def ready(self) -> bool:
+        return self.tokens >= 0
+
+    def consume(self, n: float) -> None:
+        self.tokens -= n
+
+    def wait_time(self) -> float:
+        """Segundos hasta que el bucket deje de estar en negativo."""
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class StreamHandle:
+    def __init__(self, peer: str, weight: float, bucket: Optional[TokenBucket]):
+        self.peer = peer
+        self.weight = max(float(weight), 1e-6)
+        self.bucket = bucket
+        self.last_finish = 0.0
+
+class _Request:
+    __slots__ = ("stream", "nbytes", "finish", "granted")
+
+    def __init__(self, stream: StreamHandle, nbytes: int, finish: float):
+        self.stream = stream
+        self.nbytes = nbytes
+        self.finish = finish
+        self.granted = False
+
+class TransferScheduler:
+    def __init__(self, node_rate: float = 0, peer_rate: float = 0, stream_rate: float = 0):
+        self.node_rate = float(node_rate or 0)
+        self.peer_rate = float(peer_rate or 0)
+        self.stream_rate = float(stream_rate or 0)
+        self._cond = threading.Condition()
+        self._node_bucket = TokenBucket(self.node_rate) if self.node_rate > 0 else None
+        self._peer_buckets: Dict[str, TokenBucket] = {}
+        self._peer_streams: Dict[str, int] = {}
+        self._waiting: List[_Request] = []
+        self._vtime = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.node_rate > 0 or self.peer_rate > 0 or self.stream_rate > 0
+
+    def open_stream(self, peer: str = "", weight: float = 1.0) -> StreamHandle:
+        with self._cond:
+            if self.peer_rate > 0 and peer not in self._peer_buckets:
+                self._peer_buckets[peer] = TokenBucket(self.peer_rate)
+            self._peer_streams[peer] = self._peer_streams.get(peer, 0) + 1
+            handle = StreamHandle(peer, weight, TokenBucket(self.stream_rate) if self.stream_rate > 0 else None)
+            handle.last_finish = self._vtime
+            return handle
+
+    def close_stream(self, handle: StreamHandle) -> None:
+        with self._cond:
+            left = self._peer_streams.get(handle.peer, 1) - 1
+            if left <= 0:
+                self._peer_streams.pop(handle.peer, None)
+                self._peer_buckets.pop(handle.peer, None)
+            else:
+                self._peer_streams[handle.peer] = left
+            self._waiting = [r for r in self._waiting if r.stream is not handle]
+            self._cond.notify_all()
+
+    def _buckets(self, stream: StreamHandle) -> List[TokenBucket]:
+        out = [b for b in (self._node_bucket, self._peer_buckets.get(stream.peer), stream.bucket) if b is not None]
+        return out
+
+    def _dispatch(self) -> float:
+        """Concede pedidos en orden de etiqueta; devuelve cuánto esperar si queda alguno bloqueado."""
+        now = time.monotonic()
+        for b in [self._node_bucket, *self._peer_buckets.values()]:
+            if b is not None:
+                b.refill(now)
+        wait = 0.0
+        granted_any = False
+        while self._waiting:
+            self._waiting.sort(key=lambda r: r.finish)
+            if self._node_bucket is not None and not self._node_bucket.ready():
+                wait = self._node_bucket.wait_time()
+                break
+            pick = None
+            wait = float("inf")
+            for req in self._waiting:
+                buckets = self._buckets(req.stream)
+                if req.stream.bucket is not None:
+                    req.stream.bucket.refill(now)
+                if all(b.ready() for b in buckets):
+                    pick = req
+                    break
+                wait = min(wait, max(b.wait_time() for b in buckets))
+            if pick is None:
+                break
+            for b in self._buckets(pick.stream):
+                b.consume(pick.nbytes)
+            self._vtime = max(self._vtime, pick.finish - pick.nbytes / pick.stream.weight)
+            pick.granted = True
+            self._waiting.remove(pick)
+            granted_any = True
+        if granted_any:
+            self._cond.notify_all()
+        return wait if self._waiting else 0.0
+
+    def acquire(self, handle: StreamHandle, nbytes: int) -> None:
+        """Bloquea hasta que el stream pueda emitir 'nbytes'."""
+        if not self.enabled or nbytes <= 0:
+            return
+        with self._cond:
+            start = max(self._vtime, handle.last_finish)
+            handle.last_finish = start + nbytes / handle.weight
+            req = _Request(handle, nbytes, handle.last_finish)
+            self._waiting.append(req)
+            while not req.granted:
+                wait = self._dispatch()
+                if req.granted:
+                    break
+                self._cond.wait(timeout=min(max(wait, 0.001), 0.5))
+
+    async def acquire_async(self, handle: StreamHandle, nbytes: int) -> None:
+        """Como acquire(), pero espera con asyncio.sleep en lugar de bloquear el hilo."""
+        if not self.enabled or nbytes <= 0:
+            return
+        with self._cond:
+            start = max(self._vtime, handle.last_finish)
+            handle.last_finish = start + nbytes / handle.weight
+            req = _Request(handle, nbytes, handle.last_finish)
+            self._waiting.append(req)
+        try:
+            while True:
+                with self._cond:
+                    wait = 0.0 if req.granted else self._dispatch()
+                    if req.granted:
+                        return
+                await asyncio.sleep(min(max(wait, 0.001), 0.5))
+        except BaseException:
+            # Stream cancelado mientras esperaba: su pedido no debe bloquear a los demás
+            with self._cond:
+                if req in self._waiting:
+                    self._waiting.remove(req)
+                    self._cond.notify_all()
+            raise
+
+_SCHEDULER = TransferScheduler()
+
+def get_scheduler() -> TransferScheduler:
+    return _SCHEDULER
+
+def configure_scheduler(node_rate: float = 0, peer_rate: float = 0, stream_rate: float = 0) -> TransferScheduler:
+    """Configura los topes (bytes/s) del nodo; 0 desactiva cada nivel."""
+    global _SCHEDULER
+    _SCHEDULER = TransferScheduler(node_rate, peer_rate, stream_rate)
+    return _SCHEDULER
@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Coalescencia "single-flight": mientras una operación con cierta clave está en curso,
+# las llamadas idénticas no la repiten sino que esperan y reciben el mismo resultado
+# (o la misma excepción). Al terminar se olvida la clave: no es una caché, la próxima
+# llamada vuelve a ejecutar la operación.
+
+ABANDON_POLL_S = 0.1
+
+class Abandoned(Exception):
+    """Quien esperaba una operación ajena dejó de esperarla (se activó su 'abandon')."""
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], abandon: Optional[threading.Event] = None) -> Tuple[Any, bool]:
+        """Ejecuta fn() una sola vez por clave en vuelo. Retorna (resultado, compartido).
+        Con 'abandon', una llamada que espera la operación de otra deja de esperar cuando
+        se activa y lanza Abandoned (la operación sigue para los demás)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+        if not leader:
+            while not call.done.wait(ABANDON_POLL_S if abandon is not None else None):
+                if abandon.is_set():
+                    raise Abandoned(f"se dejó de esperar {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, call.waiters > 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,131 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Parámetros de transporte de las transferencias gRPC, configurables desde la
+# sección 'transport' del YAML del peer:
+# - tamaño de chunk (fijo, o adaptativo: crece mientras mejora el throughput medido)
+# - tamaño máximo de mensaje (debe cubrir el chunk más grande)
+# - ventana HTTP/2 por stream (lookahead) y BDP probing
+# - keepalive de los canales de cliente y lo que acepta el servidor
+# Los servidores y canales toman las opciones al crearse; el chunk se lee por stream.
+
+KB = 1024
+MB = 1024 * 1024
+
+DEFAULT_CHUNK_SIZE = 64 * KB
+
+class TransportSettings:
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, adaptive_chunk: bool = False,
+                 max_chunk_size: int = 1 * MB, max_message_size: int = 8 * MB, window_size: int = 0,
+                 bdp_probe: bool = True, keepalive_time_ms: int = 30000, keepalive_timeout_ms: int = 10000):
+        self.chunk_size = max(4 * KB, int(chunk_size))
+        self.adaptive_chunk = bool(adaptive_chunk)
+        self.max_chunk_size = max(self.chunk_size, int(max_chunk_size))
+        # El mensaje incluye el chunk más los campos del FileChunk
+        self.max_message_size = max(int(max_message_size), self.max_chunk_size + 64 * KB)
+        self.window_size = max(0, int(window_size))  # 0 = ventana por defecto de gRPC
+        self.bdp_probe = bool(bdp_probe)
+        self.keepalive_time_ms = int(keepalive_time_ms)
+        self.keepalive_timeout_ms = int(keepalive_timeout_ms)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict]) -> "TransportSettings":
+        """Construye la configuración desde la sección 'transport' del YAML (tamaños en KB/MB)."""
+        cfg = cfg or {}
+        base = cls()
+        def num(key: str, default: float, unit: int = 1) -> int:
+            value = cfg.get(key)
+            return int(float(value) * unit) if value not in (None, "") else default
+        return cls(
+            chunk_size=num("chunk_kb", base.chunk_size, KB),
+            adaptive_chunk=bool(cfg.get("adaptive_chunk", base.adaptive_chunk)),
+            max_chunk_size=num("max_chunk_kb", base.max_chunk_size, KB),
+            max_message_size=num("max_message_mb", base.max_message_size, MB),
+            window_size=num("window_kb", base.window_size, KB),
+            bdp_probe=bool(cfg.get("bdp_probe", base.bdp_probe)),
+            keepalive_time_ms=num("keepalive_time_ms", base.keepalive_time_ms),
+            keepalive_timeout_ms=num("keepalive_timeout_ms", base.keepalive_timeout_ms),
+        )
+
+    def _flow_options(self) -> List[Tuple[str, int]]:
+        options = [
+            ("grpc.max_send_message_length", self.max_message_size),
+            ("grpc.max_receive_message_length", self.max_message_size),
+            ("grpc.http2.bdp_probe", 1 if self.bdp_probe else 0),
+        ]
+        if self.window_size:
+            options.append(("grpc.http2.lookahead_bytes", self.window_size))
+        return options
+
+    def channel_options(self) -> List[Tuple[str, int]]:
+        return self._flow_options() + [
+            ("grpc.keepalive_time_ms", self.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+
+    def server_options(self) -> List[Tuple[str, int]]:
+        # Aceptar los pings de keepalive de los canales del pool de clientes (también sin llamadas activas)
+        return self._flow_options() + [
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.min_ping_interval_without_data_ms", min(10000, self.keepalive_time_ms)),
+            ("grpc.http2.max_ping_strikes", 0),
+        ]
+
+class ChunkSizer:
+    """Tamaño de chunk de un stream. En modo adaptativo mide el throughput por ventanas
+    (al menos WINDOW_CHUNKS chunks y WINDOW_S segundos; la primera se descarta porque
+    incluye el arranque de la conexión) y duplica el tamaño mientras cada duplicación
+    mejore al menos un GAIN; si deja de mejorar vuelve al mejor tamaño medido y lo fija."""
+
+    WINDOW_CHUNKS = 8
+    WINDOW_S = 0.05
+    GAIN = 1.10
+
+    def __init__(self, settings: "TransportSettings"):
+        self.size = settings.chunk_size
+        self._limit = settings.max_chunk_size
+        self._settled = not settings.adaptive_chunk or self.size >= self._limit
+        self._warmup = True
+        self._best = 0.0
+        self._best_size = self.size
+        self._bytes = 0
+        self._chunks = 0
+        self._start = time.monotonic()
+
+    def record(self, nbytes: int) -> None:
+        """Registra un chunk ya entregado al transporte."""
+        if self._settled:
+            return
+        self._bytes += nbytes
+        self._chunks += 1
+        now = time.monotonic()
+        if self._chunks < self.WINDOW_CHUNKS or now - self._start < self.WINDOW_S:
+            return
+        rate = self._bytes / (now - self._start)
+        if self._warmup:
+            self._warmup = False
+        elif rate >= self._best * self.GAIN:
+            self._best = rate
+            self._best_size = self.size
+            if self.size >= self._limit:
+                self._settled = True
+            self.size = min(self.size * 2, self._limit)
+        else:
+            # La última duplicación no rindió: se vuelve al mejor tamaño y se fija
+            self.size = self._best_size
+            self._settled = True
+        self._bytes = self._chunks = 0
+        self._start = now
+
+_SETTINGS = TransportSettings()
+
+def get_transport() -> TransportSettings:
+    return _SETTINGS
+
+def configure_transport(cfg: Optional[Dict]) -> TransportSettings:
+    """Aplica la sección 'transport' del YAML. Llamar antes de levantar servidores y canales."""
+    global _SETTINGS
+    _SETTINGS = TransportSettings.from_config(cfg)
+    return _SETTINGS
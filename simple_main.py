@@ -1,12 +1,34 @@
+import os
 import argparse
+import threading
 import uvicorn
 import yaml
 
 # Importa la app FastAPI mínima y el setter del directorio base
 from services.file_simple.api import app
 from services.file_simple.service import set_base_directory, get_base_directory
-from services.directory_simple.service import set_self_address, set_self_info
-from services.transfer_runtime.grpc_transfer import start_grpc_server
+from services.file_simple.reindex import configure_reindexer
+from services.directory_simple.service import (
+    set_self_address,
+    set_self_info,
+    start_leaf_uplink,
+    get_self_address,
+    snapshot_dl,
+    rejoin_on_boot,
+)
+from services.directory_simple.dl_store import configure_dl_store
+from services.transfer_runtime.grpc_transfer import configure_mmap, start_grpc_server
+from services.transfer_runtime.aio_transfer import start_aio_grpc_server
+from services.transfer_runtime.scheduler import configure_scheduler
+from services.transfer_runtime.transport import configure_transport
+from services.transfer_runtime.jobs import configure_job_queue
+from services.transfer_runtime.chunk_cache import configure_chunk_cache
+from services.directory_simple.popularity import configure_popularity
+from services.directory_simple.routing import configure_routing
+from services.directory_simple.superpeer import configure_superpeer
+from services.directory_simple.admission import configure_admission
+from services.transfer_runtime.replicas import configure_replica_store
+from services.transfer_runtime.replication import configure_replication
 
 def main():
     parser = argparse.ArgumentParser(description="Inicia una API simple de File Service por nodo")
@@ -25,6 +47,13 @@ def main():
     # Establecer el directorio base para la indexación en memoria
     set_base_directory(files_dir)
 
+    # Reindexación en segundo plano por mtime de directorios, con intervalo adaptativo
+    # entre min_interval_s y max_interval_s (enabled: false = solo /indexar y descargas)
+    reindex_cfg = cfg.get("reindex") or {}
+    if reindex_cfg.get("enabled", True):
+        configure_reindexer(min_interval_s=float(reindex_cfg.get("min_interval_s") or 2),
+                            max_interval_s=float(reindex_cfg.get("max_interval_s") or 60)).start()
+
     port = args.port or cfg.get("rest_port")
     if not port:
         raise SystemExit("Puerto no especificado: pase --port o defina rest_port en el YAML")
@@ -37,12 +66,95 @@ def main():
     else:
         set_self_address(f"{self_ip}:{int(port)}")
     
+    # Topes de ancho de banda de subida en MB/s (0 o ausente = sin límite)
+    limits = cfg.get("transfer_limits") or {}
+    configure_scheduler(
+        node_rate=float(limits.get("node_mbps") or 0) * 2**20,
+        peer_rate=float(limits.get("peer_mbps") or 0) * 2**20,
+        stream_rate=float(limits.get("stream_mbps") or 0) * 2**20,
+    )
+
+    # Pool de trabajos de descarga en segundo plano (/transfer/jobs)
+    jobs_cfg = cfg.get("download_jobs") or {}
+    configure_job_queue(workers=int(jobs_cfg.get("workers") or 2), max_queued=int(jobs_cfg.get("max_queued") or 100))
+
+    # Caché LRU de chunks de archivos calientes en el servidor gRPC (0 = desactivada)
+    cache_cfg = cfg.get("chunk_cache") or {}
+    configure_chunk_cache(budget_bytes=int(float(cache_cfg.get("budget_mb") or 0) * 2**20),
+                          admit_after=int(cache_cfg.get("admit_after") or 2))
+
+    # Replicación proactiva de archivos populares: vida media de la popularidad,
+    # cuota para réplicas recibidas (0 = no se aceptan) y empuje a vecinos. La lista de
+    # réplicas recibidas se persiste junto a la DL (state_path) para seguir en la cuota
+    # tras un reinicio
+    repl_cfg = cfg.get("replication") or {}
+    configure_popularity(half_life_s=float(repl_cfg.get("half_life_s") or 600))
+    replicas_path = repl_cfg.get("state_path")
+    if replicas_path is None:
+        replicas_path = os.path.join(".state", f"replicas_{peer_id or port}.json")
+    configure_replica_store(quota_bytes=int(float(repl_cfg.get("quota_mb") or 0) * 2**20),
+                            path=str(replicas_path))
+    configure_replication(repl_cfg)
+
+    # Tabla de ruteo aprendida de búsquedas: vida media de las rutas y fallos seguidos tolerados
+    routing_cfg = cfg.get("routing") or {}
+    configure_routing(half_life_s=float(routing_cfg.get("half_life_s") or 900),
+                      max_failures=int(routing_cfg.get("max_failures") or 2))
+
+    # Modo jerárquico: "flat" (flood entre todos), "leaf" (sube su índice a headline_peer,
+    # con failover a substitute_peer) o "super" (responde por sus hojas, flood entre super-peers)
+    sp_cfg = cfg.get("superpeer") or {}
+    configure_superpeer(role=str(sp_cfg.get("role") or "flat"),
+                        headline=(cfg.get("headline_peer") or {}).get("address"),
+                        substitute=(cfg.get("substitute_peer") or {}).get("address"),
+                        push_interval_s=float(sp_cfg.get("push_interval_s") or 30),
+                        leaf_ttl_s=float(sp_cfg.get("leaf_ttl_s") or 120))
+    start_leaf_uplink()
+
+    # Control de admisión del relay de queries: slots en curso, cola corta y espera máxima
+    # (lo que no entra se rechaza con 503 + Retry-After; relay_slots 0 = sin límite) y
+    # tasa por origen del flood (429 al superarla; origin_rate 0 = sin límite). Sin la
+    # sección 'admission' ambos quedan desactivados
+    adm_cfg = cfg.get("admission") or {}
+    configure_admission(relay_slots=int(adm_cfg.get("relay_slots", 0)),
+                        queue_size=int(adm_cfg.get("queue_size", 16)),
+                        queue_timeout_s=float(adm_cfg.get("queue_timeout_s", 2)),
+                        origin_rate=float(adm_cfg.get("origin_rate", 0)),
+                        origin_burst=float(adm_cfg.get("origin_burst", 10)))
+
+    # Chunk, ventanas HTTP/2, tamaño de mensaje y keepalive (antes de crear servidor y canales)
+    configure_transport(cfg.get("transport"))
+
+    # Download desde mmap (zero-copy): solo si los archivos no se truncan fuera del nodo
+    # mientras se sirven, porque eso produce SIGBUS en el proceso; por defecto read()
+    configure_mmap(bool(cfg.get("mmap_download", False)))
+
     # Iniciar servidor gRPC de transferencia de archivos en paralelo
+    # grpc_server: "thread" (pool de 8 hilos) o "aio" (grpc.aio, miles de streams concurrentes)
     grpc_port = int(cfg.get("grpc_port", int(port) + 1000))
     base_dir = get_base_directory() or files_dir
-    start_grpc_server(base_dir=base_dir, port=grpc_port)
+    if str(cfg.get("grpc_server") or "thread").lower() == "aio":
+        start_aio_grpc_server(base_dir=base_dir, port=grpc_port)
+    else:
+        start_grpc_server(base_dir=base_dir, port=grpc_port)
+
+    # DL persistente: se guarda cada interval_s (si cambió) y al apagar; al arrancar se
+    # prueban en paralelo los vecinos guardados y, si ninguno responde, se hace join vía
+    # headline_peer / substitute_peer. path vacío = sin persistencia.
+    dl_cfg = cfg.get("dl_store") or {}
+    dl_path = dl_cfg.get("path")
+    if dl_path is None:
+        dl_path = os.path.join(".state", f"dl_{peer_id or port}.json")
+    store = configure_dl_store(path=str(dl_path), interval_s=float(dl_cfg.get("interval_s") or 5))
+    fallbacks = [(cfg.get("headline_peer") or {}).get("address"), (cfg.get("substitute_peer") or {}).get("address")]
+    threading.Thread(target=rejoin_on_boot, args=(store.load(), fallbacks), name="dl-rejoin", daemon=True).start()
+    store.start(lambda: (get_self_address() or "", snapshot_dl()))
 
-    uvicorn.run(app, host=args.ip, port=int(port), log_level="info")
+    try:
+        uvicorn.run(app, host=args.ip, port=int(port), log_level="info")
+    finally:
+        store.stop()
+        store.save(get_self_address() or "", snapshot_dl())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
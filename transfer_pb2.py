@@ -13,19 +13,31 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0etransfer.proto\x12\x08transfer\"\x1f\n\x0b\x46ileRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\")\n\tFileChunk\x12\x0f\n\x07\x63ontent\x18\x01 \x01(\x0c\x12\x0b\n\x03seq\x18\x02 \x01(\x05\"-\n\x0eUploadResponse\x12\n\n\x02ok\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t2\x7f\n\x08Transfer\x12\x38\n\x08\x44ownload\x12\x15.transfer.FileRequest\x1a\x13.transfer.FileChunk0\x01\x12\x39\n\x06Upload\x12\x13.transfer.FileChunk\x1a\x18.transfer.UploadResponse(\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0etransfer.proto\x12\x08transfer\"\x83\x01\n\x0b\x46ileRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x03\x12\x0e\n\x06length\x18\x03 \x01(\x03\x12\x1a\n\x12\x61\x63\x63\x65pt_compression\x18\x04 \x01(\t\x12\x11\n\thave_size\x18\x05 \x01(\x03\x12\x13\n\x0bhave_sha256\x18\x06 \x01(\t\"d\n\tFileChunk\x12\x0f\n\x07\x63ontent\x18\x01 \x01(\x0c\x12\x0b\n\x03seq\x18\x02 \x01(\x05\x12\r\n\x05\x63rc32\x18\x03 \x01(\x07\x12\x0c\n\x04last\x18\x04 \x01(\x08\x12\x0e\n\x06sha256\x18\x05 \x01(\t\x12\x0c\n\x04size\x18\x06 \x01(\x03\".\n\x0e\x42lockSignature\x12\x0c\n\x04weak\x18\x01 \x01(\x07\x12\x0e\n\x06strong\x18\x02 \x01(\x0c\"\x88\x01\n\x0c\x44\x65ltaRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x12\n\nblock_size\x18\x02 \x01(\x05\x12\x12\n\nbasis_size\x18\x03 \x01(\x03\x12\x14\n\x0c\x62\x61sis_sha256\x18\x04 \x01(\t\x12(\n\x06\x62locks\x18\x05 \x03(\x0b\x32\x18.transfer.BlockSignature\"\xa5\x01\n\nDeltaChunk\x12\x0b\n\x03seq\x18\x01 \x01(\x05\x12\x0f\n\x07literal\x18\x02 \x01(\x0c\x12\r\n\x05\x63rc32\x18\x03 \x01(\x07\x12\x13\n\x0b\x62lock_index\x18\x04 \x01(\x03\x12\x13\n\x0b\x62lock_count\x18\x05 \x01(\x05\x12\x0c\n\x04last\x18\x06 \x01(\x08\x12\x0e\n\x06sha256\x18\x07 \x01(\t\x12\x0c\n\x04size\x18\x08 \x01(\x03\x12\x14\n\x0cnot_modified\x18\t \x01(\x08\" \n\x0b\x42ulkRequest\x12\x11\n\tfilenames\x18\x01 \x03(\t\"u\n\tBulkPiece\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\x0c\x12\r\n\x05\x63rc32\x18\x03 \x01(\x07\x12\x0c\n\x04last\x18\x04 \x01(\x08\x12\x0e\n\x06sha256\x18\x05 \x01(\t\x12\x0c\n\x04size\x18\x06 \x01(\x03\x12\r\n\x05\x65rror\x18\x07 \x01(\t\"3\n\x0c\x42ulkResponse\x12#\n\x06pieces\x18\x01 \x03(\x0b\x32\x13.transfer.BulkPiece\"-\n\x0eUploadResponse\x12\n\n\x02ok\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t2\x81\x02\n\x08Transfer\x12\x38\n\x08\x44ownload\x12\x15.transfer.FileRequest\x1a\x13.transfer.FileChunk0\x01\x12\x39\n\x06Upload\x12\x13.transfer.FileChunk\x1a\x18.transfer.UploadResponse(\x01\x12=\n\tDeltaSync\x12\x16.transfer.DeltaRequest\x1a\x14.transfer.DeltaChunk(\x01\x30\x01\x12\x41\n\x0c\x42ulkDownload\x12\x15.transfer.BulkRequest\x1a\x16.transfer.BulkResponse(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'transfer_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_FILEREQUEST']._serialized_start=28
-  _globals['_FILEREQUEST']._serialized_end=59
-  _globals['_FILECHUNK']._serialized_start=61
-  _globals['_FILECHUNK']._serialized_end=102
-  _globals['_UPLOADRESPONSE']._serialized_start=104
-  _globals['_UPLOADRESPONSE']._serialized_end=149
-  _globals['_TRANSFER']._serialized_start=151
-  _globals['_TRANSFER']._serialized_end=278
+  _globals['_FILEREQUEST']._serialized_start=29
+  _globals['_FILEREQUEST']._serialized_end=160
+  _globals['_FILECHUNK']._serialized_start=162
+  _globals['_FILECHUNK']._serialized_end=262
+  _globals['_BLOCKSIGNATURE']._serialized_start=264
+  _globals['_BLOCKSIGNATURE']._serialized_end=310
+  _globals['_DELTAREQUEST']._serialized_start=313
+  _globals['_DELTAREQUEST']._serialized_end=449
+  _globals['_DELTACHUNK']._serialized_start=452
+  _globals['_DELTACHUNK']._serialized_end=617
+  _globals['_BULKREQUEST']._serialized_start=619
+  _globals['_BULKREQUEST']._serialized_end=651
+  _globals['_BULKPIECE']._serialized_start=653
+  _globals['_BULKPIECE']._serialized_end=770
+  _globals['_BULKRESPONSE']._serialized_start=772
+  _globals['_BULKRESPONSE']._serialized_end=823
+  _globals['_UPLOADRESPONSE']._serialized_start=825
+  _globals['_UPLOADRESPONSE']._serialized_end=870
+  _globals['_TRANSFER']._serialized_start=873
+  _globals['_TRANSFER']._serialized_end=1130
 # @@protoc_insertion_point(module_scope)
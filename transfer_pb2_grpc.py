@@ -27,6 +27,16 @@ class TransferStub(object):
                 request_serializer=transfer__pb2.FileChunk.SerializeToString,
                 response_deserializer=transfer__pb2.UploadResponse.FromString,
                 )
+        self.DeltaSync = channel.stream_stream(
+                '/transfer.Transfer/DeltaSync',
+                request_serializer=transfer__pb2.DeltaRequest.SerializeToString,
+                response_deserializer=transfer__pb2.DeltaChunk.FromString,
+                )
+        self.BulkDownload = channel.stream_stream(
+                '/transfer.Transfer/BulkDownload',
+                request_serializer=transfer__pb2.BulkRequest.SerializeToString,
+                response_deserializer=transfer__pb2.BulkResponse.FromString,
+                )
 
 
 class TransferServicer(object):
@@ -44,6 +54,18 @@ class TransferServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def DeltaSync(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BulkDownload(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_TransferServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -57,6 +79,16 @@ def add_TransferServicer_to_server(servicer, server):
                     request_deserializer=transfer__pb2.FileChunk.FromString,
                     response_serializer=transfer__pb2.UploadResponse.SerializeToString,
             ),
+            'DeltaSync': grpc.stream_stream_rpc_method_handler(
+                    servicer.DeltaSync,
+                    request_deserializer=transfer__pb2.DeltaRequest.FromString,
+                    response_serializer=transfer__pb2.DeltaChunk.SerializeToString,
+            ),
+            'BulkDownload': grpc.stream_stream_rpc_method_handler(
+                    servicer.BulkDownload,
+                    request_deserializer=transfer__pb2.BulkRequest.FromString,
+                    response_serializer=transfer__pb2.BulkResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'transfer.Transfer', rpc_method_handlers)
@@ -100,3 +132,37 @@ class Transfer(object):
             transfer__pb2.UploadResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def DeltaSync(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/transfer.Transfer/DeltaSync',
+            transfer__pb2.DeltaRequest.SerializeToString,
+            transfer__pb2.DeltaChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def BulkDownload(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/transfer.Transfer/BulkDownload',
+            transfer__pb2.BulkRequest.SerializeToString,
+            transfer__pb2.BulkResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)